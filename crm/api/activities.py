@@ -1,3 +1,6 @@
+import base64
+import heapq
+import itertools
 import json
 
 import frappe
@@ -6,7 +9,58 @@ from frappe import _
 from frappe.desk.form.load import get_docinfo
 from frappe.query_builder import JoinType
 
-from crm.fcrm.doctype.crm_call_log.crm_call_log import parse_call_log
+from crm.fcrm.doctype.crm_call_log.crm_call_log import parse_call_logs
+
+# fields whose changes are not shown in the timeline
+TIMELINE_AVOID_FIELDS = {
+	"CRM Deal": [
+		"lead",
+		"response_by",
+		"sla_creation",
+		"sla",
+		"first_response_time",
+		"first_responded_on",
+	],
+	"CRM Lead": [
+		"converted",
+		"response_by",
+		"sla_creation",
+		"sla",
+		"first_response_time",
+		"first_responded_on",
+	],
+}
+
+COMMUNICATION_FIELDS = [
+	"name",
+	"communication_type",
+	"communication_date",
+	"creation",
+	"subject",
+	"content",
+	"sender_full_name",
+	"sender",
+	"recipients",
+	"cc",
+	"bcc",
+	"read_by_recipient",
+	"delivery_status",
+]
+
+# change after the email is sent, the activity feed does not store them
+COMMUNICATION_STATUS_FIELDS = ["read_by_recipient", "delivery_status"]
+
+ATTACHMENT_FIELDS = [
+	"name",
+	"file_name",
+	"file_type",
+	"file_url",
+	"file_size",
+	"is_private",
+	"modified",
+	"creation",
+	"owner",
+]
 
 
 @frappe.whitelist()
@@ -19,281 +73,511 @@ def get_activities(name):
 		frappe.throw(_("Document not found"), frappe.DoesNotExistError)
 
 
-def get_deal_activities(name):
-	get_docinfo("", "CRM Deal", name)
-	docinfo = frappe.response["docinfo"]
-	deal_meta = frappe.get_meta("CRM Deal")
-	deal_fields = {
-		field.fieldname: {"label": field.label, "options": field.options} for field in deal_meta.fields
-	}
-	avoid_fields = [
-		"lead",
-		"response_by",
-		"sla_creation",
-		"sla",
-		"first_response_time",
-		"first_responded_on",
-	]
+@frappe.whitelist()
+def get_timeline(doctype: str, name: str, cursor=None, limit=50):
+	"""
+	Get the newest `limit` activities of a lead or deal, or the ones before `cursor`, the
+	`next_cursor` of the previous page. A deal includes the activities of the lead it was
+	converted from.
+
+	Each source (versions, comments and attachment logs, communications) is read newest first
+	up to `limit` rows before the cursor, and the presorted streams are merged, so a page never
+	loads the whole history. Once the activity feed is built a page is one range read of it.
+	"""
+	if doctype not in TIMELINE_AVOID_FIELDS:
+		frappe.throw(_("Timeline is not available for {0}").format(doctype))
+
+	frappe.has_permission(doctype, "read", name, throw=True)
+	limit = min(frappe.utils.cint(limit) or 50, 200)
+	cursor = decode_timeline_cursor(cursor)
+
+	records = [(doctype, name, doctype == "CRM Lead")]
+	if doctype == "CRM Deal" and (lead := frappe.db.get_value("CRM Deal", name, "lead")):
+		records.append(("CRM Lead", lead, True))
+
+	if use_activity_feed():
+		page = get_feed_activities([record[:2] for record in records], cursor, limit + 1)
+	else:
+		streams = []
+		for record_doctype, record_name, is_lead in records:
+			streams.extend(get_timeline_streams(record_doctype, record_name, is_lead, cursor, limit))
 
-	doc = frappe.db.get_values("CRM Deal", name, ["creation", "owner", "lead"])[0]
-	lead = doc[2]
+			doc = frappe.db.get_value(record_doctype, record_name, ["creation", "owner"], as_dict=True)
+			if not doc:
+				continue
+			if is_lead:
+				creation_text = "created this lead"
+			else:
+				creation_text = "converted the lead to this deal" if len(records) > 1 else "created this deal"
+			creation = {
+				"activity_type": "creation",
+				"creation": doc.creation,
+				"owner": doc.owner,
+				"data": creation_text,
+				"is_lead": is_lead,
+				"key": f"{record_doctype}:{record_name}",
+			}
+			if is_before_cursor(creation, cursor):
+				streams.append([creation])
 
-	activities = []
-	calls = []
-	notes = []
-	tasks = []
-	attachments = []
-	creation_text = "created this deal"
+		page = list(
+			itertools.islice(heapq.merge(*streams, key=lambda a: a["creation"], reverse=True), limit + 1)
+		)
+	next_cursor = None
+	if len(page) > limit:
+		page = page[:limit]
+		next_cursor = encode_timeline_cursor(page, cursor)
+
+	set_attachments(page)
+	for activity in page:
+		activity.pop("key", None)
+
+	return {"activities": handle_multiple_versions(page), "next_cursor": next_cursor}
+
+
+def get_timeline_streams(doctype, name, is_lead, cursor, limit):
+	"""Get one list of activities per source of the record, each newest first, before `cursor`."""
+	fields = get_timeline_fields(doctype)
+	avoid_fields = TIMELINE_AVOID_FIELDS[doctype]
+
+	# hidden versions do not count towards the limit, keep reading until it is filled or exhausted
+	versions = []
+	for version in iterate_before_cursor(
+		"Version",
+		{"ref_doctype": doctype, "docname": name},
+		["name", "creation", "owner", "data"],
+		cursor,
+		limit,
+	):
+		if activity := get_version_activity(version, fields, avoid_fields, is_lead):
+			activity["key"] = version.key
+			versions.append(activity)
+			if len(versions) == limit:
+				break
+
+	comments = []
+	for comment in get_before_cursor(
+		"Comment",
+		{
+			"reference_doctype": doctype,
+			"reference_name": name,
+			"comment_type": ["in", ["Comment", "Attachment", "Attachment Removed"]],
+		},
+		["name", "creation", "owner", "content", "comment_type"],
+		cursor,
+		limit,
+	):
+		if comment.comment_type == "Comment":
+			activity = get_comment_activity(comment, is_lead, attachments=[])
+		else:
+			activity = get_attachment_log_activity(comment, is_lead)
+		activity["key"] = comment.key
+		comments.append(activity)
+
+	communications = []
+	for communication in get_communications_before_cursor(doctype, name, cursor, limit):
+		activity = get_communication_activity(communication, is_lead, attachments=[])
+		activity["key"] = communication.key
+		communications.append(activity)
+
+	return [versions, comments, communications]
+
+
+def get_before_cursor(doctype, filters, fields, cursor, limit):
+	"""
+	Get up to `limit` rows of `doctype` newest first, created before the cursor. Rows created at
+	the cursor's exact timestamp are read again and skipped when they were already returned.
+	"""
+	filters = dict(filters)
+	if cursor:
+		filters["creation"] = ["<=", cursor["creation"]]
+
+	rows = frappe.get_all(
+		doctype,
+		filters=filters,
+		fields=fields,
+		order_by="creation desc, name desc",
+		limit=limit + len(cursor["keys"]) if cursor else limit,
+	)
+	for row in rows:
+		row.key = f"{doctype}:{row.name}"
+	return [row for row in rows if is_before_cursor(row, cursor)][:limit]
+
+
+def iterate_before_cursor(doctype, filters, fields, cursor, limit):
+	"""Yield the rows of `doctype` newest first from the cursor on, reading `limit` rows at a time."""
+	while True:
+		rows = get_before_cursor(doctype, filters, fields, cursor, limit)
+		yield from rows
+		if len(rows) < limit:
+			return
+
+		last = rows[-1].creation
+		cursor = {
+			"creation": last,
+			"keys": [row.key for row in rows if row.creation == last]
+			+ (cursor["keys"] if cursor and cursor["creation"] == last else []),
+		}
 
-	if lead:
-		activities, calls, notes, tasks, attachments = get_lead_activities(lead)
-		creation_text = "converted the lead to this deal"
 
-	activities.append(
+def get_communications_before_cursor(doctype, name, cursor, limit):
+	"""Get the communications referencing the record or linked to its timeline, newest first."""
+	condition = "AND c.creation <= %(creation)s" if cursor else ""
+	fields = ", ".join(f"c.`{field}`" for field in COMMUNICATION_FIELDS)
+	rows = frappe.db.sql(
+		f"""
+		(
+			SELECT {fields} FROM `tabCommunication` c
+			WHERE c.reference_doctype = %(doctype)s AND c.reference_name = %(name)s {condition}
+		)
+		UNION
+		(
+			SELECT {fields} FROM `tabCommunication` c
+			JOIN `tabCommunication Link` l ON l.parent = c.name
+			WHERE l.link_doctype = %(doctype)s AND l.link_name = %(name)s {condition}
+		)
+		ORDER BY creation DESC, name DESC
+		LIMIT %(limit)s
+		""",
 		{
-			"activity_type": "creation",
-			"creation": doc[0],
-			"owner": doc[1],
-			"data": creation_text,
-			"is_lead": False,
-		}
+			"doctype": doctype,
+			"name": name,
+			"creation": cursor["creation"] if cursor else None,
+			"limit": limit + len(cursor["keys"]) if cursor else limit,
+		},
+		as_dict=True,
 	)
+	for row in rows:
+		row.key = f"Communication:{row.name}"
+	return [row for row in rows if is_before_cursor(row, cursor)][:limit]
+
+
+def is_before_cursor(row, cursor):
+	if not cursor:
+		return True
+
+	creation = frappe.utils.get_datetime(row["creation"])
+	if creation == cursor["creation"]:
+		return row["key"] not in cursor["keys"]
+	return creation < cursor["creation"]
+
+
+def encode_timeline_cursor(page, cursor=None):
+	"""Encode the position after the last activity of `page`: its timestamp and what was shown at it."""
+	last = page[-1]["creation"]
+	keys = [activity["key"] for activity in page if activity["creation"] == last]
+	if cursor and cursor["creation"] == frappe.utils.get_datetime(last):
+		keys += cursor["keys"]
+	data = json.dumps({"creation": str(last), "keys": keys})
+	return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_timeline_cursor(cursor):
+	if not cursor:
+		return None
+
+	try:
+		data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+		return {"creation": frappe.utils.get_datetime(data["creation"]), "keys": list(data["keys"])}
+	except Exception:
+		frappe.throw(_("Invalid cursor"))
+
+
+def get_timeline_fields(doctype):
+	return {
+		field.fieldname: {"label": field.label, "options": field.options}
+		for field in frappe.get_meta(doctype).fields
+	}
+
 
-	docinfo.versions.reverse()
+def use_activity_feed():
+	# imported here as the feed builds its entries with the helpers of this module
+	from crm.fcrm.doctype.crm_activity_feed.crm_activity_feed import is_activity_feed_built
 
-	for version in docinfo.versions:
-		data = json.loads(version.data)
-		if not data.get("changed"):
+	return is_activity_feed_built()
+
+
+def get_feed_activities(records, cursor=None, limit=None):
+	"""
+	Read the activities of `records` ((doctype, name) pairs) from the activity feed newest first,
+	before `cursor` and up to `limit`, with one indexed range read per record. Call logs are
+	not in the feed, they are listed separately.
+	"""
+	conditions = " OR ".join(["(reference_doctype = %s AND reference_name = %s)"] * len(records))
+	values = [value for record in records for value in record]
+	if cursor:
+		conditions = f"({conditions}) AND creation <= %s"
+		values.append(cursor["creation"])
+
+	query = f"""
+		SELECT reference_doctype, source_doctype, source_name, owner, creation, data
+		FROM `tabCRM Activity Feed`
+		WHERE {conditions}
+		ORDER BY creation DESC, name DESC
+	"""
+	if limit:
+		query += " LIMIT %s"
+		values.append(limit + len(cursor["keys"]) if cursor else limit)
+
+	rows = frappe.db.sql(query, values, as_dict=True)
+
+	activities = []
+	for row in rows:
+		activity = json.loads(row.data)
+		activity["creation"] = row.creation
+		activity["is_lead"] = row.reference_doctype == "CRM Lead"
+		activity["key"] = f"{row.source_doctype}:{row.source_name}"
+		if activity["activity_type"] != "communication":
+			activity["owner"] = row.owner
+		if is_before_cursor(activity, cursor):
+			activities.append(activity)
+
+	activities = activities[:limit] if limit else activities
+	set_communication_status(activities)
+	return activities
+
+
+def set_communication_status(activities):
+	"""Set the current delivery and read status of the communication `activities` in one query."""
+	names = [a["key"].split(":", 1)[1] for a in activities if a["activity_type"] == "communication"]
+	if not names:
+		return
+
+	statuses = {
+		row.name: row
+		for row in frappe.get_all(
+			"Communication",
+			filters={"name": ["in", list(set(names))]},
+			fields=["name", *COMMUNICATION_STATUS_FIELDS],
+		)
+	}
+	for activity in activities:
+		if activity["activity_type"] != "communication":
 			continue
+		status = statuses.get(activity["key"].split(":", 1)[1]) or {}
+		for field in COMMUNICATION_STATUS_FIELDS:
+			activity["data"][field] = status.get(field)
 
-		if change := data.get("changed")[0]:
-			field = deal_fields.get(change[0], None)
 
-			if not field or change[0] in avoid_fields or (not change[1] and not change[2]):
-				continue
+def get_feed_timeline(doctype, name):
+	"""Get the activities, calls, notes, tasks and attachments of a lead or deal from the activity feed."""
+	records = get_timeline_records(doctype, name)
+	activities = get_feed_activities([record[:2] for record in records])
+	set_attachments(activities)
+	for activity in activities:
+		activity.pop("key", None)
+
+	return handle_multiple_versions(activities), *get_linked_records(records)
 
-			field_label = field.get("label") or change[0]
-			field_option = field.get("options") or None
 
-			activity_type = "changed"
-			data = {
-				"field": change[0],
-				"field_label": field_label,
-				"old_value": change[1],
-				"value": change[2],
+def get_deal_activities(name):
+	frappe.has_permission("CRM Deal", "read", name, throw=True)
+	if use_activity_feed():
+		return get_feed_timeline("CRM Deal", name)
+	return get_docinfo_timeline("CRM Deal", name)
+
+
+def get_lead_activities(name):
+	frappe.has_permission("CRM Lead", "read", name, throw=True)
+	if use_activity_feed():
+		return get_feed_timeline("CRM Lead", name)
+	return get_docinfo_timeline("CRM Lead", name)
+
+
+def get_timeline_records(doctype, name):
+	"""Get the (doctype, name, is_lead) of the record, preceded for a deal by the lead it came from."""
+	records = [(doctype, name, doctype == "CRM Lead")]
+	if doctype == "CRM Deal" and (lead := frappe.db.get_value("CRM Deal", name, "lead")):
+		records.insert(0, ("CRM Lead", lead, True))
+	return records
+
+
+def get_docinfo_timeline(doctype, name):
+	"""
+	Build the activities, calls, notes, tasks and attachments of a lead or deal from the docinfo of
+	the record and its lead. The attachments of all comments and communications are read in one
+	query and the linked calls, notes and tasks of all records in one pass.
+	"""
+	records = get_timeline_records(doctype, name)
+	activities = []
+	comments = []
+	communications = []
+
+	for record_doctype, record_name, is_lead in records:
+		get_docinfo("", record_doctype, record_name)
+		docinfo = frappe.response["docinfo"]
+		fields = get_timeline_fields(record_doctype)
+		avoid_fields = TIMELINE_AVOID_FIELDS[record_doctype]
+
+		doc = frappe.db.get_values(record_doctype, record_name, ["creation", "owner"])[0]
+		if is_lead:
+			creation_text = "created this lead"
+		else:
+			creation_text = "converted the lead to this deal" if len(records) > 1 else "created this deal"
+		activities.append(
+			{
+				"activity_type": "creation",
+				"creation": doc[0],
+				"owner": doc[1],
+				"data": creation_text,
+				"is_lead": is_lead,
 			}
+		)
 
-			if not change[1] and change[2]:
-				activity_type = "added"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[2],
-				}
-			elif change[1] and not change[2]:
-				activity_type = "removed"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[1],
-				}
-
-		activity = {
-			"activity_type": activity_type,
-			"creation": version.creation,
-			"owner": version.owner,
-			"data": data,
-			"is_lead": False,
-			"options": field_option,
-		}
-		activities.append(activity)
-
-	for comment in docinfo.comments:
-		activity = {
-			"name": comment.name,
-			"activity_type": "comment",
-			"creation": comment.creation,
-			"owner": comment.owner,
-			"content": comment.content,
-			"attachments": get_attachments("Comment", comment.name),
-			"is_lead": False,
-		}
-		activities.append(activity)
-
-	for communication in docinfo.communications + docinfo.automated_messages:
-		activity = {
-			"activity_type": "communication",
-			"communication_type": communication.communication_type,
-			"communication_date": communication.communication_date or communication.creation,
-			"creation": communication.creation,
-			"data": {
-				"subject": communication.subject,
-				"content": communication.content,
-				"sender_full_name": communication.sender_full_name,
-				"sender": communication.sender,
-				"recipients": communication.recipients,
-				"cc": communication.cc,
-				"bcc": communication.bcc,
-				"attachments": get_attachments("Communication", communication.name),
-				"read_by_recipient": communication.read_by_recipient,
-				"delivery_status": communication.delivery_status,
-			},
-			"is_lead": False,
-		}
-		activities.append(activity)
-
-	for attachment_log in docinfo.attachment_logs:
-		activity = {
-			"name": attachment_log.name,
-			"activity_type": "attachment_log",
-			"creation": attachment_log.creation,
-			"owner": attachment_log.owner,
-			"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
-			"is_lead": False,
+		docinfo.versions.reverse()
+
+		for version in docinfo.versions:
+			if activity := get_version_activity(version, fields, avoid_fields, is_lead):
+				activities.append(activity)
+
+		for attachment_log in docinfo.attachment_logs:
+			activities.append(get_attachment_log_activity(attachment_log, is_lead))
+
+		comments.extend((comment, is_lead) for comment in docinfo.comments)
+		communications.extend(
+			(communication, is_lead) for communication in docinfo.communications + docinfo.automated_messages
+		)
+
+	attachments = get_attachments_of(
+		{
+			"Comment": [comment.name for comment, _ in comments],
+			"Communication": [communication.name for communication, _ in communications],
 		}
-		activities.append(activity)
+	)
 
-	calls = calls + get_linked_calls(name).get("calls", [])
-	notes = notes + get_linked_notes(name) + get_linked_calls(name).get("notes", [])
-	tasks = tasks + get_linked_tasks(name) + get_linked_calls(name).get("tasks", [])
-	attachments = attachments + get_attachments("CRM Deal", name)
+	for comment, is_lead in comments:
+		activities.append(
+			get_comment_activity(comment, is_lead, attachments.get(("Comment", comment.name), []))
+		)
+
+	for communication, is_lead in communications:
+		activities.append(
+			get_communication_activity(
+				communication, is_lead, attachments.get(("Communication", communication.name), [])
+			)
+		)
 
 	activities.sort(key=lambda x: x["creation"], reverse=True)
 	activities = handle_multiple_versions(activities)
 
-	return activities, calls, notes, tasks, attachments
+	return activities, *get_linked_records(records)
 
 
-def get_lead_activities(name):
-	get_docinfo("", "CRM Lead", name)
-	docinfo = frappe.response["docinfo"]
-	lead_meta = frappe.get_meta("CRM Lead")
-	lead_fields = {
-		field.fieldname: {"label": field.label, "options": field.options} for field in lead_meta.fields
-	}
-	avoid_fields = [
-		"converted",
-		"response_by",
-		"sla_creation",
-		"sla",
-		"first_response_time",
-		"first_responded_on",
-	]
+def get_linked_records(records):
+	"""Get the calls, notes, tasks and attachments of `records`, as (doctype, name, is_lead)."""
+	names = [name for _, name, _ in records]
+	linked_calls = get_linked_calls(names)
+	calls = linked_calls.get("calls", [])
+	notes = get_linked_notes(names) + linked_calls.get("notes", [])
+	tasks = get_linked_tasks(names) + linked_calls.get("tasks", [])
 
-	doc = frappe.db.get_values("CRM Lead", name, ["creation", "owner"])[0]
-	activities = [
-		{
-			"activity_type": "creation",
-			"creation": doc[0],
-			"owner": doc[1],
-			"data": "created this lead",
-			"is_lead": True,
-		}
-	]
+	record_attachments = get_attachments_of({doctype: [name] for doctype, name, _ in records})
+	attachments = []
+	for doctype, name, _ in records:
+		attachments += record_attachments.get((doctype, name), [])
 
-	docinfo.versions.reverse()
+	return calls, notes, tasks, attachments
 
-	for version in docinfo.versions:
-		data = json.loads(version.data)
-		if not data.get("changed"):
-			continue
 
-		if change := data.get("changed")[0]:
-			field = lead_fields.get(change[0], None)
+def get_version_activity(version, fields, avoid_fields, is_lead=False):
+	"""Turn the first change of a Version into an added/changed/removed activity, if it is shown."""
+	data = json.loads(version.data)
+	if not data.get("changed"):
+		return None
 
-			if not field or change[0] in avoid_fields or (not change[1] and not change[2]):
-				continue
+	change = data.get("changed")[0]
+	if not change:
+		return None
 
-			field_label = field.get("label") or change[0]
-			field_option = field.get("options") or None
+	field = fields.get(change[0], None)
+	if not field or change[0] in avoid_fields or (not change[1] and not change[2]):
+		return None
 
-			activity_type = "changed"
-			data = {
-				"field": change[0],
-				"field_label": field_label,
-				"old_value": change[1],
-				"value": change[2],
-			}
+	field_label = field.get("label") or change[0]
+	field_option = field.get("options") or None
 
-			if not change[1] and change[2]:
-				activity_type = "added"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[2],
-				}
-			elif change[1] and not change[2]:
-				activity_type = "removed"
-				data = {
-					"field": change[0],
-					"field_label": field_label,
-					"value": change[1],
-				}
-
-		activity = {
-			"activity_type": activity_type,
-			"creation": version.creation,
-			"owner": version.owner,
-			"data": data,
-			"is_lead": True,
-			"options": field_option,
-		}
-		activities.append(activity)
-
-	for comment in docinfo.comments:
-		activity = {
-			"name": comment.name,
-			"activity_type": "comment",
-			"creation": comment.creation,
-			"owner": comment.owner,
-			"content": comment.content,
-			"attachments": get_attachments("Comment", comment.name),
-			"is_lead": True,
-		}
-		activities.append(activity)
-
-	for communication in docinfo.communications + docinfo.automated_messages:
-		activity = {
-			"activity_type": "communication",
-			"communication_type": communication.communication_type,
-			"communication_date": communication.communication_date or communication.creation,
-			"creation": communication.creation,
-			"data": {
-				"subject": communication.subject,
-				"content": communication.content,
-				"sender_full_name": communication.sender_full_name,
-				"sender": communication.sender,
-				"recipients": communication.recipients,
-				"cc": communication.cc,
-				"bcc": communication.bcc,
-				"attachments": get_attachments("Communication", communication.name),
-				"read_by_recipient": communication.read_by_recipient,
-				"delivery_status": communication.delivery_status,
-			},
-			"is_lead": True,
+	activity_type = "changed"
+	data = {
+		"field": change[0],
+		"field_label": field_label,
+		"old_value": change[1],
+		"value": change[2],
+	}
+
+	if not change[1] and change[2]:
+		activity_type = "added"
+		data = {
+			"field": change[0],
+			"field_label": field_label,
+			"value": change[2],
 		}
-		activities.append(activity)
-
-	for attachment_log in docinfo.attachment_logs:
-		activity = {
-			"name": attachment_log.name,
-			"activity_type": "attachment_log",
-			"creation": attachment_log.creation,
-			"owner": attachment_log.owner,
-			"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
-			"is_lead": True,
+	elif change[1] and not change[2]:
+		activity_type = "removed"
+		data = {
+			"field": change[0],
+			"field_label": field_label,
+			"value": change[1],
 		}
-		activities.append(activity)
 
-	calls = get_linked_calls(name).get("calls", [])
-	notes = get_linked_notes(name) + get_linked_calls(name).get("notes", [])
-	tasks = get_linked_tasks(name) + get_linked_calls(name).get("tasks", [])
-	attachments = get_attachments("CRM Lead", name)
+	return {
+		"activity_type": activity_type,
+		"creation": version.creation,
+		"owner": version.owner,
+		"data": data,
+		"is_lead": is_lead,
+		"options": field_option,
+	}
+
+
+def get_comment_activity(comment, is_lead=False, attachments=None):
+	if attachments is None:
+		attachments = get_attachments("Comment", comment.name)
+
+	return {
+		"name": comment.name,
+		"activity_type": "comment",
+		"creation": comment.creation,
+		"owner": comment.owner,
+		"content": comment.content,
+		"attachments": attachments,
+		"is_lead": is_lead,
+	}
+
+
+def get_communication_activity(communication, is_lead=False, attachments=None):
+	if attachments is None:
+		attachments = get_attachments("Communication", communication.name)
+
+	return {
+		"activity_type": "communication",
+		"communication_type": communication.communication_type,
+		"communication_date": communication.communication_date or communication.creation,
+		"creation": communication.creation,
+		"data": {
+			"subject": communication.subject,
+			"content": communication.content,
+			"sender_full_name": communication.sender_full_name,
+			"sender": communication.sender,
+			"recipients": communication.recipients,
+			"cc": communication.cc,
+			"bcc": communication.bcc,
+			"attachments": attachments,
+			"read_by_recipient": communication.read_by_recipient,
+			"delivery_status": communication.delivery_status,
+		},
+		"is_lead": is_lead,
+	}
 
-	activities.sort(key=lambda x: x["creation"], reverse=True)
-	activities = handle_multiple_versions(activities)
 
-	return activities, calls, notes, tasks, attachments
+def get_attachment_log_activity(attachment_log, is_lead=False):
+	return {
+		"name": attachment_log.name,
+		"activity_type": "attachment_log",
+		"creation": attachment_log.creation,
+		"owner": attachment_log.owner,
+		"data": parse_attachment_log(attachment_log.content, attachment_log.comment_type),
+		"is_lead": is_lead,
+	}
 
 
 def get_attachments(doctype, name):
@@ -301,22 +585,44 @@ def get_attachments(doctype, name):
 		frappe.db.get_all(
 			"File",
 			filters={"attached_to_doctype": doctype, "attached_to_name": name},
-			fields=[
-				"name",
-				"file_name",
-				"file_type",
-				"file_url",
-				"file_size",
-				"is_private",
-				"modified",
-				"creation",
-				"owner",
-			],
+			fields=ATTACHMENT_FIELDS,
 		)
 		or []
 	)
 
 
+def set_attachments(activities):
+	"""Set the attachments of the comment and communication `activities`, read in one query per doctype."""
+	names = {"Comment": [], "Communication": []}
+	for activity in activities:
+		if activity["activity_type"] in ("comment", "communication"):
+			doctype, name = activity["key"].split(":", 1)
+			names[doctype].append(name)
+
+	attachments = get_attachments_of(names)
+	for activity in activities:
+		if activity["activity_type"] == "comment":
+			activity["attachments"] = attachments.get(tuple(activity["key"].split(":", 1)), [])
+		elif activity["activity_type"] == "communication":
+			activity["data"]["attachments"] = attachments.get(tuple(activity["key"].split(":", 1)), [])
+
+
+def get_attachments_of(names):
+	"""Get the attachments of many documents, `names` as {doctype: [names]}, keyed by (doctype, name)."""
+	attachments = {}
+	for doctype, doctype_names in names.items():
+		if not doctype_names:
+			continue
+
+		for file in frappe.db.get_all(
+			"File",
+			filters={"attached_to_doctype": doctype, "attached_to_name": ["in", list(set(doctype_names))]},
+			fields=[*ATTACHMENT_FIELDS, "attached_to_name"],
+		):
+			attachments.setdefault((doctype, file.pop("attached_to_name")), []).append(file)
+	return attachments
+
+
 def handle_multiple_versions(versions):
 	activities = []
 	grouped_versions = []
@@ -354,10 +660,15 @@ def parse_grouped_versions(versions):
 	return version
 
 
-def get_linked_calls(name):
+def get_linked_calls(names):
+	"""
+	Get the calls referencing or linked to `names`, a record name or a list of them, and the notes
+	and tasks linked to those calls, with one pass over the call logs.
+	"""
+	names = [names] if isinstance(names, str) else list(names)
 	calls = frappe.db.get_all(
 		"CRM Call Log",
-		filters={"reference_docname": name},
+		filters={"reference_docname": ["in", names]},
 		fields=[
 			"name",
 			"caller",
@@ -376,7 +687,9 @@ def get_linked_calls(name):
 	)
 
 	linked_calls = frappe.db.get_all(
-		"Dynamic Link", filters={"link_name": name, "parenttype": "CRM Call Log"}, pluck="parent"
+		"Dynamic Link",
+		filters={"link_name": ["in", names], "parenttype": "CRM Call Log"},
+		pluck="parent",
 	)
 
 	notes = []
@@ -443,24 +756,26 @@ def get_linked_calls(name):
 			],
 		)
 
-	calls = [parse_call_log(call) for call in calls] if calls else []
+	calls = parse_call_logs(calls) if calls else []
 
 	return {"calls": calls, "notes": notes, "tasks": tasks}
 
 
-def get_linked_notes(name):
+def get_linked_notes(names):
+	names = [names] if isinstance(names, str) else list(names)
 	notes = frappe.db.get_all(
 		"FCRM Note",
-		filters={"reference_docname": name},
+		filters={"reference_docname": ["in", names]},
 		fields=["name", "title", "content", "owner", "modified"],
 	)
 	return notes or []
 
 
-def get_linked_tasks(name):
+def get_linked_tasks(names):
+	names = [names] if isinstance(names, str) else list(names)
 	tasks = frappe.db.get_all(
 		"CRM Task",
-		filters={"reference_docname": name},
+		filters={"reference_docname": ["in", names]},
 		fields=[
 			"name",
 			"title",
@@ -2,11 +2,23 @@ import json
 
 import frappe
 from frappe import _
+from frappe.utils.caching import request_cache
 
 from crm.fcrm.doctype.crm_dashboard.crm_dashboard import create_default_manager_dashboard
+from crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup import is_rollup_fresh
 from crm.utils import sales_user_only
 
+OPEN_STATUS_TYPES = ("Open", "Ongoing", "On Hold")
+WON_STATUS_TYPES = ("Won",)
+NOT_LOST_STATUS_TYPES = (*OPEN_STATUS_TYPES, "Won")
+ALL_STATUS_TYPES = (*NOT_LOST_STATUS_TYPES, "Lost")
 
+DASHBOARD_CACHE_TTL = 6 * 60 * 60
+DASHBOARD_CACHE_GENERATION_KEY = "crm_dashboard_cache_generation"
+DASHBOARD_CACHE_STATS_KEY = "crm_dashboard_cache_stats"
+
+DASHBOARD_WIDGET_EVENT = "crm_dashboard_widget"
+DASHBOARD_WIDGETS_PER_JOB = 3
 
 
 @frappe.whitelist()
@@ -17,9 +29,15 @@ def reset_to_default():
 
 @frappe.whitelist()
 @sales_user_only
-def get_dashboard(from_date="", to_date="", user=""):
+def get_dashboard(from_date="", to_date="", user="", async_mode=False):
 	"""
 	Get the dashboard data for the CRM dashboard.
+	Widgets that aggregate the same table over the same date window share one scan,
+	see `get_dashboard_cells`.
+
+	With `async_mode`, only cached widgets are returned with data. The rest are marked with a
+	`request_id` and computed by background jobs, which push each widget to the user with the
+	`crm_dashboard_widget` realtime event as soon as it is ready.
 	"""
 
 	if not from_date or not to_date:
@@ -43,17 +61,62 @@ def get_dashboard(from_date="", to_date="", user=""):
 	else:
 		layout = json.loads(frappe.db.get_value("CRM Dashboard", "Manager Dashboard", "layout") or "[]")
 
+	pending = []
 	for l in layout:
 		method_name = f"get_{l['name']}"
-		if hasattr(frappe.get_attr("crm.api.dashboard"), method_name):
-			method = getattr(frappe.get_attr("crm.api.dashboard"), method_name)
-			l["data"] = method(from_date, to_date, user)
-		else:
+		if not hasattr(frappe.get_attr("crm.api.dashboard"), method_name):
 			l["data"] = None
+		elif frappe.utils.sbool(async_mode):
+			l["data"] = get_cached_chart(l["name"], None, from_date, to_date, user)
+			if l["data"] is None:
+				pending.append(l)
+		else:
+			method = getattr(frappe.get_attr("crm.api.dashboard"), method_name)
+			l["data"] = get_cached_chart(l["name"], method, from_date, to_date, user)
+
+	if pending:
+		request_id = frappe.generate_hash(length=12)
+		for l in pending:
+			l["request_id"] = request_id
+
+		for batch in frappe.utils.create_batch([l["name"] for l in pending], DASHBOARD_WIDGETS_PER_JOB):
+			frappe.enqueue(
+				compute_dashboard_widgets,
+				queue="short",
+				names=batch,
+				from_date=from_date,
+				to_date=to_date,
+				user=user,
+				request_id=request_id,
+				lang=frappe.local.lang,
+			)
 
 	return layout
 
 
+def compute_dashboard_widgets(names, from_date, to_date, user, request_id, lang=None):
+	"""
+	Compute the dashboard widgets `names` and push each one to the user who requested them.
+	Runs as that user, on one of several jobs a dashboard load is split into.
+	"""
+	if lang:
+		frappe.local.lang = lang
+
+	for name in names:
+		method = getattr(frappe.get_attr("crm.api.dashboard"), f"get_{name}")
+		try:
+			data = get_cached_chart(name, method, from_date, to_date, user)
+		except Exception:
+			frappe.log_error(title=f"Dashboard widget {name} failed")
+			data = None
+
+		frappe.publish_realtime(
+			DASHBOARD_WIDGET_EVENT,
+			{"request_id": request_id, "name": name, "data": data},
+			user=frappe.session.user,
+		)
+
+
 @frappe.whitelist()
 @sales_user_only
 def get_chart(name, type, from_date="", to_date="", user=""):
@@ -74,54 +137,90 @@ def get_chart(name, type, from_date="", to_date="", user=""):
 	method_name = f"get_{name}"
 	if hasattr(frappe.get_attr("crm.api.dashboard"), method_name):
 		method = getattr(frappe.get_attr("crm.api.dashboard"), method_name)
-		return method(from_date, to_date, user)
+		return get_cached_chart(name, method, from_date, to_date, user)
 	else:
 		return {"error": _("Invalid chart name")}
 
 
-def get_total_leads(from_date, to_date, user=""):
+@frappe.whitelist()
+def get_dashboard_cache_stats():
 	"""
-	Get lead count for the dashboard.
+	Get the hit/miss counters of the dashboard chart cache.
 	"""
-	conds = ""
+	frappe.only_for("System Manager")
+	# the counters are raw integers written by hincrby, read them without unpickling
+	stats = frappe.cache.execute_command("HGETALL", frappe.cache.make_key(DASHBOARD_CACHE_STATS_KEY)) or {}
+	stats = {frappe.safe_decode(k): frappe.safe_decode(v) for k, v in stats.items()}
+	hits = frappe.utils.cint(stats.get("hits"))
+	misses = frappe.utils.cint(stats.get("misses"))
 
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
+	return {
+		"hits": hits,
+		"misses": misses,
+		"hit_ratio": hits / (hits + misses) if hits + misses else 0,
+		"generation": get_dashboard_cache_generation(),
 	}
 
-	if user:
-		conds += " AND lead_owner = %(user)s"
-		params["user"] = user
 
-	result = frappe.db.sql(
-		f"""
-		SELECT
-            COUNT(CASE
-                WHEN creation >= %(from_date)s AND creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-                {conds}
-                THEN name
-                ELSE NULL
-            END) as current_month_leads,
-
-            COUNT(CASE
-                WHEN creation >= %(prev_from_date)s AND creation < %(from_date)s
-                {conds}
-                THEN name
-                ELSE NULL
-            END) as prev_month_leads
-		FROM `tabCRM Lead`
-	""",
-		params,
-		as_dict=1,
+def get_cached_chart(name, method, from_date, to_date, user=""):
+	"""
+	Get a chart payload from the cache, computing and storing it on a miss. Entries are keyed by
+	chart, normalized date range, effective user and language, and are dropped as a whole when
+	`invalidate_dashboard_cache` bumps the generation. Without a `method`, misses return None.
+	"""
+	key = get_dashboard_cache_key(
+		"chart",
+		name,
+		frappe.utils.getdate(from_date).isoformat(),
+		frappe.utils.getdate(to_date).isoformat(),
+		user or "",
+		frappe.local.lang,
 	)
+	generator = (lambda: method(from_date, to_date, user)) if method else None
+	return get_or_set_dashboard_cache(key, generator, track_stats=True)
+
+
+def get_or_set_dashboard_cache(key, generator=None, track_stats=False):
+	data = frappe.cache.get_value(key)
+	hit = data is not None
+
+	if not hit:
+		if not generator:
+			# only peeking, the caller computes it later and counts the miss then
+			return None
+		data = generator()
+		frappe.cache.set_value(key, data, expires_in_sec=DASHBOARD_CACHE_TTL)
+
+	if track_stats:
+		frappe.cache.hincrby(
+			frappe.cache.make_key(DASHBOARD_CACHE_STATS_KEY), "hits" if hit else "misses", 1
+		)
+
+	return data
+
+
+def get_dashboard_cache_key(*parts):
+	return ":".join(["crm_dashboard", str(get_dashboard_cache_generation()), *parts])
+
+
+def get_dashboard_cache_generation():
+	return frappe.utils.cint(frappe.cache.get(frappe.cache.make_key(DASHBOARD_CACHE_GENERATION_KEY)))
+
+
+def invalidate_dashboard_cache(doc=None, method=None):
+	"""
+	Drop every cached dashboard payload by moving to a new generation, old entries expire on their own.
+	"""
+	frappe.cache.incr(frappe.cache.make_key(DASHBOARD_CACHE_GENERATION_KEY))
+
 
-	current_month_leads = result[0].current_month_leads or 0
-	prev_month_leads = result[0].prev_month_leads or 0
+def get_total_leads(from_date, to_date, user=""):
+	"""
+	Get lead count for the dashboard.
+	"""
+	cells = get_dashboard_cells("CRM Lead", "creation", from_date, to_date, user)
+	current_month_leads = sum_cells(cells).count
+	prev_month_leads = sum_cells(cells, "prev").count
 
 	delta_in_percentage = (
 		(current_month_leads - prev_month_leads) / prev_month_leads * 100 if prev_month_leads else 0
@@ -140,49 +239,9 @@ def get_ongoing_deals(from_date, to_date, user=""):
 	"""
 	Get ongoing deal count for the dashboard, and also calculate average deal value for ongoing deals.
 	"""
-	conds = ""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			COUNT(CASE
-				WHEN d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as current_month_deals,
-
-			COUNT(CASE
-				WHEN d.creation >= %(prev_from_date)s AND d.creation < %(from_date)s
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as prev_month_deals
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-	""",
-		params,
-		as_dict=1,
-	)
-
-	current_month_deals = result[0].current_month_deals or 0
-	prev_month_deals = result[0].prev_month_deals or 0
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	current_month_deals = sum_cells(cells, status_types=OPEN_STATUS_TYPES).count
+	prev_month_deals = sum_cells(cells, "prev", OPEN_STATUS_TYPES).count
 
 	delta_in_percentage = (
 		(current_month_deals - prev_month_deals) / prev_month_deals * 100 if prev_month_deals else 0
@@ -201,49 +260,9 @@ def get_average_ongoing_deal_value(from_date, to_date, user=""):
 	"""
 	Get ongoing deal count for the dashboard, and also calculate average deal value for ongoing deals.
 	"""
-	conds = ""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as current_month_avg_value,
-
-			AVG(CASE
-				WHEN d.creation >= %(prev_from_date)s AND d.creation < %(from_date)s
-					AND s.type NOT IN ('Won', 'Lost')
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as prev_month_avg_value
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-    """,
-		params,
-		as_dict=1,
-	)
-
-	current_month_avg_value = result[0].current_month_avg_value or 0
-	prev_month_avg_value = result[0].prev_month_avg_value or 0
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	current_month_avg_value = sum_cells(cells, status_types=OPEN_STATUS_TYPES).avg_value
+	prev_month_avg_value = sum_cells(cells, "prev", OPEN_STATUS_TYPES).avg_value
 
 	avg_value_delta = current_month_avg_value - prev_month_avg_value if prev_month_avg_value else 0
 
@@ -260,49 +279,9 @@ def get_won_deals(from_date, to_date, user=""):
 	"""
 	Get won deal count for the dashboard, and also calculate average deal value for won deals.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			COUNT(CASE
-				WHEN d.closed_date >= %(from_date)s AND d.closed_date < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type = 'Won'
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as current_month_deals,
-
-			COUNT(CASE
-				WHEN d.closed_date >= %(prev_from_date)s AND d.closed_date < %(from_date)s
-					AND s.type = 'Won'
-					{conds}
-				THEN d.name
-				ELSE NULL
-			END) as prev_month_deals
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		""",
-		params,
-		as_dict=1,
-	)
-
-	current_month_deals = result[0].current_month_deals or 0
-	prev_month_deals = result[0].prev_month_deals or 0
+	cells = get_dashboard_cells("CRM Deal", "closed_date", from_date, to_date, user)
+	current_month_deals = sum_cells(cells, status_types=WON_STATUS_TYPES).count
+	prev_month_deals = sum_cells(cells, "prev", WON_STATUS_TYPES).count
 
 	delta_in_percentage = (
 		(current_month_deals - prev_month_deals) / prev_month_deals * 100 if prev_month_deals else 0
@@ -321,49 +300,9 @@ def get_average_won_deal_value(from_date, to_date, user=""):
 	"""
 	Get won deal count for the dashboard, and also calculate average deal value for won deals.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN d.closed_date >= %(from_date)s AND d.closed_date < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type = 'Won'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as current_month_avg_value,
-
-			AVG(CASE
-				WHEN d.closed_date >= %(prev_from_date)s AND d.closed_date < %(from_date)s
-					AND s.type = 'Won'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as prev_month_avg_value
-		FROM `tabCRM Deal` d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		""",
-		params,
-		as_dict=1,
-	)
-
-	current_month_avg_value = result[0].current_month_avg_value or 0
-	prev_month_avg_value = result[0].prev_month_avg_value or 0
+	cells = get_dashboard_cells("CRM Deal", "closed_date", from_date, to_date, user)
+	current_month_avg_value = sum_cells(cells, status_types=WON_STATUS_TYPES).avg_value
+	prev_month_avg_value = sum_cells(cells, "prev", WON_STATUS_TYPES).avg_value
 
 	avg_value_delta = current_month_avg_value - prev_month_avg_value if prev_month_avg_value else 0
 
@@ -380,49 +319,9 @@ def get_average_deal_value(from_date, to_date, user=""):
 	"""
 	Get average deal value for the dashboard.
 	"""
-
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND s.type != 'Lost'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as current_month_avg,
-
-			AVG(CASE
-				WHEN d.creation >= %(prev_from_date)s AND d.creation < %(from_date)s
-					AND s.type != 'Lost'
-					{conds}
-				THEN d.deal_value * IFNULL(d.exchange_rate, 1)
-				ELSE NULL
-			END) as prev_month_avg
-		FROM `tabCRM Deal` AS d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		""",
-		params,
-		as_dict=1,
-	)
-
-	current_month_avg = result[0].current_month_avg or 0
-	prev_month_avg = result[0].prev_month_avg or 0
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	current_month_avg = sum_cells(cells, status_types=NOT_LOST_STATUS_TYPES).avg_value
+	prev_month_avg = sum_cells(cells, "prev", NOT_LOST_STATUS_TYPES).avg_value
 
 	delta = current_month_avg - prev_month_avg if prev_month_avg else 0
 
@@ -566,43 +465,46 @@ def get_sales_trend(from_date="", to_date="", user=""):
 		deal_conds += " AND deal_owner = %(user)s"
 		params["user"] = user
 
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			DATE_FORMAT(date, '%%Y-%%m-%%d') AS date,
-			SUM(leads) AS leads,
-			SUM(deals) AS deals,
-			SUM(won_deals) AS won_deals
-		FROM (
-			SELECT
-				DATE(creation) AS date,
-				COUNT(*) AS leads,
-				0 AS deals,
-				0 AS won_deals
-			FROM `tabCRM Lead`
-			WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
-			{lead_conds}
-			GROUP BY DATE(creation)
-
-			UNION ALL
-
+	if is_rollup_fresh("CRM Lead") and is_rollup_fresh("CRM Deal"):
+		result = get_rollup_sales_trend(from_date, to_date, user)
+	else:
+		result = frappe.db.sql(
+			f"""
 			SELECT
-				DATE(d.creation) AS date,
-				0 AS leads,
-				COUNT(*) AS deals,
-				SUM(CASE WHEN s.type = 'Won' THEN 1 ELSE 0 END) AS won_deals
-			FROM `tabCRM Deal` d
-			JOIN `tabCRM Deal Status` s ON d.status = s.name
-			WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
-			{deal_conds}
-			GROUP BY DATE(d.creation)
-		) AS daily
-		GROUP BY date
-		ORDER BY date
-		""",
-		params,
-		as_dict=True,
-	)
+				DATE_FORMAT(date, '%%Y-%%m-%%d') AS date,
+				SUM(leads) AS leads,
+				SUM(deals) AS deals,
+				SUM(won_deals) AS won_deals
+			FROM (
+				SELECT
+					DATE(creation) AS date,
+					COUNT(*) AS leads,
+					0 AS deals,
+					0 AS won_deals
+				FROM `tabCRM Lead`
+				WHERE creation >= %(from)s AND creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
+				{lead_conds}
+				GROUP BY DATE(creation)
+
+				UNION ALL
+
+				SELECT
+					DATE(d.creation) AS date,
+					0 AS leads,
+					COUNT(*) AS deals,
+					SUM(CASE WHEN s.type = 'Won' THEN 1 ELSE 0 END) AS won_deals
+				FROM `tabCRM Deal` d
+				JOIN `tabCRM Deal Status` s ON d.status = s.name
+				WHERE d.creation >= %(from)s AND d.creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
+				{deal_conds}
+				GROUP BY DATE(d.creation)
+			) AS daily
+			GROUP BY date
+			ORDER BY date
+			""",
+			params,
+			as_dict=True,
+		)
 
 	sales_trend = [
 		{
@@ -659,13 +561,13 @@ def get_forecasted_revenue(from_date="", to_date="", user=""):
 			DATE_FORMAT(d.expected_closure_date, '%%Y-%%m')                        AS month,
 			SUM(
 				CASE
-					WHEN s.type = 'Lost' THEN d.expected_deal_value * IFNULL(d.exchange_rate, 1)
-					ELSE d.expected_deal_value * IFNULL(d.probability, 0) / 100 * IFNULL(d.exchange_rate, 1)  -- forecasted
+					WHEN s.type = 'Lost' THEN d.base_expected_deal_value
+					ELSE d.base_weighted_expected_value  -- forecasted
 				END
 			)                                                       AS forecasted,
 			SUM(
 				CASE
-					WHEN s.type = 'Won' THEN d.deal_value * IFNULL(d.exchange_rate, 1)            -- actual
+					WHEN s.type = 'Won' THEN d.base_deal_value            -- actual
 					ELSE 0
 				END
 			)                                                       AS actual
@@ -705,6 +607,64 @@ def get_forecasted_revenue(from_date="", to_date="", user=""):
 	}
 
 
+def get_forecast_history(from_date="", to_date="", user=""):
+	"""
+	Get the open pipeline and its probability weighted forecast as they were on each day, read
+	from the daily pipeline snapshots.
+	[
+		{ date: '2024-05-01', pipeline: 1800000, forecasted: 1200000 },
+		{ date: '2024-05-02', pipeline: 1750000, forecasted: 1210000 },
+		...
+	]
+	"""
+	conds = ""
+
+	if not from_date or not to_date:
+		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
+		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
+
+	params = {"from": from_date, "to": to_date}
+
+	if user:
+		conds += " AND deal_owner = %(user)s"
+		params["user"] = user
+
+	result = frappe.db.sql(
+		f"""
+		SELECT
+			DATE_FORMAT(snapshot_date, '%%Y-%%m-%%d') AS date,
+			SUM(value) AS pipeline,
+			SUM(weighted_value) AS forecasted
+		FROM `tabCRM Pipeline Snapshot`
+		WHERE snapshot_date >= %(from)s AND snapshot_date <= %(to)s
+			{conds}
+		GROUP BY snapshot_date
+		ORDER BY snapshot_date
+		""",
+		params,
+		as_dict=True,
+	)
+
+	return {
+		"data": result or [],
+		"title": _("Forecast history"),
+		"subtitle": _("Open pipeline and forecasted revenue as they were each day"),
+		"xAxis": {
+			"title": _("Date"),
+			"key": "date",
+			"type": "time",
+			"timeGrain": "day",
+		},
+		"yAxis": {
+			"title": _("Revenue") + f" ({get_base_currency_symbol()})",
+		},
+		"series": [
+			{"name": "pipeline", "type": "line", "showDataPoints": True},
+			{"name": "forecasted", "type": "line", "showDataPoints": True},
+		],
+	}
+
+
 def get_funnel_conversion(from_date="", to_date="", user=""):
 	"""
 	Get funnel conversion data for the dashboard.
@@ -718,20 +678,16 @@ def get_funnel_conversion(from_date="", to_date="", user=""):
 	]
 	"""
 	lead_conds = ""
-	deal_conds = ""
 
 	if not from_date or not to_date:
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
 		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
 
 	lead_filters = {"from": from_date, "to": to_date}
-	deal_filters = {"from": from_date, "to": to_date}
 
 	if user:
 		lead_conds += " AND lead_owner = %(user)s"
-		deal_conds += " AND deal_owner = %(user)s"
 		lead_filters["user"] = user
-		deal_filters["user"] = user
 
 	result = []
 
@@ -740,7 +696,7 @@ def get_funnel_conversion(from_date="", to_date="", user=""):
 		f"""
 			SELECT COUNT(*) AS count
 			FROM `tabCRM Lead`
-			WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
+			WHERE creation >= %(from)s AND creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
 			{lead_conds}
 		""",
 		lead_filters,
@@ -752,7 +708,7 @@ def get_funnel_conversion(from_date="", to_date="", user=""):
 	stage_name = _("Leads")
 	result.append({"stage": stage_name, "count": total_leads_count})
 
-	result += get_deal_status_change_counts(from_date, to_date, deal_conds, deal_filters)
+	result += get_deal_status_change_counts(from_date, to_date, user)
 
 	return {
 		"data": result or [],
@@ -788,34 +744,18 @@ def get_deals_by_stage_axis(from_date="", to_date="", user=""):
 		...
 	]
 	"""
-	deal_conds = ""
-
 	if not from_date or not to_date:
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
 		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
 
-	params = {"from": from_date, "to": to_date}
-
-	if user:
-		deal_conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			d.status AS stage,
-			COUNT(*) AS count,
-			s.type AS status_type
-		FROM `tabCRM Deal` AS d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s AND s.type NOT IN ('Lost')
-		{deal_conds}
-		GROUP BY d.status
-		ORDER BY count DESC
-		""",
-		params,
-		as_dict=True,
-	)
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	result = [
+		{"stage": stage, "count": totals.count, "status_type": status_type}
+		for (stage, status_type), totals in group_cells(
+			cells, ("status", "status_type"), status_types=NOT_LOST_STATUS_TYPES
+		).items()
+	]
+	result.sort(key=lambda row: row["count"], reverse=True)
 
 	return {
 		"data": result or [],
@@ -841,34 +781,18 @@ def get_deals_by_stage_donut(from_date="", to_date="", user=""):
 		...
 	]
 	"""
-	deal_conds = ""
-
 	if not from_date or not to_date:
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
 		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
 
-	params = {"from": from_date, "to": to_date}
-
-	if user:
-		deal_conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			d.status AS stage,
-			COUNT(*) AS count,
-			s.type AS status_type
-		FROM `tabCRM Deal` AS d
-		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
-		{deal_conds}
-		GROUP BY d.status
-		ORDER BY count DESC
-		""",
-		params,
-		as_dict=True,
-	)
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	result = [
+		{"stage": stage, "count": totals.count, "status_type": status_type}
+		for (stage, status_type), totals in group_cells(
+			cells, ("status", "status_type"), status_types=ALL_STATUS_TYPES
+		).items()
+	]
+	result.sort(key=lambda row: row["count"], reverse=True)
 
 	return {
 		"data": result or [],
@@ -908,7 +832,7 @@ def get_lost_deal_reasons(from_date="", to_date="", user=""):
 			COUNT(*) AS count
 		FROM `tabCRM Deal` AS d
 		JOIN `tabCRM Deal Status` s ON d.status = s.name
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s AND s.type = 'Lost'
+		WHERE d.creation >= %(from)s AND d.creation < DATE_ADD(%(to)s, INTERVAL 1 DAY) AND s.type = 'Lost'
 		{deal_conds}
 		GROUP BY d.lost_reason
 		HAVING reason IS NOT NULL AND reason != ''
@@ -936,16 +860,16 @@ def get_lost_deal_reasons(from_date="", to_date="", user=""):
 	}
 
 
-def get_leads_by_source(from_date="", to_date="", user=""):
+def get_time_in_stage(from_date="", to_date="", user=""):
 	"""
-	Get lead data by source for the dashboard.
+	Get the average number of days deals spent in each stage before moving on.
 	[
-		{ source: 'Website', count: 120 },
-		{ source: 'Referral', count: 45 },
+		{ stage: 'Qualification', days: 4.5 },
+		{ stage: 'Negotiation', days: 12.1 },
 		...
 	]
 	"""
-	lead_conds = ""
+	conds = ""
 
 	if not from_date or not to_date:
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
@@ -954,24 +878,64 @@ def get_leads_by_source(from_date="", to_date="", user=""):
 	params = {"from": from_date, "to": to_date}
 
 	if user:
-		lead_conds += " AND lead_owner = %(user)s"
+		conds += " AND t.record_owner = %(user)s"
 		params["user"] = user
 
 	result = frappe.db.sql(
 		f"""
 		SELECT
-			IFNULL(source, 'Empty') AS source,
-			COUNT(*) AS count
-		FROM `tabCRM Lead`
-		WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
-		{lead_conds}
-		GROUP BY source
-		ORDER BY count DESC
+			t.from_status AS stage,
+			ROUND(AVG(t.duration) / 86400, 1) AS days
+		FROM `tabCRM Stage Transition` t
+		JOIN `tabCRM Deal Status` st ON t.from_status = st.name
+		WHERE t.reference_doctype = 'CRM Deal'
+			AND t.transition_date >= %(from)s AND t.transition_date < DATE_ADD(%(to)s, INTERVAL 1 DAY)
+			{conds}
+		GROUP BY t.from_status, st.position
+		ORDER BY st.position ASC
 		""",
 		params,
 		as_dict=True,
 	)
 
+	return {
+		"data": result or [],
+		"title": _("Time in stage"),
+		"subtitle": _("Average days deals spend in each stage"),
+		"xAxis": {
+			"title": _("Stage"),
+			"key": "stage",
+			"type": "category",
+		},
+		"yAxis": {
+			"title": _("Days"),
+		},
+		"series": [
+			{"name": "days", "type": "bar"},
+		],
+	}
+
+
+def get_leads_by_source(from_date="", to_date="", user=""):
+	"""
+	Get lead data by source for the dashboard.
+	[
+		{ source: 'Website', count: 120 },
+		{ source: 'Referral', count: 45 },
+		...
+	]
+	"""
+	if not from_date or not to_date:
+		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
+		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
+
+	cells = get_dashboard_cells("CRM Lead", "creation", from_date, to_date, user)
+	result = [
+		{"source": source, "count": totals.count}
+		for source, totals in group_cells(cells, "source", empty_label="Empty").items()
+	]
+	result.sort(key=lambda row: row["count"], reverse=True)
+
 	return {
 		"data": result or [],
 		"title": _("Leads by source"),
@@ -990,32 +954,16 @@ def get_deals_by_source(from_date="", to_date="", user=""):
 		...
 	]
 	"""
-	deal_conds = ""
-
 	if not from_date or not to_date:
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
 		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
 
-	params = {"from": from_date, "to": to_date}
-
-	if user:
-		deal_conds += " AND deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			IFNULL(source, 'Empty') AS source,
-			COUNT(*) AS count
-		FROM `tabCRM Deal`
-		WHERE DATE(creation) BETWEEN %(from)s AND %(to)s
-		{deal_conds}
-		GROUP BY source
-		ORDER BY count DESC
-		""",
-		params,
-		as_dict=True,
-	)
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	result = [
+		{"source": source, "count": totals.count}
+		for source, totals in group_cells(cells, "source", empty_label="Empty").items()
+	]
+	result.sort(key=lambda row: row["count"], reverse=True)
 
 	return {
 		"data": result or [],
@@ -1035,33 +983,16 @@ def get_deals_by_territory(from_date="", to_date="", user=""):
 		...
 	]
 	"""
-	deal_conds = ""
-
 	if not from_date or not to_date:
 		from_date = frappe.utils.get_first_day(from_date or frappe.utils.nowdate())
 		to_date = frappe.utils.get_last_day(to_date or frappe.utils.nowdate())
 
-	params = {"from": from_date, "to": to_date}
-
-	if user:
-		deal_conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			IFNULL(d.territory, 'Empty') AS territory,
-			COUNT(*) AS deals,
-			SUM(COALESCE(d.deal_value, 0) * IFNULL(d.exchange_rate, 1)) AS value
-		FROM `tabCRM Deal` AS d
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
-		{deal_conds}
-		GROUP BY d.territory
-		ORDER BY value DESC
-		""",
-		params,
-		as_dict=True,
-	)
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	result = [
+		{"territory": territory, "deals": totals.count, "value": totals.value}
+		for territory, totals in group_cells(cells, "territory", empty_label="Empty").items()
+	]
+	result.sort(key=lambda row: row["value"], reverse=True)
 
 	return {
 		"data": result or [],
@@ -1111,10 +1042,10 @@ def get_deals_by_salesperson(from_date="", to_date="", user=""):
 		SELECT
 			IFNULL(u.full_name, d.deal_owner) AS salesperson,
 			COUNT(*)                           AS deals,
-			SUM(COALESCE(d.deal_value, 0) * IFNULL(d.exchange_rate, 1)) AS value
+			SUM(COALESCE(d.base_deal_value, 0)) AS value
 		FROM `tabCRM Deal` AS d
 		LEFT JOIN `tabUser` AS u ON u.name = d.deal_owner
-		WHERE DATE(d.creation) BETWEEN %(from)s AND %(to)s
+		WHERE d.creation >= %(from)s AND d.creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
 		{deal_conds}
 		GROUP BY d.deal_owner
 		ORDER BY value DESC
@@ -1149,29 +1080,11 @@ def get_total_leads_by_status(from_date, to_date, user=""):
 	"""
 	Get lead count grouped by status for donut chart.
 	"""
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-	}
-	if user:
-		conds += " AND lead_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			l.status,
-			COUNT(*) as count
-		FROM `tabCRM Lead` l
-		WHERE l.creation >= %(from_date)s AND l.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-		{conds}
-		GROUP BY l.status
-		ORDER BY l.status
-		""",
-		params,
-		as_dict=True,
-	)
+	cells = get_dashboard_cells("CRM Lead", "creation", from_date, to_date, user)
+	result = [
+		frappe._dict(status=status, count=totals.count)
+		for status, totals in sorted(group_cells(cells, "status").items(), key=lambda g: g[0] or "")
+	]
 
 	# Translate status names
 	for row in result:
@@ -1191,29 +1104,11 @@ def get_total_deals_by_status(from_date, to_date, user=""):
 	"""
 	Get deal count grouped by status for donut chart.
 	"""
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-	}
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			d.status,
-			COUNT(*) as count
-		FROM `tabCRM Deal` d
-		WHERE d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-		{conds}
-		GROUP BY d.status
-		ORDER BY d.status
-		""",
-		params,
-		as_dict=True,
-	)
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	result = [
+		frappe._dict(status=status, count=totals.count)
+		for status, totals in sorted(group_cells(cells, "status").items(), key=lambda g: g[0] or "")
+	]
 
 	# Translate status names
 	for row in result:
@@ -1233,46 +1128,9 @@ def get_average_lead_value(from_date, to_date, user=""):
 	"""
 	Get average lead value (net_total) for the dashboard.
 	"""
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-	if user:
-		conds += " AND lead_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN creation >= %(from_date)s AND creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND net_total IS NOT NULL AND net_total > 0
-					{conds}
-				THEN net_total
-				ELSE NULL
-			END) as current_month_avg_value,
-
-			AVG(CASE
-				WHEN creation >= %(prev_from_date)s AND creation < %(from_date)s
-					AND net_total IS NOT NULL AND net_total > 0
-					{conds}
-				THEN net_total
-				ELSE NULL
-			END) as prev_month_avg_value
-		FROM `tabCRM Lead`
-		""",
-		params,
-		as_dict=1,
-	)
-
-	current_month_avg_value = result[0].current_month_avg_value or 0
-	prev_month_avg_value = result[0].prev_month_avg_value or 0
+	cells = get_dashboard_cells("CRM Lead", "creation", from_date, to_date, user)
+	current_month_avg_value = sum_cells(cells).avg_net_total
+	prev_month_avg_value = sum_cells(cells, "prev").avg_net_total
 
 	avg_value_delta = current_month_avg_value - prev_month_avg_value if prev_month_avg_value else 0
 
@@ -1289,46 +1147,9 @@ def get_average_deal_value_new(from_date, to_date, user=""):
 	"""
 	Get average deal value (net_total) for the dashboard.
 	"""
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-	if user:
-		conds += " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			AVG(CASE
-				WHEN d.creation >= %(from_date)s AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-					AND d.net_total IS NOT NULL AND d.net_total > 0
-					{conds}
-				THEN d.net_total
-				ELSE NULL
-			END) as current_month_avg_value,
-
-			AVG(CASE
-				WHEN d.creation >= %(prev_from_date)s AND d.creation < %(from_date)s
-					AND d.net_total IS NOT NULL AND d.net_total > 0
-					{conds}
-				THEN d.net_total
-				ELSE NULL
-			END) as prev_month_avg_value
-		FROM `tabCRM Deal` d
-		""",
-		params,
-		as_dict=1,
-	)
-
-	current_month_avg_value = result[0].current_month_avg_value or 0
-	prev_month_avg_value = result[0].prev_month_avg_value or 0
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	current_month_avg_value = sum_cells(cells).avg_net_total
+	prev_month_avg_value = sum_cells(cells, "prev").avg_net_total
 
 	avg_value_delta = current_month_avg_value - prev_month_avg_value if prev_month_avg_value else 0
 
@@ -1345,44 +1166,9 @@ def get_total_deals(from_date, to_date, user=""):
 	"""
 	Get total deal count for the dashboard.
 	"""
-	diff = frappe.utils.date_diff(to_date, from_date)
-	if diff == 0:
-		diff = 1
-
-	conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-		"prev_from_date": frappe.utils.add_days(from_date, -diff),
-	}
-	if user:
-		conds += " AND deal_owner = %(user)s"
-		params["user"] = user
-
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			COUNT(CASE
-				WHEN creation >= %(from_date)s AND creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{conds}
-				THEN name
-				ELSE NULL
-			END) as current_month_deals,
-
-			COUNT(CASE
-				WHEN creation >= %(prev_from_date)s AND creation < %(from_date)s
-				{conds}
-				THEN name
-				ELSE NULL
-			END) as prev_month_deals
-		FROM `tabCRM Deal`
-		""",
-		params,
-		as_dict=1,
-	)
-
-	current_month_deals = result[0].current_month_deals or 0
-	prev_month_deals = result[0].prev_month_deals or 0
+	cells = get_dashboard_cells("CRM Deal", "creation", from_date, to_date, user)
+	current_month_deals = sum_cells(cells).count
+	prev_month_deals = sum_cells(cells, "prev").count
 
 	delta_in_percentage = (
 		(current_month_deals - prev_month_deals) / prev_month_deals * 100 if prev_month_deals else 0
@@ -1460,48 +1246,7 @@ def get_products_by_tag_donut(from_date, to_date, user=""):
 	Get order statistics by product tag (donut chart with percentages).
 	Counts the number of orders (Leads/Deals) containing products with each tag.
 	"""
-	lead_conds = ""
-	deal_conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-	}
-	
-	if user:
-		lead_conds = " AND l.lead_owner = %(user)s"
-		deal_conds = " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	# Count distinct orders (Leads/Deals) containing products with each tag
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			ptm.tag_name as tag,
-			COUNT(DISTINCT CONCAT(cp.parenttype, '-', cp.parent)) as count
-		FROM `tabCRM Products` cp
-		LEFT JOIN `tabCRM Product` p ON cp.product_code = p.name
-		LEFT JOIN `tabCRM Product Tag` pt ON pt.parent = p.name
-		LEFT JOIN `tabCRM Product Tag Master` ptm ON pt.tag_name = ptm.name
-		LEFT JOIN `tabCRM Lead` l ON cp.parenttype = 'CRM Lead' AND cp.parent = l.name
-		LEFT JOIN `tabCRM Deal` d ON cp.parenttype = 'CRM Deal' AND cp.parent = d.name
-		WHERE (
-			(cp.parenttype = 'CRM Lead' AND l.name IS NOT NULL 
-				AND l.creation >= %(from_date)s 
-				AND l.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{lead_conds})
-			OR
-			(cp.parenttype = 'CRM Deal' AND d.name IS NOT NULL 
-				AND d.creation >= %(from_date)s 
-				AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{deal_conds})
-		)
-		AND ptm.tag_name IS NOT NULL
-		GROUP BY ptm.tag_name
-		ORDER BY count DESC
-		""",
-		params,
-		as_dict=True,
-	)
+	result = [frappe._dict(row) for row in get_orders_by_product_tag(from_date, to_date, user)]
 
 	# Calculate total for percentages
 	total = sum(row["count"] for row in result) if result else 1
@@ -1526,49 +1271,7 @@ def get_products_by_tag_bar(from_date, to_date, user=""):
 	Get order statistics by product tag (vertical bar chart with counts).
 	Counts the number of orders (Leads/Deals) containing products with each tag.
 	"""
-	lead_conds = ""
-	deal_conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-	}
-	
-	if user:
-		lead_conds = " AND l.lead_owner = %(user)s"
-		deal_conds = " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	# Count distinct orders (Leads/Deals) containing products with each tag
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			ptm.tag_name as tag,
-			COUNT(DISTINCT CONCAT(cp.parenttype, '-', cp.parent)) as count
-		FROM `tabCRM Products` cp
-		LEFT JOIN `tabCRM Product` p ON cp.product_code = p.name
-		LEFT JOIN `tabCRM Product Tag` pt ON pt.parent = p.name
-		LEFT JOIN `tabCRM Product Tag Master` ptm ON pt.tag_name = ptm.name
-		LEFT JOIN `tabCRM Lead` l ON cp.parenttype = 'CRM Lead' AND cp.parent = l.name
-		LEFT JOIN `tabCRM Deal` d ON cp.parenttype = 'CRM Deal' AND cp.parent = d.name
-		WHERE (
-			(cp.parenttype = 'CRM Lead' AND l.name IS NOT NULL 
-				AND l.creation >= %(from_date)s 
-				AND l.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{lead_conds})
-			OR
-			(cp.parenttype = 'CRM Deal' AND d.name IS NOT NULL 
-				AND d.creation >= %(from_date)s 
-				AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{deal_conds})
-		)
-		AND ptm.tag_name IS NOT NULL
-		GROUP BY ptm.tag_name
-		ORDER BY count DESC
-		LIMIT 20
-		""",
-		params,
-		as_dict=True,
-	)
+	result = [frappe._dict(row) for row in get_orders_by_product_tag(from_date, to_date, user)[:20]]
 
 	# Translate tag names
 	for row in result:
@@ -1598,46 +1301,7 @@ def get_products_by_type_donut(from_date, to_date, user=""):
 	Get order statistics by product type/name (donut chart with percentages).
 	Counts the number of orders (Leads/Deals) containing products of each type.
 	"""
-	lead_conds = ""
-	deal_conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-	}
-	
-	if user:
-		lead_conds = " AND l.lead_owner = %(user)s"
-		deal_conds = " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	# Count distinct orders (Leads/Deals) containing products of each type
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			p.product_name as product_type,
-			COUNT(DISTINCT CONCAT(cp.parenttype, '-', cp.parent)) as count
-		FROM `tabCRM Products` cp
-		LEFT JOIN `tabCRM Product` p ON cp.product_code = p.name
-		LEFT JOIN `tabCRM Lead` l ON cp.parenttype = 'CRM Lead' AND cp.parent = l.name
-		LEFT JOIN `tabCRM Deal` d ON cp.parenttype = 'CRM Deal' AND cp.parent = d.name
-		WHERE (
-			(cp.parenttype = 'CRM Lead' AND l.name IS NOT NULL 
-				AND l.creation >= %(from_date)s 
-				AND l.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{lead_conds})
-			OR
-			(cp.parenttype = 'CRM Deal' AND d.name IS NOT NULL 
-				AND d.creation >= %(from_date)s 
-				AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{deal_conds})
-		)
-		AND p.product_name IS NOT NULL
-		GROUP BY p.product_name
-		ORDER BY count DESC
-		""",
-		params,
-		as_dict=True,
-	)
+	result = [frappe._dict(row) for row in get_orders_by_product_type(from_date, to_date, user)]
 
 	# Calculate total for percentages
 	total = sum(row["count"] for row in result) if result else 1
@@ -1662,47 +1326,7 @@ def get_products_by_type_bar(from_date, to_date, user=""):
 	Get order statistics by product type/name (vertical bar chart with counts).
 	Counts the number of orders (Leads/Deals) containing products of each type.
 	"""
-	lead_conds = ""
-	deal_conds = ""
-	params = {
-		"from_date": from_date,
-		"to_date": to_date,
-	}
-	
-	if user:
-		lead_conds = " AND l.lead_owner = %(user)s"
-		deal_conds = " AND d.deal_owner = %(user)s"
-		params["user"] = user
-
-	# Count distinct orders (Leads/Deals) containing products of each type
-	result = frappe.db.sql(
-		f"""
-		SELECT
-			p.product_name as product_type,
-			COUNT(DISTINCT CONCAT(cp.parenttype, '-', cp.parent)) as count
-		FROM `tabCRM Products` cp
-		LEFT JOIN `tabCRM Product` p ON cp.product_code = p.name
-		LEFT JOIN `tabCRM Lead` l ON cp.parenttype = 'CRM Lead' AND cp.parent = l.name
-		LEFT JOIN `tabCRM Deal` d ON cp.parenttype = 'CRM Deal' AND cp.parent = d.name
-		WHERE (
-			(cp.parenttype = 'CRM Lead' AND l.name IS NOT NULL 
-				AND l.creation >= %(from_date)s 
-				AND l.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{lead_conds})
-			OR
-			(cp.parenttype = 'CRM Deal' AND d.name IS NOT NULL 
-				AND d.creation >= %(from_date)s 
-				AND d.creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
-				{deal_conds})
-		)
-		AND p.product_name IS NOT NULL
-		GROUP BY p.product_name
-		ORDER BY count DESC
-		LIMIT 20
-		""",
-		params,
-		as_dict=True,
-	)
+	result = [frappe._dict(row) for row in get_orders_by_product_type(from_date, to_date, user)[:20]]
 
 	# Translate product type names
 	for row in result:
@@ -1727,15 +1351,230 @@ def get_products_by_type_bar(from_date, to_date, user=""):
 	}
 
 
+def get_dashboard_cells(doctype, date_field, from_date, to_date, user=""):
+	"""
+	Dashboard query planner: every widget that aggregates `doctype` over the same date window reads
+	from one grouped scan, so a dashboard load costs one query per base table and date field
+	instead of one per widget. Rows are split by period (the selected window, and the window of
+	equal length right before it) and by status, status type, source and territory; widgets
+	re-aggregate them with `sum_cells` / `group_cells`. The cells are also cached, so the background
+	jobs a dashboard load is split into share one scan.
+	"""
+	key = (doctype, date_field, str(from_date), str(to_date), user or "")
+	if not hasattr(frappe.local, "crm_dashboard_cells"):
+		frappe.local.crm_dashboard_cells = {}
+
+	if key not in frappe.local.crm_dashboard_cells:
+		diff = frappe.utils.date_diff(to_date, from_date) or 1
+		params = {
+			"doctype": doctype,
+			"date_field": date_field,
+			"from_date": from_date,
+			"to_date": to_date,
+			"prev_from_date": frappe.utils.add_days(from_date, -diff),
+		}
+		if user:
+			params["user"] = user
+
+		if is_rollup_fresh(doctype):
+			query = get_rollup_cells_query(user)
+		else:
+			query = get_source_cells_query(doctype, date_field, user)
+
+		frappe.local.crm_dashboard_cells[key] = get_or_set_dashboard_cache(
+			get_dashboard_cache_key("cells", *key),
+			lambda: frappe.db.sql(query, params, as_dict=True),
+		)
+
+	return frappe.local.crm_dashboard_cells[key]
+
+
+def get_rollup_cells_query(user=""):
+	conds = " AND record_owner = %(user)s" if user else ""
+	return f"""
+		SELECT
+			CASE WHEN date >= %(from_date)s THEN 'current' ELSE 'prev' END AS period,
+			status,
+			status_type,
+			source,
+			territory,
+			SUM(`count`) AS count,
+			SUM(`value`) AS value,
+			SUM(net_total) AS net_total,
+			SUM(net_total_count) AS net_total_count
+		FROM `tabCRM Dashboard Rollup`
+		WHERE reference_doctype = %(doctype)s
+			AND date_field = %(date_field)s
+			AND date >= %(prev_from_date)s AND date <= %(to_date)s
+			{conds}
+		GROUP BY 1, 2, 3, 4, 5
+	"""
+
+
+def get_source_cells_query(doctype, date_field, user=""):
+	owner_field = "deal_owner" if doctype == "CRM Deal" else "lead_owner"
+	conds = f" AND t.{owner_field} = %(user)s" if user else ""
+
+	if doctype == "CRM Deal":
+		status_type = "IFNULL(s.type, '')"
+		value = "SUM(t.base_deal_value)"
+		join = "LEFT JOIN `tabCRM Deal Status` s ON t.status = s.name"
+	else:
+		status_type, value, join = "''", "0", ""
+
+	return f"""
+		SELECT
+			CASE WHEN t.`{date_field}` >= %(from_date)s THEN 'current' ELSE 'prev' END AS period,
+			t.status,
+			{status_type} AS status_type,
+			t.source,
+			t.territory,
+			COUNT(*) AS count,
+			{value} AS value,
+			SUM(CASE WHEN t.net_total > 0 THEN t.net_total ELSE 0 END) AS net_total,
+			SUM(CASE WHEN t.net_total > 0 THEN 1 ELSE 0 END) AS net_total_count
+		FROM `tab{doctype}` t
+		{join}
+		WHERE t.`{date_field}` >= %(prev_from_date)s
+			AND t.`{date_field}` < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
+			{conds}
+		GROUP BY 1, 2, 3, 4, 5
+	"""
+
+
+def sum_cells(cells, period="current", status_types=None):
+	"""
+	Add up the measures of the dashboard cells in `period`, optionally limited to `status_types`.
+	"""
+	totals = frappe._dict(count=0, value=0, net_total=0, net_total_count=0)
+	for cell in cells:
+		if cell.period != period or (status_types is not None and cell.status_type not in status_types):
+			continue
+		totals.count += frappe.utils.cint(cell.count)
+		totals.value += frappe.utils.flt(cell.value)
+		totals.net_total += frappe.utils.flt(cell.net_total)
+		totals.net_total_count += frappe.utils.cint(cell.net_total_count)
+
+	totals.avg_value = totals.value / totals.count if totals.count else 0
+	totals.avg_net_total = totals.net_total / totals.net_total_count if totals.net_total_count else 0
+	return totals
+
+
+def group_cells(cells, fields, period="current", status_types=None, empty_label=None):
+	"""
+	Add up the measures of the dashboard cells in `period` per value of `fields` (a fieldname or a
+	tuple of fieldnames). Empty values are reported as `empty_label` if given.
+	"""
+	groups = {}
+	for cell in cells:
+		if isinstance(fields, str):
+			key = cell.get(fields)
+			if key is None and empty_label:
+				key = empty_label
+		else:
+			key = tuple(cell.get(f) for f in fields)
+		groups.setdefault(key, []).append(cell)
+
+	result = {}
+	for key, group in groups.items():
+		totals = sum_cells(group, period, status_types)
+		if totals.count:
+			result[key] = totals
+	return result
+
+
+def get_rollup_sales_trend(from_date, to_date, user=""):
+	"""
+	Get daily lead, deal and won deal counts from the rollup, shaped like the sales trend query.
+	"""
+	conds = ""
+	params = {"from": from_date, "to": to_date}
+
+	if user:
+		conds += " AND record_owner = %(user)s"
+		params["user"] = user
+
+	return frappe.db.sql(
+		f"""
+		SELECT
+			DATE_FORMAT(date, '%%Y-%%m-%%d') AS date,
+			SUM(CASE WHEN reference_doctype = 'CRM Lead' THEN `count` ELSE 0 END) AS leads,
+			SUM(CASE WHEN reference_doctype = 'CRM Deal' THEN `count` ELSE 0 END) AS deals,
+			SUM(CASE WHEN reference_doctype = 'CRM Deal' AND status_type = 'Won' THEN `count` ELSE 0 END) AS won_deals
+		FROM `tabCRM Dashboard Rollup`
+		WHERE reference_doctype IN ('CRM Lead', 'CRM Deal')
+			AND date_field = 'creation'
+			AND date BETWEEN %(from)s AND %(to)s
+			{conds}
+		GROUP BY date
+		HAVING leads > 0 OR deals > 0
+		ORDER BY date
+		""",
+		params,
+		as_dict=True,
+	)
+
+
+@request_cache
+def get_orders_by_product_tag(from_date, to_date, user=""):
+	"""
+	Count the orders (Leads/Deals) containing products with each tag, most frequent first.
+	Shared by the tag donut and bar charts so a dashboard load runs the query once.
+	"""
+	return get_orders_by_product_field("tag", from_date, to_date, user)
+
+
+@request_cache
+def get_orders_by_product_type(from_date, to_date, user=""):
+	"""
+	Count the orders (Leads/Deals) containing products of each type, most frequent first.
+	Shared by the type donut and bar charts so a dashboard load runs the query once.
+	"""
+	return get_orders_by_product_field("product_type", from_date, to_date, user)
+
+
+def get_orders_by_product_field(field, from_date, to_date, user=""):
+	conds = ""
+	params = {
+		"from_date": from_date,
+		"to_date": to_date,
+	}
+
+	if user:
+		conds += " AND order_owner = %(user)s"
+		params["user"] = user
+
+	return frappe.db.sql(
+		f"""
+		SELECT
+			`{field}`,
+			COUNT(DISTINCT order_doctype, order_name) AS count
+		FROM `tabCRM Order Product`
+		WHERE order_creation >= %(from_date)s
+			AND order_creation < DATE_ADD(%(to_date)s, INTERVAL 1 DAY)
+			AND `{field}` IS NOT NULL
+			{conds}
+		GROUP BY `{field}`
+		ORDER BY count DESC
+		""",
+		params,
+		as_dict=True,
+	)
+
+
 def get_base_currency_symbol():
 	"""
 	Get the base currency symbol from the system settings.
 	"""
-	base_currency = frappe.db.get_single_value("FCRM Settings", "currency") or "USD"
-	return frappe.db.get_value("Currency", base_currency, "symbol") or ""
+
+	def get_symbol():
+		base_currency = frappe.db.get_single_value("FCRM Settings", "currency") or "USD"
+		return frappe.db.get_value("Currency", base_currency, "symbol") or ""
+
+	return get_or_set_dashboard_cache(get_dashboard_cache_key("base_currency_symbol"), get_symbol)
 
 
-def get_deal_status_change_counts(from_date, to_date, deal_conds="", filters=None):
+def get_deal_status_change_counts(from_date, to_date, user=""):
 	"""
 	Get count of each status change (to) for each deal, excluding deals with current status type 'Lost'.
 	Order results by status position.
@@ -1746,31 +1585,29 @@ def get_deal_status_change_counts(from_date, to_date, deal_conds="", filters=Non
 	  ...
 	]
 	"""
-	params = (filters or {}).copy()
-	params.setdefault("from", from_date)
-	params.setdefault("to", to_date)
+	conds = ""
+	params = {"from": from_date, "to": to_date}
+
+	if user:
+		conds += " AND t.record_owner = %(user)s"
+		params["user"] = user
 
 	result = frappe.db.sql(
 		f"""
 		SELECT
-			scl.to AS stage,
+			t.to_status AS stage,
 			COUNT(*) AS count
 		FROM
-			`tabCRM Status Change Log` scl
-		JOIN
-			`tabCRM Deal` d ON scl.parent = d.name
+			`tabCRM Stage Transition` t
 		JOIN
-			`tabCRM Deal Status` s ON d.status = s.name
-		JOIN
-			`tabCRM Deal Status` st ON scl.to = st.name
+			`tabCRM Deal Status` st ON t.to_status = st.name
 		WHERE
-			scl.to IS NOT NULL
-			AND scl.to != ''
-			AND s.type != 'Lost'
-			AND DATE(d.creation) BETWEEN %(from)s AND %(to)s
-			{deal_conds}
+			t.reference_doctype = 'CRM Deal'
+			AND t.record_creation >= %(from)s AND t.record_creation < DATE_ADD(%(to)s, INTERVAL 1 DAY)
+			AND t.current_status_type != 'Lost'
+			{conds}
 		GROUP BY
-			scl.to, st.position
+			t.to_status, st.position
 		ORDER BY
 			st.position ASC
 		""",
@@ -1,20 +1,90 @@
+import base64
+import copy
+import functools
+import hashlib
 import json
 
 import frappe
 from frappe import _
 from frappe.custom.doctype.property_setter.property_setter import make_property_setter
 from frappe.desk.form.assign_to import set_status
-from frappe.model import no_value_fields
+from frappe.model import default_fields, no_value_fields
 from frappe.model.document import get_controller
 from frappe.utils import make_filter_tuple
 from pypika import Criterion
 
 from crm.api.views import get_views
+from crm.fcrm.doctype.crm_activity_counter.crm_activity_counter import (
+	count_activities,
+	get_stored_counts,
+	is_built as activity_counters_built,
+)
 from crm.fcrm.doctype.crm_form_script.crm_form_script import get_form_script
-from crm.utils import get_dynamic_linked_docs, get_linked_docs
+from crm.utils import get_linked_docs_of_names
+
+LIST_COUNT_CACHE_TTL = 60
+LIST_CONFIG_CACHE_TTL = 10 * 60
+LIST_CONFIG_GENERATION_KEY = "crm_list_config_generation"
+APPROXIMATE_COUNT_LIMIT = 10000
+FIELD_META_CACHE_TTL = 24 * 60 * 60
+FIELD_META_GENERATION_KEY = "crm_field_meta_generation"
+BULK_DELETE_CHUNK_SIZE = 100
+BULK_DELETE_EVENT = "crm_bulk_delete_progress"
+BULK_DELETE_STATE_TTL = 24 * 60 * 60
+DATA_CHANGES_LIMIT = 500
+# seconds the watermark stays behind the last modified record read, for slow commits
+DATA_CHANGES_OVERLAP = 5
+LIST_DIRTY_EVENT = "crm_list_dirty"
+LIVE_LIST_DOCTYPES = ("CRM Lead", "CRM Deal", "Contact", "CRM Organization", "CRM Task", "CRM Call Log")
+
+# fields a linked document's title is built from, other doctypes use their "title" field
+LINKED_DOC_TITLE_FIELDS = {
+	"CRM Call Log": ["from", "to"],
+	"CRM Deal": ["organization"],
+	"CRM Notification": ["message"],
+}
+
+
+def field_meta_cache(fn):
+	"""
+	Cache the field descriptors `fn(doctype, ...)` builds, per doctype, arguments and language,
+	until a DocType, Custom Field, Property Setter or quick filter setting changes. Calls with
+	`cached=False` build them again.
+	"""
+
+	@functools.wraps(fn)
+	def wrapper(doctype, *args, **kwargs):
+		if not frappe.utils.sbool(kwargs.get("cached", True)):
+			return fn(doctype, *args, **kwargs)
+
+		generation = frappe.utils.cint(frappe.cache.get(frappe.cache.make_key(FIELD_META_GENERATION_KEY)))
+		arguments = json.dumps([args, kwargs], sort_keys=True, default=str)
+		key = ":".join(
+			[
+				"crm_field_meta",
+				str(generation),
+				fn.__name__,
+				doctype,
+				frappe.local.lang or "",
+				hashlib.sha1(arguments.encode()).hexdigest(),
+			]
+		)
+
+		value = frappe.cache.get_value(key)
+		if value is None:
+			value = fn(doctype, *args, **kwargs)
+			frappe.cache.set_value(key, value, expires_in_sec=FIELD_META_CACHE_TTL)
+		return value
+
+	return wrapper
+
+
+def invalidate_field_meta_cache(doc=None, method=None):
+	frappe.cache.incr(frappe.cache.make_key(FIELD_META_GENERATION_KEY))
 
 
 @frappe.whitelist()
+@field_meta_cache
 def sort_options(doctype: str):
 	fields = frappe.get_meta(doctype).fields
 	fields = [field for field in fields if field.fieldtype not in no_value_fields]
@@ -45,6 +115,7 @@ def sort_options(doctype: str):
 
 
 @frappe.whitelist()
+@field_meta_cache
 def get_filterable_fields(doctype: str):
 	allowed_fieldtypes = [
 		"Check",
@@ -111,6 +182,7 @@ def get_filterable_fields(doctype: str):
 
 
 @frappe.whitelist()
+@field_meta_cache
 def get_group_by_fields(doctype: str):
 	allowed_fieldtypes = [
 		"Check",
@@ -181,6 +253,7 @@ def get_doctype_fields_meta(DocField, doctype, allowed_fieldtypes, restricted_fi
 
 
 @frappe.whitelist()
+@field_meta_cache
 def get_quick_filters(doctype: str, cached: bool = True):
 	meta = frappe.get_meta(doctype, cached)
 	quick_filters = []
@@ -244,6 +317,9 @@ def update_quick_filters(quick_filters: str, old_filters: str, doctype: str):
 	for filter in new_filters:
 		update_in_standard_filter(filter, doctype, 1)
 
+	# the settings and property setters were changed without hooks
+	invalidate_field_meta_cache()
+
 
 def create_update_global_settings(doctype, quick_filters):
 	if global_settings := frappe.db.exists("CRM Global Settings", {"dt": doctype, "type": "Quick Filters"}):
@@ -289,18 +365,212 @@ def get_data(
 	kanban_fields=[],
 	view=None,
 	default_filters=None,
+	cursor=None,
+	approximate_count=False,
+	config_version=None,
+	group_sum_field=None,
 ):
-	custom_view = False
-	filters = frappe._dict(filters)
-	rows = frappe.parse_json(rows or "[]")
-	columns = frappe.parse_json(columns or "[]")
+	"""
+	Get the records and view settings of a list, group by or kanban view.
+
+	Pass the `next_cursor` of a response as `cursor` (or as `cursor` of a kanban column) to get
+	only the next `page_length_count` records after it, instead of growing `page_length`.
+	With `approximate_count`, large totals are estimated, see `get_total_count`. With the
+	`config_version` of `get_list_config`, the unchanged view configuration is left out.
+
+	Group by views get the value, count and `group_sum_field` total of every group in
+	`group_by_field.groups`, load the records of a group with `get_group_data`.
+
+	`since` is the watermark to pass to `get_data_changes` to get what changed after this read.
+	"""
 	kanban_fields = frappe.parse_json(kanban_fields or "[]")
 	kanban_columns = frappe.parse_json(kanban_columns or "[]")
 
-	custom_view_name = view.get("custom_view_name") if view else None
-	view_type = view.get("view_type") if view else None
-	group_by_field = view.get("group_by_field") if view else None
+	view = frappe._dict(frappe.parse_json(view) or {})
+	view_type = view.get("view_type")
+	group_by_field = view.get("group_by_field")
+
+	filters = resolve_filters(filters, default_filters)
+	since = get_changes_watermark(doctype)
+
+	_list = get_controller(doctype)
+	config = get_list_config(doctype, view, columns, rows)
+	columns = copy.deepcopy(config["columns"])
+	rows = copy.deepcopy(config["rows"])
+	fields = config["fields"]
+	is_default = config["is_default"]
+
+	data, next_cursor = get_keyset_page(
+		doctype,
+		rows,
+		filters,
+		order_by,
+		page_length_count if cursor else page_length,
+		cursor,
+	)
+	data = parse_list_data(data, doctype)
+
+	if view_type == "kanban":
+		if not kanban_columns and column_field:
+			field_meta = frappe.get_meta(doctype).get_field(column_field)
+			if field_meta.fieldtype == "Link":
+				# For CRM Lead Status and CRM Deal Status, include color and position
+				if field_meta.options in ["CRM Lead Status", "CRM Deal Status"]:
+					fields_to_get = ["name", "color", "position"]
+					if field_meta.options == "CRM Deal Status":
+						fields_to_get.append("type")
+					
+					statuses = frappe.get_all(
+						field_meta.options,
+						fields=fields_to_get,
+						order_by="position asc",
+					)
+					
+					# Ensure red color is only used for Lost statuses (Deal) or similar negative statuses
+					for status in statuses:
+						# If it's a Deal Status and type is Lost, ensure color is red
+						if field_meta.options == "CRM Deal Status" and status.get("type") == "Lost":
+							if not status.get("color") or status.get("color") not in ["red"]:
+								status["color"] = "red"
+						# If it's a positive status with red color, change it to gray
+						elif status.get("color") == "red":
+							if field_meta.options == "CRM Deal Status" and status.get("type") not in ["Lost"]:
+								status["color"] = "gray"
+							elif field_meta.options == "CRM Lead Status":
+								# For Lead Status, we don't have a type field, so we'll keep red only if explicitly set
+								# But we'll default to gray for safety
+								status["color"] = status.get("color") or "gray"
+					
+					kanban_columns = statuses
+				else:
+					kanban_columns = frappe.get_all(
+						field_meta.options,
+						fields=["name"],
+						order_by="modified asc",
+					)
+			elif field_meta.fieldtype == "Select":
+				kanban_columns = [{"name": option} for option in field_meta.options.split("\n")]
+
+		if not title_field:
+			title_field = "name"
+			if hasattr(_list, "default_kanban_settings"):
+				title_field = _list.default_kanban_settings().get("title_field")
+
+		if title_field not in rows:
+			rows.append(title_field)
+
+		if not kanban_fields:
+			kanban_fields = ["name"]
+			if hasattr(_list, "default_kanban_settings"):
+				kanban_fields = json.loads(_list.default_kanban_settings().get("kanban_fields"))
+
+		for field in kanban_fields:
+			if field not in rows:
+				rows.append(field)
+
+		visible_columns = [
+			kc
+			for kc in kanban_columns
+			if not (column_field in filters and filters.get(column_field) != kc.get("name"))
+			and not kc.get("delete")
+		]
+		column_records, column_counts = get_kanban_records(
+			doctype, rows, filters, order_by, column_field, visible_columns
+		)
+
+		cards = []
+		for kc in kanban_columns:
+			order = kc.get("order")
+			if kc not in visible_columns:
+				column_data = []
+			else:
+				column_data = column_records.get(kc.get("name"), [])
+				kc["all_count"] = column_counts.get(kc.get("name"), 0)
+				kc["count"] = len(column_data)
+
+				cards.extend(column_data)
+
+			if order:
+				column_data = sorted(
+					column_data,
+					key=lambda x: order.index(x.get("name")) if x.get("name") in order else len(order),
+				)
+
+			data.append({"column": kc, "fields": kanban_fields, "data": column_data})
+
+		set_counts(cards, doctype)
+
+	if group_by_field and view_type == "group_by":
+		groups = get_group_summary(doctype, filters, group_by_field, group_sum_field)
+
+		def get_options(type, options):
+			if type == "Select":
+				return [option for option in options.split("\n")]
+			else:
+				options = [group.value for group in groups if group.value]
+				if any(not group.value for group in groups):
+					options.append("")
+
+				if order_by and group_by_field in order_by:
+					order_by_fields = order_by.split(",")
+					order_by_fields = [
+						(field.split(" ")[0], field.split(" ")[1]) for field in order_by_fields
+					]
+					if (group_by_field, "asc") in order_by_fields:
+						options.sort()
+					elif (group_by_field, "desc") in order_by_fields:
+						options.sort(reverse=True)
+				else:
+					options.sort()
+				return options
+
+		for field in fields:
+			if field.get("fieldname") == group_by_field:
+				group_by_field = {
+					"label": field.get("label"),
+					"fieldname": field.get("fieldname"),
+					"fieldtype": field.get("fieldtype"),
+					"options": get_options(field.get("fieldtype"), field.get("options")),
+					"groups": groups,
+				}
+
+	response = {
+		"data": data,
+		"rows": rows,
+		"column_field": column_field,
+		"title_field": title_field,
+		"kanban_columns": kanban_columns,
+		"kanban_fields": kanban_fields,
+		"group_by_field": group_by_field,
+		"page_length": page_length,
+		"page_length_count": page_length_count,
+		**get_total_count(doctype, filters, frappe.utils.sbool(approximate_count)),
+		"row_count": len(data),
+		"next_cursor": next_cursor,
+		"view_type": view_type,
+		"config_version": config["config_version"],
+		"since": since,
+	}
+
+	# the client already has this configuration, only send what changes with the data
+	if config_version != config["config_version"]:
+		response.update(
+			{
+				"columns": columns,
+				"fields": fields,
+				"is_default": is_default,
+				"views": config["views"],
+				"form_script": config["form_script"],
+				"list_script": config["list_script"],
+			}
+		)
+
+	return response
+
 
+def resolve_filters(filters, default_filters=None):
+	"""Replace "@me" in `filters` with the current user and add the `default_filters` of the view."""
+	filters = frappe._dict(frappe.parse_json(filters) or {})
 	for key in filters:
 		value = filters[key]
 		if isinstance(value, list):
@@ -317,8 +587,226 @@ def get_data(
 		default_filters = frappe.parse_json(default_filters)
 		filters.update(default_filters)
 
+	return filters
+
+
+def get_group_summary(doctype, filters, group_by_field, sum_field=None):
+	"""
+	Get the value, record count and optionally the total of the numeric `sum_field` of every
+	group of `group_by_field`, with one grouped query over all matching records. Empty and
+	unset values are one group with the value "".
+	"""
+	meta = frappe.get_meta(doctype)
+	if group_by_field not in default_fields and not meta.has_field(group_by_field):
+		frappe.throw(_("Cannot group by {0}").format(group_by_field))
+
+	column = f"`tab{doctype}`.`{group_by_field}`"
+	fields = [f"{column} as value", "count(*) as count"]
+	sum_df = meta.get_field(sum_field) if sum_field else None
+	if sum_df and sum_df.fieldtype in ("Currency", "Float", "Int", "Percent"):
+		fields.append(f"sum(`tab{doctype}`.`{sum_field}`) as sum")
+
+	groups = {}
+	for row in frappe.get_list(
+		doctype,
+		fields=fields,
+		filters=convert_filter_to_tuple(doctype, filters),
+		group_by=column,
+		order_by=f"{column} asc",
+	):
+		value = "" if row.value is None else row.value
+		group = groups.setdefault(value, frappe._dict(value=value, count=0))
+		group.count += row.count
+		if "sum" in row:
+			group.sum = (group.sum or 0) + (row.sum or 0)
+
+	return list(groups.values())
+
+
+@frappe.whitelist()
+def get_group_data(
+	doctype: str,
+	filters: dict,
+	order_by: str,
+	group_by_field: str,
+	group_value=None,
+	rows=None,
+	page_length=20,
+	cursor=None,
+	default_filters=None,
+):
+	"""
+	Get the next page of records of one group of a group by view, so groups load on their own
+	instead of with all records. Pass the `next_cursor` of a response as `cursor` to continue.
+	"""
+	filters = resolve_filters(filters, default_filters)
+	rows = frappe.parse_json(rows or "[]") or ["name"]
+	meta = frappe.get_meta(doctype)
+	if group_by_field not in default_fields and not meta.has_field(group_by_field):
+		frappe.throw(_("Cannot group by {0}").format(group_by_field))
+
+	filters[group_by_field] = group_value if group_value else ["is", "not set"]
+	data, next_cursor = get_keyset_page(doctype, rows, filters, order_by, page_length, cursor)
+
+	return {
+		"data": parse_list_data(data, doctype),
+		"row_count": len(data),
+		"next_cursor": next_cursor,
+	}
+
+
+@frappe.whitelist()
+def get_data_changes(
+	doctype: str,
+	filters: dict,
+	since: str,
+	rows=None,
+	default_filters=None,
+	group_by_field=None,
+	group_sum_field=None,
+	view_type=None,
+):
+	"""
+	Get the records of a list view inserted or modified after the `since` watermark, the names of
+	records deleted or no longer matching `filters` since then, and the updated counts. Clients
+	call it on `crm_list_dirty` events and continue from the returned `since`. With more than
+	`DATA_CHANGES_LIMIT` changes, only `reload` is returned, the view should be fetched again.
+
+	Kanban and group by views pass their column or `group_by_field` to also get the updated
+	`groups` of `get_group_summary`. Kanban cards get their activity counts.
+	"""
+	filters = resolve_filters(filters, default_filters)
+	since = frappe.utils.get_datetime(since)
+	rows = frappe.parse_json(rows or "[]")
+	rows = list(dict.fromkeys([*rows, *([group_by_field] if group_by_field else []), "name", "modified"]))
+	changed_after = [doctype, "modified", ">", since]
+
+	data = frappe.get_list(
+		doctype,
+		fields=rows,
+		filters=[*convert_filter_to_tuple(doctype, filters), changed_after],
+		order_by=f"`tab{doctype}`.`modified` asc",
+		page_length=DATA_CHANGES_LIMIT + 1,
+	)
+	# modified records, matching or not, the list may no longer show
+	changed = frappe.get_list(
+		doctype,
+		fields=["name", "modified"],
+		filters=[changed_after],
+		order_by=f"`tab{doctype}`.`modified` asc",
+		page_length=DATA_CHANGES_LIMIT + 1,
+	)
+	deleted = frappe.get_all(
+		"Deleted Document",
+		fields=["deleted_name", "creation"],
+		filters={"deleted_doctype": doctype, "creation": [">", since]},
+		order_by="creation asc",
+		page_length=DATA_CHANGES_LIMIT + 1,
+	)
+	if max(len(data), len(changed), len(deleted)) > DATA_CHANGES_LIMIT:
+		return {"reload": True}
+
+	matching = {d.name for d in data}
+	removed = [d.name for d in changed if d.name not in matching]
+	removed += [d.deleted_name for d in deleted]
+
+	data = parse_list_data(data, doctype)
+	if view_type == "kanban":
+		set_counts(data, doctype)
+
+	response = {
+		"data": data,
+		"removed": list(dict.fromkeys(removed)),
+		"since": get_changes_watermark(
+			doctype, [since, *(d.modified for d in changed), *(d.creation for d in deleted)]
+		),
+		**get_total_count(doctype, filters),
+	}
+	if group_by_field:
+		response["groups"] = get_group_summary(doctype, filters, group_by_field, group_sum_field)
+
+	return response
+
+
+def get_changes_watermark(doctype, modified=None):
+	"""
+	Get the `since` watermark of `get_data_changes`: the latest of the `modified` timestamps read,
+	or the last modified record of `doctype`, less `DATA_CHANGES_OVERLAP` seconds so records
+	of transactions committing later with an earlier timestamp are still pulled. It never goes
+	back before the previous watermark, the first of `modified`.
+	"""
+	if modified is None:
+		latest = frappe.db.sql(f"select max(`modified`) from `tab{doctype}`")[0][0]
+		if not latest:
+			return frappe.utils.now()
+		return str(frappe.utils.add_to_date(latest, seconds=-DATA_CHANGES_OVERLAP))
+
+	since = frappe.utils.get_datetime(modified[0])
+	latest = max(frappe.utils.get_datetime(m) for m in modified)
+	return str(max(since, frappe.utils.add_to_date(latest, seconds=-DATA_CHANGES_OVERLAP)))
+
+
+def publish_list_dirty(doc, method=None):
+	"""
+	Tell the open list views of the doctype of `doc` to pull its changes with `get_data_changes`,
+	once per transaction and doctype. Hooked on the `LIVE_LIST_DOCTYPES`.
+	"""
+	if doc.doctype not in LIVE_LIST_DOCTYPES:
+		return
+
+	published = frappe.flags.setdefault("crm_list_dirty", set())
+	if doc.doctype in published:
+		return
+
+	if not published:
+		# jobs commit many transactions, publish again after each
+		frappe.db.after_commit.add(published.clear)
+		frappe.db.after_rollback.add(published.clear)
+	published.add(doc.doctype)
+	frappe.publish_realtime(LIST_DIRTY_EVENT, {"doctype": doc.doctype}, after_commit=True)
+
+
+@frappe.whitelist()
+def get_list_config(doctype: str, view=None, columns=None, rows=None):
+	"""
+	Get the configuration of a list view: its columns and rows, the doctype fields, saved views
+	and form scripts. It rarely changes, so it is cached per user and versioned with a hash of its
+	content, returned as `config_version`. Pass it to `get_data` to only get the records.
+	"""
+	view = frappe._dict(frappe.parse_json(view) or {})
+	columns = frappe.parse_json(columns or "[]")
+	rows = frappe.parse_json(rows or "[]")
+
+	generation = frappe.utils.cint(frappe.cache.get(frappe.cache.make_key(LIST_CONFIG_GENERATION_KEY)))
+	arguments = json.dumps([view, columns, rows], sort_keys=True, default=str)
+	key = ":".join(
+		[
+			"crm_list_config",
+			str(generation),
+			frappe.session.user,
+			frappe.local.lang or "",
+			doctype,
+			hashlib.sha1(arguments.encode()).hexdigest(),
+		]
+	)
+
+	config = frappe.cache.get_value(key)
+	if config is None:
+		config = build_list_config(doctype, view, columns, rows)
+		content = json.dumps(config, sort_keys=True, default=str)
+		config["config_version"] = hashlib.sha1(content.encode()).hexdigest()
+		frappe.cache.set_value(key, config, expires_in_sec=LIST_CONFIG_CACHE_TTL)
+
+	return config
+
+
+def build_list_config(doctype, view, columns, rows):
+	custom_view = False
+	custom_view_name = view.get("custom_view_name")
+	view_type = view.get("view_type")
+	group_by_field = view.get("group_by_field")
+
 	is_default = True
-	data = []
 	_list = get_controller(doctype)
 	default_rows = []
 	if hasattr(_list, "default_list_data"):
@@ -400,127 +888,6 @@ def get_data(
 	if group_by_field and group_by_field not in rows:
 		rows.append(group_by_field)
 
-	data = (
-		frappe.get_list(
-			doctype,
-			fields=rows,
-			filters=filters,
-			order_by=order_by,
-			page_length=page_length,
-		)
-		or []
-	)
-	data = parse_list_data(data, doctype)
-
-	if view_type == "kanban":
-		if not rows:
-			rows = default_rows
-
-		if not kanban_columns and column_field:
-			field_meta = frappe.get_meta(doctype).get_field(column_field)
-			if field_meta.fieldtype == "Link":
-				# For CRM Lead Status and CRM Deal Status, include color and position
-				if field_meta.options in ["CRM Lead Status", "CRM Deal Status"]:
-					fields_to_get = ["name", "color", "position"]
-					if field_meta.options == "CRM Deal Status":
-						fields_to_get.append("type")
-					
-					statuses = frappe.get_all(
-						field_meta.options,
-						fields=fields_to_get,
-						order_by="position asc",
-					)
-					
-					# Ensure red color is only used for Lost statuses (Deal) or similar negative statuses
-					for status in statuses:
-						# If it's a Deal Status and type is Lost, ensure color is red
-						if field_meta.options == "CRM Deal Status" and status.get("type") == "Lost":
-							if not status.get("color") or status.get("color") not in ["red"]:
-								status["color"] = "red"
-						# If it's a positive status with red color, change it to gray
-						elif status.get("color") == "red":
-							if field_meta.options == "CRM Deal Status" and status.get("type") not in ["Lost"]:
-								status["color"] = "gray"
-							elif field_meta.options == "CRM Lead Status":
-								# For Lead Status, we don't have a type field, so we'll keep red only if explicitly set
-								# But we'll default to gray for safety
-								status["color"] = status.get("color") or "gray"
-					
-					kanban_columns = statuses
-				else:
-					kanban_columns = frappe.get_all(
-						field_meta.options,
-						fields=["name"],
-						order_by="modified asc",
-					)
-			elif field_meta.fieldtype == "Select":
-				kanban_columns = [{"name": option} for option in field_meta.options.split("\n")]
-
-		if not title_field:
-			title_field = "name"
-			if hasattr(_list, "default_kanban_settings"):
-				title_field = _list.default_kanban_settings().get("title_field")
-
-		if title_field not in rows:
-			rows.append(title_field)
-
-		if not kanban_fields:
-			kanban_fields = ["name"]
-			if hasattr(_list, "default_kanban_settings"):
-				kanban_fields = json.loads(_list.default_kanban_settings().get("kanban_fields"))
-
-		for field in kanban_fields:
-			if field not in rows:
-				rows.append(field)
-
-		for kc in kanban_columns:
-			column_filters = {column_field: kc.get("name")}
-			order = kc.get("order")
-			if (column_field in filters and filters.get(column_field) != kc.get("name")) or kc.get("delete"):
-				column_data = []
-			else:
-				column_filters.update(filters.copy())
-				page_length = 20
-
-				if kc.get("page_length"):
-					page_length = kc.get("page_length")
-
-				if order:
-					column_data = get_records_based_on_order(
-						doctype, rows, column_filters, page_length, order
-					)
-				else:
-					column_data = frappe.get_list(
-						doctype,
-						fields=rows,
-						filters=convert_filter_to_tuple(doctype, column_filters),
-						order_by=order_by,
-						page_length=page_length,
-					)
-
-				new_filters = filters.copy()
-				new_filters.update({column_field: kc.get("name")})
-
-				all_count = frappe.get_list(
-					doctype,
-					filters=convert_filter_to_tuple(doctype, new_filters),
-					fields="count(*) as total_count",
-				)[0].total_count
-
-				kc["all_count"] = all_count
-				kc["count"] = len(column_data)
-
-				for d in column_data:
-					getCounts(d, doctype)
-
-			if order:
-				column_data = sorted(
-					column_data,
-					key=lambda x: order.index(x.get("name")) if x.get("name") in order else len(order),
-				)
-
-			data.append({"column": kc, "fields": kanban_fields, "data": column_data})
-
 	fields = frappe.get_meta(doctype).fields
 	fields = [field for field in fields if field.fieldtype not in no_value_fields]
 	fields = [
@@ -559,64 +926,102 @@ def get_data(
 	if not is_default and custom_view_name:
 		is_default = frappe.db.get_value("CRM View Settings", custom_view_name, "load_default_columns")
 
-	if group_by_field and view_type == "group_by":
-
-		def get_options(type, options):
-			if type == "Select":
-				return [option for option in options.split("\n")]
-			else:
-				has_empty_values = any([not d.get(group_by_field) for d in data])
-				options = list(set([d.get(group_by_field) for d in data]))
-				options = [u for u in options if u]
-				if has_empty_values:
-					options.append("")
-
-				if order_by and group_by_field in order_by:
-					order_by_fields = order_by.split(",")
-					order_by_fields = [
-						(field.split(" ")[0], field.split(" ")[1]) for field in order_by_fields
-					]
-					if (group_by_field, "asc") in order_by_fields:
-						options.sort()
-					elif (group_by_field, "desc") in order_by_fields:
-						options.sort(reverse=True)
-				else:
-					options.sort()
-				return options
-
-		for field in fields:
-			if field.get("fieldname") == group_by_field:
-				group_by_field = {
-					"label": field.get("label"),
-					"fieldname": field.get("fieldname"),
-					"fieldtype": field.get("fieldtype"),
-					"options": get_options(field.get("fieldtype"), field.get("options")),
-				}
-
 	return {
-		"data": data,
 		"columns": columns,
 		"rows": rows,
 		"fields": fields,
-		"column_field": column_field,
-		"title_field": title_field,
-		"kanban_columns": kanban_columns,
-		"kanban_fields": kanban_fields,
-		"group_by_field": group_by_field,
-		"page_length": page_length,
-		"page_length_count": page_length_count,
 		"is_default": is_default,
 		"views": get_views(doctype),
-		"total_count": frappe.get_list(doctype, filters=filters, fields="count(*) as total_count")[
-			0
-		].total_count,
-		"row_count": len(data),
 		"form_script": get_form_script(doctype),
 		"list_script": get_form_script(doctype, "List"),
-		"view_type": view_type,
 	}
 
 
+def invalidate_list_config_cache(doc=None, method=None):
+	"""Drop the cached list configurations of all users, a view, script or doctype changed."""
+	frappe.cache.incr(frappe.cache.make_key(LIST_CONFIG_GENERATION_KEY))
+
+
+def get_total_count(doctype, filters, approximate=False):
+	"""
+	Count the records of `doctype` matching `filters` for the current user. Counts of
+	`LIVE_LIST_DOCTYPES` are cached for a short while per doctype, filters and user, and dropped
+	when a record of the doctype changes.
+
+	With `approximate`, counting stops at `APPROXIMATE_COUNT_LIMIT` records, and an unfiltered
+	count for an unrestricted user comes from the table statistics. `total_count_approximate`
+	is set when the count is a lower bound or an estimate, e.g. to show "10,000+".
+	"""
+	if doctype not in LIVE_LIST_DOCTYPES:
+		return count_records(doctype, filters, approximate)
+
+	key = ":".join(
+		[
+			"crm_list_count",
+			doctype,
+			str(frappe.utils.cint(frappe.cache.get(get_count_generation_key(doctype)))),
+			frappe.session.user,
+			"approximate" if approximate else "exact",
+			hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest(),
+		]
+	)
+
+	result = frappe.cache.get_value(key)
+	if result is None:
+		result = count_records(doctype, filters, approximate)
+		frappe.cache.set_value(key, result, expires_in_sec=LIST_COUNT_CACHE_TTL)
+
+	return result
+
+
+def count_records(doctype, filters, approximate=False):
+	if approximate:
+		return get_approximate_count(doctype, filters)
+
+	count = frappe.get_list(doctype, filters=filters, fields="count(*) as total_count")[0].total_count
+	return {"total_count": count, "total_count_approximate": False}
+
+
+def get_approximate_count(doctype, filters):
+	if not filters:
+		unrestricted_query = frappe.get_list(doctype, fields=["name"], run=0)
+		if " where " not in unrestricted_query.lower():
+			estimate = frappe.db.sql(
+				"""
+				SELECT TABLE_ROWS FROM information_schema.TABLES
+				WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+				""",
+				f"tab{doctype}",
+			)
+			if estimate and frappe.utils.cint(estimate[0][0]) > APPROXIMATE_COUNT_LIMIT:
+				return {"total_count": frappe.utils.cint(estimate[0][0]), "total_count_approximate": True}
+
+	limited_query = frappe.get_list(
+		doctype, fields=["name"], filters=filters, page_length=APPROXIMATE_COUNT_LIMIT + 1, run=0
+	)
+	# with values, the escaped % of like filters are unescaped again
+	count = frappe.db.sql(f"SELECT COUNT(*) FROM ({limited_query.replace('%', '%%')}) t", {})[0][0]
+	if count > APPROXIMATE_COUNT_LIMIT:
+		return {"total_count": APPROXIMATE_COUNT_LIMIT, "total_count_approximate": True}
+
+	return {"total_count": count, "total_count_approximate": False}
+
+
+def get_count_generation_key(doctype):
+	return frappe.cache.make_key(f"crm_list_count_generation:{doctype}")
+
+
+def invalidate_count_cache(doc, method=None):
+	"""
+	Drop the cached list counts of the doctype of `doc`. Hooked on the `LIVE_LIST_DOCTYPES`, the
+	only doctypes whose counts are cached.
+	"""
+	if doc.doctype not in LIVE_LIST_DOCTYPES:
+		return
+
+	frappe.cache.incr(get_count_generation_key(doc.doctype))
+
+
 def parse_list_data(data, doctype):
 	_list = get_controller(doctype)
 	if hasattr(_list, "parse_list_data"):
@@ -633,6 +1038,230 @@ def convert_filter_to_tuple(doctype, filters):
 	return filters
 
 
+def get_kanban_records(doctype, rows, filters, order_by, column_field, kanban_columns):
+	"""
+	Get the cards of all `kanban_columns` with a single windowed query, ranking the records of
+	each column value and keeping the first `page_length` (20 by default) of each. Columns with a
+	manual `order` rank its records first, like `get_records_based_on_order`. The column totals
+	come from one grouped count. Both go through `frappe.get_list`, so permissions apply.
+
+	Columns without a manual order get a `next_cursor` when they have more records. Columns
+	passing a `cursor` get the `page_length_count` records after it instead, see `get_keyset_page`.
+
+	Returns ({column: [records]}, {column: total_count}).
+	"""
+	if not kanban_columns:
+		return {}, {}
+
+	column_records = {}
+	for kc in kanban_columns:
+		if kc.get("cursor") and not kc.get("order"):
+			column_filters = convert_filter_to_tuple(doctype, filters)
+			column_filters.append([doctype, column_field, "=", kc.get("name")])
+			column_records[kc.get("name")], kc["next_cursor"] = get_keyset_page(
+				doctype,
+				rows,
+				column_filters,
+				order_by,
+				frappe.utils.cint(kc.get("page_length_count")) or 20,
+				kc.get("cursor"),
+			)
+
+	filters = convert_filter_to_tuple(doctype, filters)
+	filters.append([doctype, column_field, "in", [kc.get("name") for kc in kanban_columns]])
+
+	counts = frappe.get_list(
+		doctype,
+		fields=[f"{column_field} as column_name", "count(*) as total_count"],
+		filters=filters,
+		group_by=column_field,
+	)
+	counts = {row.column_name: row.total_count for row in counts}
+
+	kanban_columns = [kc for kc in kanban_columns if kc.get("name") not in column_records]
+	if not kanban_columns:
+		return column_records, counts
+
+	sort_fields = get_sort_fields(doctype, order_by)
+	fields = [*rows, column_field, "creation", *(field for field, direction in sort_fields)]
+	fields = list(dict.fromkeys(fields))
+	# values are already escaped into the query, only the placeholders added below are parameters
+	base_query = frappe.get_list(doctype, fields=fields, filters=filters, run=0).replace("%", "%%")
+
+	params = {}
+	priority, page_lengths, ordered_columns = [], [], []
+	for i, kc in enumerate(kanban_columns):
+		page_length = frappe.utils.cint(kc.get("page_length")) or 20
+		params[f"column_{i}"] = kc.get("name")
+		params[f"page_length_{i}"] = page_length
+		page_lengths.append(f"WHEN %(column_{i})s THEN %(page_length_{i})s")
+
+		order = kc.get("order")
+		if not order:
+			continue
+
+		in_column = f"b.`{column_field}` = %(column_{i})s"
+		ordered_columns.append(f"%(column_{i})s")
+		params[f"order_head_{i}"] = order[:page_length]
+		priority.append(f"WHEN {in_column} AND b.name IN %(order_head_{i})s THEN 0")
+		if order[page_length:]:
+			# ordered records past the page are left out, as in `get_records_based_on_order`
+			params[f"order_tail_{i}"] = order[page_length:]
+			priority.append(f"WHEN {in_column} AND b.name IN %(order_tail_{i})s THEN 2")
+
+	priority = f"CASE {' '.join(priority)} ELSE 1 END" if priority else "1"
+	ordering = ", ".join(f"t.`{field}` {direction}" for field, direction in sort_fields)
+	if ordered_columns:
+		# manually ordered columns fill up with their newest records, like `get_records_based_on_order`
+		in_ordered_column = f"t.`{column_field}` IN ({', '.join(ordered_columns)})"
+		ordering = f"CASE WHEN {in_ordered_column} THEN t.creation END DESC, {ordering}"
+
+	records = frappe.db.sql(
+		f"""
+		SELECT * FROM (
+			SELECT
+				t.*,
+				ROW_NUMBER() OVER (PARTITION BY t.`{column_field}` ORDER BY t._priority, {ordering}) AS _rank
+			FROM (
+				SELECT b.*, {priority} AS _priority FROM ({base_query}) b
+			) t
+			WHERE t._priority < 2
+		) ranked
+		WHERE _rank <= CASE `{column_field}` {" ".join(page_lengths)} ELSE 20 END
+		ORDER BY _rank
+		""",
+		params,
+		as_dict=True,
+	)
+
+	for record in records:
+		record.pop("_priority", None)
+		record.pop("_rank", None)
+		column_records.setdefault(record.get(column_field), []).append(record)
+
+	for i, kc in enumerate(kanban_columns):
+		records = column_records.get(kc.get("name")) or []
+		if not kc.get("order") and len(records) == params[f"page_length_{i}"]:
+			kc["next_cursor"] = encode_cursor(records[-1], sort_fields)
+
+	return column_records, counts
+
+
+def get_keyset_page(doctype, fields, filters, order_by, page_length, cursor=None):
+	"""
+	Get up to `page_length` records ordered by `order_by` and then name, starting after `cursor`.
+	Seeking past the cursor on the sort columns avoids reading the skipped rows again, unlike
+	growing the page length. Permissions apply, as the query wraps `frappe.get_list`.
+
+	Returns (records, next_cursor), next_cursor is None on the last page.
+	"""
+	page_length = frappe.utils.cint(page_length)
+	sort_fields = get_sort_fields(doctype, order_by)
+	fields = list(dict.fromkeys([*fields, *(field for field, direction in sort_fields)]))
+	filters = convert_filter_to_tuple(doctype, filters)
+	ordering = ", ".join(f"`{field}` {direction}" for field, direction in sort_fields)
+
+	if not cursor:
+		records = frappe.get_list(
+			doctype,
+			fields=fields,
+			filters=filters,
+			order_by=", ".join(f"`tab{doctype}`.`{field}` {direction}" for field, direction in sort_fields),
+			page_length=page_length,
+		)
+	else:
+		condition, params = get_keyset_condition(sort_fields, decode_cursor(cursor, sort_fields))
+		# values are already escaped into the query, only the cursor values are parameters
+		base_query = frappe.get_list(doctype, fields=fields, filters=filters, run=0).replace("%", "%%")
+		records = frappe.db.sql(
+			f"""
+			SELECT * FROM ({base_query}) b
+			WHERE {condition}
+			ORDER BY {ordering}
+			{"LIMIT %(page_length)s" if page_length else ""}
+			""",
+			{**params, "page_length": page_length},
+			as_dict=True,
+		)
+
+	next_cursor = None
+	if page_length and len(records) == page_length:
+		next_cursor = encode_cursor(records[-1], sort_fields)
+
+	return records or [], next_cursor
+
+
+def get_keyset_condition(sort_fields, values):
+	"""
+	Build the condition matching the rows after `values` in the order of `sort_fields`, e.g.
+	(a > x) OR (a = x AND b < y) for "a asc, b desc". NULLs sort first ascending and last
+	descending, as in MariaDB.
+	"""
+	conditions, params = [], {}
+	for i, (field, direction) in enumerate(sort_fields):
+		params[f"cursor_{i}"] = values[i]
+		if values[i] is None:
+			after = f"b.`{field}` IS NOT NULL" if direction == "asc" else "0"
+		elif direction == "asc":
+			after = f"b.`{field}` > %(cursor_{i})s"
+		else:
+			after = f"(b.`{field}` < %(cursor_{i})s OR b.`{field}` IS NULL)"
+
+		equal = [f"b.`{f}` <=> %(cursor_{j})s" for j, (f, d) in enumerate(sort_fields[:i])]
+		conditions.append("(" + " AND ".join([*equal, after]) + ")")
+
+	return " OR ".join(conditions), params
+
+
+def encode_cursor(record, sort_fields):
+	values = [record.get(field) for field, direction in sort_fields]
+	cursor = json.dumps({"fields": sort_fields, "values": values}, default=str)
+	return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def decode_cursor(cursor, sort_fields):
+	try:
+		cursor = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+	except ValueError:
+		frappe.throw(_("Invalid cursor"))
+
+	if [tuple(field) for field in cursor.get("fields") or []] != sort_fields:
+		frappe.throw(_("The sort order changed, reload the list"))
+
+	return cursor.get("values")
+
+
+def get_sort_fields(doctype, order_by):
+	"""
+	Parse `order_by` (e.g. "`tabCRM Lead`.modified desc, name asc") into (fieldname, direction)
+	pairs, dropping anything that is not a field of `doctype`.
+	"""
+	meta = frappe.get_meta(doctype)
+	sort_fields = []
+	for part in (order_by or "").split(","):
+		part = part.strip()
+		if not part:
+			continue
+
+		# the table name may contain spaces, only the last word can be the direction
+		field, _sep, direction = part.rpartition(" ")
+		if direction.lower() in ("asc", "desc"):
+			direction = direction.lower()
+		else:
+			field, direction = part, "asc"
+
+		fieldname = field.strip().split(".")[-1].strip().strip("`")
+		if fieldname in default_fields or meta.has_field(fieldname):
+			sort_fields.append((fieldname, direction))
+
+	sort_fields = sort_fields or [("modified", "desc")]
+	if "name" not in [field for field, direction in sort_fields]:
+		# break ties on name, so every record has a unique position to resume from
+		sort_fields.append(("name", sort_fields[-1][1]))
+
+	return sort_fields
+
+
 def get_records_based_on_order(doctype, rows, filters, page_length, order):
 	records = []
 	filters = convert_filter_to_tuple(doctype, filters)
@@ -663,6 +1292,7 @@ def get_records_based_on_order(doctype, rows, filters, page_length, order):
 
 
 @frappe.whitelist()
+@field_meta_cache
 def get_fields_meta(doctype, restricted_fieldtypes=None, as_array=False, only_required=False):
 	not_allowed_fieldtypes = [
 		"Tab Break",
@@ -754,6 +1384,7 @@ def get_assigned_users(doctype, name, default_assigned_to=None):
 
 
 @frappe.whitelist()
+@field_meta_cache
 def get_fields(doctype: str, allow_all_fieldtypes: bool = False):
 	not_allowed_fieldtypes = [*list(frappe.model.no_value_fields), "Read Only"]
 	if allow_all_fieldtypes:
@@ -770,75 +1401,76 @@ def get_fields(doctype: str, allow_all_fieldtypes: bool = False):
 
 
 def getCounts(d, doctype):
-	d["_email_count"] = (
-		frappe.db.count(
-			"Communication",
-			filters={
-				"reference_doctype": doctype,
-				"reference_name": d.get("name"),
-				"communication_type": "Communication",
-			},
-		)
-		or 0
-	)
-	d["_email_count"] = d["_email_count"] + frappe.db.count(
-		"Communication",
-		filters={
-			"reference_doctype": doctype,
-			"reference_name": d.get("name"),
-			"communication_type": "Automated Message",
-		},
-	)
-	d["_comment_count"] = frappe.db.count(
-		"Comment",
-		filters={"reference_doctype": doctype, "reference_name": d.get("name"), "comment_type": "Comment"},
-	)
-	d["_task_count"] = frappe.db.count(
-		"CRM Task", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
-	)
-	d["_note_count"] = frappe.db.count(
-		"FCRM Note", filters={"reference_doctype": doctype, "reference_docname": d.get("name")}
-	)
+	set_counts([d], doctype)
 	return d
 
 
+def set_counts(data, doctype):
+	"""
+	Set the email, comment, task and note counts of the kanban cards `data` in bulk, from the
+	stored counters if enabled in FCRM Settings and built, else with one grouped query per
+	activity table.
+	"""
+	names = [d.get("name") for d in data]
+	if activity_counters_built():
+		counts = get_stored_counts(doctype, names)
+	else:
+		counts = count_activities(doctype, names)
+
+	for d in data:
+		row = counts.get(d.get("name")) or {}
+		d["_email_count"] = row.get("email_count") or 0
+		d["_comment_count"] = row.get("comment_count") or 0
+		d["_task_count"] = row.get("task_count") or 0
+		d["_note_count"] = row.get("note_count") or 0
+
+	return data
+
+
 @frappe.whitelist()
 def get_linked_docs_of_document(doctype, docname):
-	try:
-		doc = frappe.get_doc(doctype, docname)
-	except frappe.DoesNotExistError:
+	if not frappe.db.exists(doctype, docname):
 		return []
 
-	linked_docs = get_linked_docs(doc)
-	dynamic_linked_docs = get_dynamic_linked_docs(doc)
+	linked_docs = get_linked_docs_of_names(doctype, [docname]).get(docname, [])
 
-	linked_docs.extend(dynamic_linked_docs)
-	linked_docs = list({doc["reference_docname"]: doc for doc in linked_docs}.values())
+	names_by_doctype = {}
+	for doc in linked_docs:
+		names_by_doctype.setdefault(doc["reference_doctype"], []).append(doc["reference_docname"])
+
+	# read the titles of all linked documents with one query per doctype
+	titles = {}
+	for reference_doctype, names in names_by_doctype.items():
+		fields = ["name", *LINKED_DOC_TITLE_FIELDS.get(reference_doctype, ["title"])]
+		fields = [f for f in fields if f == "name" or frappe.get_meta(reference_doctype).has_field(f)]
+		table = frappe.qb.DocType(reference_doctype)
+		for data in (
+			frappe.qb.from_(table)
+			.select(*[table[f] for f in fields])
+			.where(table.name.isin(names))
+			.run(as_dict=True)
+		):
+			title = data.get("title")
+			if reference_doctype == "CRM Call Log":
+				title = f"Call from {data.get('from')} to {data.get('to')}"
+
+			if reference_doctype == "CRM Deal":
+				title = data.get("organization")
+
+			if reference_doctype == "CRM Notification":
+				title = data.get("message")
+
+			titles[(reference_doctype, data.name)] = title or data.name
 
 	docs_data = []
 	for doc in linked_docs:
-		if not doc.get("reference_doctype") or not doc.get("reference_docname"):
-			continue
-
-		try:
-			data = frappe.get_doc(doc["reference_doctype"], doc["reference_docname"])
-		except (frappe.DoesNotExistError, frappe.ValidationError):
+		if (doc["reference_doctype"], doc["reference_docname"]) not in titles:
 			continue
 
-		title = data.get("title")
-		if data.doctype == "CRM Call Log":
-			title = f"Call from {data.get('from')} to {data.get('to')}"
-
-		if data.doctype == "CRM Deal":
-			title = data.get("organization")
-
-		if data.doctype == "CRM Notification":
-			title = data.get("message")
-
 		docs_data.append(
 			{
-				"doc": data.doctype,
-				"title": title or data.get("name"),
+				"doc": doc["reference_doctype"],
+				"title": titles[(doc["reference_doctype"], doc["reference_docname"])],
 				"reference_docname": doc["reference_docname"],
 				"reference_doctype": doc["reference_doctype"],
 			}
@@ -919,8 +1551,12 @@ def remove_linked_doc_reference(items, remove_contact=None, delete=False):
 
 @frappe.whitelist()
 def delete_bulk_docs(doctype, items, delete_linked=False):
-	from frappe.desk.reportview import delete_bulk
-
+	"""
+	Delete `items` of `doctype` in a background job, unlinking the documents linked to them or,
+	with `delete_linked`, deleting those too. Progress is pushed to the user as
+	`crm_bulk_delete_progress` events, a failed job continues where it stopped with
+	`resume_bulk_delete`.
+	"""
 	if not doctype:
 		frappe.throw("Doctype is required")
 
@@ -931,34 +1567,140 @@ def delete_bulk_docs(doctype, items, delete_linked=False):
 	if not isinstance(items, list):
 		frappe.throw("Items must be a list")
 
-	for doc in items:
+	frappe.has_permission(doctype, "delete", throw=True)
+
+	job_id = frappe.generate_hash(length=12)
+	set_bulk_delete_state(
+		job_id,
+		frappe._dict(
+			doctype=doctype,
+			items=items,
+			delete_linked=frappe.utils.sbool(delete_linked),
+			user=frappe.session.user,
+			done=0,
+			failed=[],
+			status="Queued",
+		),
+	)
+	enqueue_bulk_delete(job_id)
+	return {"job_id": job_id, "total": len(items)}
+
+
+@frappe.whitelist()
+def resume_bulk_delete(job_id):
+	"""Continue a bulk delete job that failed, from the first chunk that was not committed."""
+	state = get_bulk_delete_state(job_id)
+	if not state or state.user != frappe.session.user:
+		frappe.throw(_("Bulk delete job {0} not found").format(job_id), frappe.DoesNotExistError)
+
+	if state.status != "Completed":
+		enqueue_bulk_delete(job_id)
+
+	return {"job_id": job_id, "total": len(state["items"]), "done": state.done}
+
+
+def enqueue_bulk_delete(job_id):
+	frappe.enqueue(
+		run_bulk_delete,
+		queue="long",
+		job_id=f"crm_bulk_delete:{job_id}",
+		deduplicate=True,
+		bulk_delete_job_id=job_id,
+	)
+
+
+def run_bulk_delete(bulk_delete_job_id):
+	"""
+	Delete the remaining items of a bulk delete job in chunks of `BULK_DELETE_CHUNK_SIZE`,
+	committing and recording progress after each chunk so a failed job can be resumed.
+	"""
+	job_id = bulk_delete_job_id
+	state = get_bulk_delete_state(job_id)
+	if not state:
+		return
+
+	state.status = "Running"
+	try:
+		for chunk in frappe.utils.create_batch(state["items"][state.done :], BULK_DELETE_CHUNK_SIZE):
+			state.failed.extend(delete_docs_chunk(state.doctype, chunk, state.delete_linked))
+			frappe.db.commit()
+
+			state.done += len(chunk)
+			set_bulk_delete_state(job_id, state)
+			publish_bulk_delete_progress(job_id, state)
+	except Exception:
+		frappe.db.rollback()
+		state.status = "Failed"
+		set_bulk_delete_state(job_id, state)
+		publish_bulk_delete_progress(job_id, state)
+		raise
+
+	state.status = "Completed"
+	set_bulk_delete_state(job_id, state)
+	publish_bulk_delete_progress(job_id, state)
+
+
+def delete_docs_chunk(doctype, names, delete_linked=False):
+	"""
+	Unlink or delete the documents linked to `names`, resolved for the whole chunk at once, then
+	delete `names`. A linked document that cannot be unlinked, e.g. on a permission error, fails
+	the names linked to it. Returns the names that could not be deleted.
+	"""
+	linked_docs = get_linked_docs_of_names(doctype, names)
+	references = {}
+	for name, docs in linked_docs.items():
+		for linked_doc in docs:
+			if linked_doc.get("reference_doctype") and linked_doc.get("reference_docname"):
+				key = (linked_doc["reference_doctype"], linked_doc["reference_docname"])
+				references.setdefault(key, set()).add(name)
+
+	failed = set()
+	for (reference_doctype, reference_docname), linked_names in sorted(references.items()):
+		frappe.db.savepoint("crm_bulk_delete")
 		try:
-			if not frappe.db.exists(doctype, doc):
-				frappe.log_error(f"Document {doctype} {doc} does not exist", "Bulk Delete Error")
-				continue
-
-			linked_docs = get_linked_docs_of_document(doctype, doc)
-			for linked_doc in linked_docs:
-				if not linked_doc.get("reference_doctype") or not linked_doc.get("reference_docname"):
-					continue
-
-				remove_linked_doc_reference(
-					[
-						{
-							"doctype": linked_doc["reference_doctype"],
-							"docname": linked_doc["reference_docname"],
-						}
-					],
-					remove_contact=doctype == "Contact",
-					delete=delete_linked,
-				)
-		except Exception as e:
-			frappe.log_error(
-				f"Error processing linked docs for {doctype} {doc}: {str(e)}", "Bulk Delete Error"
+			remove_linked_doc_reference(
+				[{"doctype": reference_doctype, "docname": reference_docname}],
+				remove_contact=doctype == "Contact",
+				delete=delete_linked,
 			)
+		except Exception:
+			frappe.db.rollback(save_point="crm_bulk_delete")
+			frappe.log_error(title=f"Bulk Delete Error: {reference_doctype} {reference_docname}")
+			failed.update(linked_names)
 
-	if len(items) > 10:
-		frappe.enqueue("frappe.desk.reportview.delete_bulk", doctype=doctype, items=items)
-	else:
-		delete_bulk(doctype, items)
-	return "success"
+	for name in names:
+		if name in failed:
+			continue
+
+		frappe.db.savepoint("crm_bulk_delete")
+		try:
+			frappe.delete_doc(doctype, name, ignore_missing=True)
+		except Exception:
+			frappe.db.rollback(save_point="crm_bulk_delete")
+			frappe.log_error(title=f"Bulk Delete Error: {doctype} {name}")
+			failed.add(name)
+
+	return [name for name in names if name in failed]
+
+
+def get_bulk_delete_state(job_id):
+	return frappe.cache.get_value(f"crm_bulk_delete:{job_id}")
+
+
+def set_bulk_delete_state(job_id, state):
+	frappe.cache.set_value(f"crm_bulk_delete:{job_id}", state, expires_in_sec=BULK_DELETE_STATE_TTL)
+
+
+def publish_bulk_delete_progress(job_id, state):
+	frappe.publish_realtime(
+		BULK_DELETE_EVENT,
+		{
+			"job_id": job_id,
+			"doctype": state.doctype,
+			"total": len(state["items"]),
+			"done": state.done,
+			"failed": state.failed,
+			"status": state.status,
+		},
+		user=state.user,
+	)
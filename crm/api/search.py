@@ -0,0 +1,67 @@
+import re
+
+import frappe
+
+from crm.fcrm.doctype.crm_search_index.crm_search_index import SEARCH_DOCTYPES
+
+# candidates read from the index per requested result, the rest may be filtered out by permissions
+SEARCH_CANDIDATES_FACTOR = 5
+
+
+@frappe.whitelist()
+def global_search(query: str, doctypes=None, limit=20):
+	"""
+	Search leads, deals, contacts and organizations by name, organization, email, phone digits,
+	record name and product names. Every word of `query` must match the start of a word of the
+	record, results are ranked by relevance and only include records the user can read.
+	"""
+	limit = min(frappe.utils.cint(limit) or 20, 100)
+	doctypes = frappe.parse_json(doctypes) if doctypes else list(SEARCH_DOCTYPES)
+	doctypes = [dt for dt in doctypes if dt in SEARCH_DOCTYPES and frappe.has_permission(dt, "read")]
+
+	terms = get_search_terms(query)
+	if not terms or not doctypes:
+		return []
+
+	candidates = frappe.db.sql(
+		"""
+		SELECT reference_doctype, reference_name, title,
+			MATCH(content) AGAINST (%(terms)s IN BOOLEAN MODE) AS score
+		FROM `tabCRM Search Index`
+		WHERE MATCH(content) AGAINST (%(terms)s IN BOOLEAN MODE)
+			AND reference_doctype IN %(doctypes)s
+		ORDER BY score DESC
+		LIMIT %(limit)s
+		""",
+		{"terms": terms, "doctypes": doctypes, "limit": limit * SEARCH_CANDIDATES_FACTOR},
+		as_dict=True,
+	)
+
+	permitted = set()
+	for doctype in doctypes:
+		names = [c.reference_name for c in candidates if c.reference_doctype == doctype]
+		if names:
+			permitted.update(
+				(doctype, name)
+				for name in frappe.get_list(doctype, filters={"name": ["in", names]}, pluck="name")
+			)
+
+	return [
+		{
+			"doctype": c.reference_doctype,
+			"name": c.reference_name,
+			"title": c.title,
+			"score": c.score,
+		}
+		for c in candidates
+		if (c.reference_doctype, c.reference_name) in permitted
+	][:limit]
+
+
+def get_search_terms(query):
+	"""
+	Turn `query` into a boolean full text search requiring a prefix match of every word, e.g.
+	"john acme" -> "+john* +acme*". Operators typed by the user are dropped.
+	"""
+	words = re.findall(r"\w+", query or "")
+	return " ".join(f"+{word}*" for word in words)
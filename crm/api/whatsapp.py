@@ -1,14 +1,27 @@
+import base64
 import json
+import re
 
 import frappe
 from frappe import _
 
 from crm.api.doc import get_assigned_users
 from crm.fcrm.doctype.crm_notification.crm_notification import notify_user
+from crm.install import add_whatsapp_message_custom_fields
 from crm.integrations.api import get_contact_lead_or_deal_from_number
 
+# indexed columns holding the digits of `from` and `to`, added by crm.install
+PHONE_DIGITS_FIELDS = {"from": "from_digits", "to": "to_digits"}
+# set once the digits of the existing messages are filled in, see `backfill_phone_digits`
+PHONE_DIGITS_BACKFILLED_KEY = "crm_whatsapp_phone_digits_backfilled_on"
+# seconds the `since` watermark stays behind the last modified message read, for slow commits
+MESSAGES_SINCE_OVERLAP = 5
+
 
 def validate(doc, method):
+	for field, digits_field in PHONE_DIGITS_FIELDS.items():
+		doc.set(digits_field, get_phone_digits(doc.get(field)))
+
 	# Ensure incoming messages never have label="Manual"
 	# Manual label is only for outgoing messages sent from CRM (not from AI)
 	if doc.type == "Incoming":
@@ -39,6 +52,7 @@ def on_update(doc, method):
 			"reference_doctype": doc.reference_doctype,
 			"reference_name": doc.reference_name,
 		},
+		after_commit=True,
 	)
 
 	notify_agent(doc)
@@ -84,6 +98,9 @@ def is_whatsapp_enabled():
 def is_whatsapp_installed():
 	if not frappe.db.exists("DocType", "WhatsApp Settings"):
 		return False
+	if frappe.db.exists("DocType", "WhatsApp Message") and not use_phone_digits():
+		# frappe_whatsapp was installed after CRM, or its messages are not backfilled yet
+		enqueue_setup_phone_digits()
 	return True
 
 
@@ -96,59 +113,13 @@ def get_whatsapp_messages(reference_doctype, reference_name):
 	if not frappe.db.exists("DocType", "WhatsApp Message"):
 		return []
 	
-	# Get phone number from Lead or Deal
-	phone_numbers = []
-	
-	if reference_doctype and reference_name:
-		try:
-			ref_doc = frappe.get_doc(reference_doctype, reference_name)
-			mobile_no = ref_doc.get("mobile_no")
-			if mobile_no:
-				phone_numbers.append(mobile_no)
-			
-			# For Deal, also get phone from associated Lead
-			if reference_doctype == "CRM Deal":
-				lead = ref_doc.get("lead")
-				if lead:
-					lead_doc = frappe.get_doc("CRM Lead", lead)
-					lead_mobile = lead_doc.get("mobile_no")
-					if lead_mobile:
-						phone_numbers.append(lead_mobile)
-		except Exception:
-			pass
-	
-	if not phone_numbers:
-		return []
-	
-	# Normalize phone numbers: remove spaces, dashes, parentheses, and +
-	# This function normalizes a phone number for comparison
-	def normalize_phone(phone):
-		if not phone:
-			return ""
-		return phone.strip().replace(" ", "").replace("-", "").replace("(", "").replace(")", "").replace("+", "")
-	
-	normalized_phones = [normalize_phone(p) for p in phone_numbers if p]
-	
-	if not normalized_phones:
+	phone_digits = get_conversation_phone_digits(reference_doctype, reference_name)
+
+	if not phone_digits:
 		return []
-	
+
 	# Get ALL messages (incoming and outgoing) for these phone numbers
-	# Normalize phone numbers in SQL for comparison
-	messages = frappe.db.sql("""
-		SELECT 
-			name, type, `to`, `from`, profile_name, content_type, message_type,
-			attach, template, use_template, message_id, is_reply, reply_to_message_id,
-			creation, message, status, reference_doctype, reference_name,
-			template_parameters, template_header_parameters
-		FROM `tabWhatsApp Message`
-		WHERE (
-			REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(`from`, ' ', ''), '-', ''), '(', ''), ')', ''), '+', '') IN %(normalized_phones)s
-			OR REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(`to`, ' ', ''), '-', ''), '(', ''), ')', ''), '+', '') IN %(normalized_phones)s
-		)
-		ORDER BY creation ASC
-	""", {
-		"normalized_phones": normalized_phones,
-	}, as_dict=True)
+	messages = get_conversation_messages(phone_digits)
 
 	# Filter messages to get only Template messages
 	template_messages = [message for message in messages if message["message_type"] == "Template"]
@@ -160,17 +131,7 @@ def get_whatsapp_messages(reference_doctype, reference_name):
 
 		# If the template is found, add the template details to the template message
 		if template:
-			template_message["template_name"] = template.template_name
-			if template_message["template_parameters"]:
-				parameters = json.loads(template_message["template_parameters"])
-				template.template = parse_template_parameters(template.template, parameters)
-
-			template_message["template"] = template.template or ""
-			if template_message["template_header_parameters"]:
-				header_parameters = json.loads(template_message["template_header_parameters"])
-				template.header = parse_template_parameters(template.header, header_parameters)
-			template_message["header"] = template.header or ""
-			template_message["footer"] = template.footer or ""
+			set_template_details(template_message, template)
 
 	# Filter messages to get only reaction messages
 	reaction_messages = [message for message in messages if message["content_type"] == "reaction"]
@@ -246,16 +207,7 @@ def get_whatsapp_messages(reference_doctype, reference_name):
 				if replied_message.get("message_type") == "Template" and replied_message.get("template"):
 					template = frappe.get_doc("WhatsApp Templates", replied_message["template"])
 					if template:
-						replied_message["template_name"] = template.template_name
-						if replied_message.get("template_parameters"):
-							parameters = json.loads(replied_message["template_parameters"])
-							template.template = parse_template_parameters(template.template, parameters)
-						replied_message["template"] = template.template or ""
-						if replied_message.get("template_header_parameters"):
-							header_parameters = json.loads(replied_message["template_header_parameters"])
-							template.header = parse_template_parameters(template.header, header_parameters)
-						replied_message["header"] = template.header or ""
-						replied_message["footer"] = template.footer or ""
+						set_template_details(replied_message, template)
 
 		# If the replied message is found, add the reply details to the reply message
 		if replied_message:
@@ -286,6 +238,176 @@ def get_whatsapp_messages(reference_doctype, reference_name):
 	return [message for message in messages if message["content_type"] != "reaction"]
 
 
+@frappe.whitelist()
+def get_whatsapp_messages_page(reference_doctype, reference_name, cursor=None, limit=50, since=None):
+	"""
+	Get a window of the conversation with a lead or deal, oldest first: its latest `limit` messages,
+	or the ones before `cursor`, the `next_cursor` of the previous page. With `since`, the `since`
+	of a previous response, get the messages added or updated after it instead, e.g. on a status
+	change or a new reaction. Templates, reactions and replies are only resolved for the window.
+	"""
+	empty = {"messages": [], "next_cursor": None, "since": frappe.utils.now()}
+	if "twilio_integration" in frappe.get_installed_apps():
+		return empty
+	if not frappe.db.exists("DocType", "WhatsApp Message"):
+		return empty
+
+	frappe.has_permission(reference_doctype, "read", reference_name, throw=True)
+	phone_digits = get_conversation_phone_digits(reference_doctype, reference_name)
+	if not phone_digits:
+		return empty
+
+	next_cursor = None
+	if since:
+		messages = get_conversation_messages(
+			phone_digits, "modified > %(since)s", {"since": frappe.utils.get_datetime(since)}
+		)
+		since = get_messages_watermark([m["modified"] for m in messages], since)
+		reactions = [m for m in messages if m["content_type"] == "reaction"]
+		messages = [m for m in messages if m["content_type"] != "reaction"]
+		messages += get_reacted_messages(reactions, messages)
+		messages.sort(key=lambda m: (m["creation"], m["name"]))
+	else:
+		limit = min(frappe.utils.cint(limit) or 50, 500)
+		conditions = "IFNULL(content_type, '') != 'reaction'"
+		values = {}
+		if cursor := decode_messages_cursor(cursor):
+			conditions += " AND (creation < %(creation)s OR (creation = %(creation)s AND name < %(name)s))"
+			values = cursor
+		messages = get_conversation_messages(phone_digits, conditions, values, "desc", limit + 1)
+		if len(messages) > limit:
+			messages = messages[:limit]
+			next_cursor = encode_messages_cursor(messages[-1])
+		messages.reverse()
+		since = get_messages_watermark([m["modified"] for m in messages])
+
+	return {"messages": enrich_messages(messages), "next_cursor": next_cursor, "since": since}
+
+
+def get_messages_watermark(modified, since=None):
+	"""
+	Get the `since` of `get_whatsapp_messages_page`: the latest of the `modified` timestamps read
+	less `MESSAGES_SINCE_OVERLAP` seconds, so messages of transactions committing later with an
+	earlier timestamp are still pulled. It never goes back before the previous `since`.
+	"""
+	latest = max(modified, default=None) or frappe.utils.now_datetime()
+	watermark = frappe.utils.add_to_date(latest, seconds=-MESSAGES_SINCE_OVERLAP)
+	if since:
+		watermark = max(watermark, frappe.utils.get_datetime(since))
+	return str(watermark)
+
+
+def get_reacted_messages(reactions, messages):
+	"""Get the messages `reactions` react to that are not in `messages`, so their reaction is refreshed."""
+	in_window = {m["message_id"] for m in messages}
+	message_ids = list({r["reply_to_message_id"] for r in reactions} - in_window - {None, ""})
+	if not message_ids:
+		return []
+
+	return frappe.get_all(
+		"WhatsApp Message", filters={"message_id": ["in", message_ids]}, fields=MESSAGE_FIELDS
+	)
+
+
+def enrich_messages(messages):
+	"""
+	Add the template, reaction, reply and sender details to `messages`, none of them reactions,
+	with one query for the reactions and one for the replied messages outside of `messages`.
+	"""
+	templates = {}
+
+	def set_template(message):
+		if message.get("message_type") != "Template" or not message.get("template"):
+			return
+		if message["template"] not in templates:
+			templates[message["template"]] = frappe.get_cached_doc("WhatsApp Templates", message["template"])
+		set_template_details(message, templates[message["template"]])
+
+	for message in messages:
+		set_template(message)
+
+	# the latest reaction to a message is shown on it
+	by_message_id = {m["message_id"]: m for m in messages if m["message_id"]}
+	if by_message_id:
+		for reaction in frappe.get_all(
+			"WhatsApp Message",
+			filters={"content_type": "reaction", "reply_to_message_id": ["in", list(by_message_id)]},
+			fields=["reply_to_message_id", "message"],
+			order_by="creation asc",
+		):
+			by_message_id[reaction.reply_to_message_id]["reaction"] = reaction.message
+
+	missing = {m["reply_to_message_id"] for m in messages if m["is_reply"]} - set(by_message_id) - {None, ""}
+	if missing:
+		for replied_message in frappe.get_all(
+			"WhatsApp Message", filters={"message_id": ["in", list(missing)]}, fields=MESSAGE_FIELDS
+		):
+			set_template(replied_message)
+			by_message_id.setdefault(replied_message.message_id, replied_message)
+
+	from_names = {}
+
+	def get_sender(message):
+		if not message.get("from"):
+			return _("You")
+		key = (message.get("reference_doctype"), message.get("reference_name"))
+		if not all(key):
+			return get_from_name(message)
+		if key not in from_names:
+			from_names[key] = get_from_name(message)
+		return from_names[key]
+
+	for message in messages:
+		message["from_name"] = get_sender(message)
+		if message["is_reply"] and (replied_message := by_message_id.get(message["reply_to_message_id"])):
+			reply = replied_message.get("message") or ""
+			if replied_message.get("message_type") == "Template":
+				reply = replied_message.get("template") or ""
+			message["reply_message"] = reply
+			message["header"] = replied_message.get("header") or ""
+			message["footer"] = replied_message.get("footer") or ""
+			message["reply_to"] = replied_message.get("name") or ""
+			message["reply_to_type"] = replied_message.get("type") or ""
+			message["reply_to_from"] = get_sender(replied_message)
+
+		if message.get("message") is None:
+			message["message"] = ""
+		if message.get("template") is None:
+			message["template"] = ""
+
+	return messages
+
+
+def set_template_details(message, template):
+	"""Render the template of a Template `message` with its parameters."""
+	message["template_name"] = template.template_name
+	body, header = template.template, template.header
+	if message.get("template_parameters"):
+		body = parse_template_parameters(body, json.loads(message["template_parameters"]))
+	if message.get("template_header_parameters"):
+		header = parse_template_parameters(header, json.loads(message["template_header_parameters"]))
+
+	message["template"] = body or ""
+	message["header"] = header or ""
+	message["footer"] = template.footer or ""
+
+
+def encode_messages_cursor(message):
+	data = json.dumps({"creation": str(message["creation"]), "name": message["name"]})
+	return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_messages_cursor(cursor):
+	if not cursor:
+		return None
+
+	try:
+		data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+		return {"creation": frappe.utils.get_datetime(data["creation"]), "name": str(data["name"])}
+	except Exception:
+		frappe.throw(_("Invalid cursor"))
+
+
 @frappe.whitelist()
 def create_whatsapp_message(
 	reference_doctype,
@@ -375,6 +497,163 @@ def react_on_whatsapp_message(emoji, reply_to_name):
 	return doc.name
 
 
+MESSAGE_FIELDS = [
+	"name",
+	"type",
+	"to",
+	"from",
+	"profile_name",
+	"content_type",
+	"message_type",
+	"attach",
+	"template",
+	"use_template",
+	"message_id",
+	"is_reply",
+	"reply_to_message_id",
+	"creation",
+	"modified",
+	"message",
+	"status",
+	"reference_doctype",
+	"reference_name",
+	"template_parameters",
+	"template_header_parameters",
+]
+
+
+def get_phone_digits(phone):
+	"""Normalize a phone number for comparison, e.g. "+91 (987) 654-3210" -> "919876543210"."""
+	return re.sub(r"\D", "", phone or "")
+
+
+def has_phone_digits():
+	meta = frappe.get_meta("WhatsApp Message")
+	return all(meta.has_field(field) for field in PHONE_DIGITS_FIELDS.values())
+
+
+def use_phone_digits():
+	"""The digits columns can be queried once they exist and the existing messages are backfilled."""
+	return has_phone_digits() and bool(frappe.db.get_default(PHONE_DIGITS_BACKFILLED_KEY))
+
+
+def get_conversation_phone_digits(reference_doctype, reference_name):
+	"""Get the digits of the mobile numbers of the lead or deal, and of the lead of a deal."""
+	phone_numbers = []
+
+	if reference_doctype and reference_name:
+		try:
+			ref_doc = frappe.get_doc(reference_doctype, reference_name)
+			mobile_no = ref_doc.get("mobile_no")
+			if mobile_no:
+				phone_numbers.append(mobile_no)
+
+			# For Deal, also get phone from associated Lead
+			if reference_doctype == "CRM Deal":
+				lead = ref_doc.get("lead")
+				if lead:
+					lead_mobile = frappe.db.get_value("CRM Lead", lead, "mobile_no")
+					if lead_mobile:
+						phone_numbers.append(lead_mobile)
+		except Exception:
+			pass
+
+	return list({get_phone_digits(p) for p in phone_numbers} - {""})
+
+
+def get_conversation_messages(phone_digits, conditions=None, values=None, order="asc", limit=None):
+	"""
+	Get the messages sent from or to any of `phone_digits` matching the SQL `conditions`, ordered by
+	creation, oldest first by default.
+	"""
+	fields = ", ".join(f"`{field}`" for field in MESSAGE_FIELDS)
+	values = {"phone_digits": phone_digits, **(values or {})}
+	conditions = f"AND ({conditions})" if conditions else ""
+	order_by = f"ORDER BY creation {order}, name {order}"
+	if limit:
+		order_by += " LIMIT %(limit)s"
+		values["limit"] = limit
+
+	if use_phone_digits():
+		# one indexed lookup per column
+		lookups = [
+			f"""(
+				SELECT {fields} FROM `tabWhatsApp Message`
+				WHERE `{field}` IN %(phone_digits)s {conditions}
+				{order_by}
+			)"""
+			for field in PHONE_DIGITS_FIELDS.values()
+		]
+		return frappe.db.sql(f"{' UNION '.join(lookups)} {order_by}", values, as_dict=True)
+
+	# until the columns are added and backfilled, see `setup_phone_digits`, normalize every row
+	return frappe.db.sql(
+		f"""
+		SELECT {fields}
+		FROM `tabWhatsApp Message`
+		WHERE (
+			REGEXP_REPLACE(`from`, '[^0-9]', '') IN %(phone_digits)s
+			OR REGEXP_REPLACE(`to`, '[^0-9]', '') IN %(phone_digits)s
+		) {conditions}
+		{order_by}
+		""",
+		values,
+		as_dict=True,
+	)
+
+
+def enqueue_setup_phone_digits():
+	frappe.enqueue(
+		setup_phone_digits,
+		queue="long",
+		job_id="crm_whatsapp_phone_digits",
+		deduplicate=True,
+	)
+
+
+def setup_phone_digits():
+	"""Add the digits columns of WhatsApp Message if missing and fill them for the existing messages."""
+	add_whatsapp_message_custom_fields()
+	backfill_phone_digits()
+
+
+def backfill_phone_digits(batch_size=5000):
+	"""
+	Set the digits columns of the existing messages:
+
+	bench --site <site> execute crm.api.whatsapp.backfill_phone_digits
+	"""
+	if not frappe.db.exists("DocType", "WhatsApp Message") or not has_phone_digits():
+		return
+
+	last_name = ""
+	while True:
+		names = frappe.get_all(
+			"WhatsApp Message",
+			filters={"name": [">", last_name]},
+			order_by="name asc",
+			limit=batch_size,
+			pluck="name",
+		)
+		if not names:
+			break
+
+		frappe.db.sql(
+			"""
+			UPDATE `tabWhatsApp Message`
+			SET from_digits = REGEXP_REPLACE(IFNULL(`from`, ''), '[^0-9]', ''),
+				to_digits = REGEXP_REPLACE(IFNULL(`to`, ''), '[^0-9]', '')
+			WHERE name IN %(names)s
+			""",
+			{"names": names},
+		)
+		frappe.db.commit()
+		last_name = names[-1]
+
+	frappe.db.set_default(PHONE_DIGITS_BACKFILLED_KEY, frappe.utils.now())
+	frappe.db.commit()
+
+
 def parse_template_parameters(string, parameters):
 	for i, parameter in enumerate(parameters, start=1):
 		placeholder = "{{" + str(i) + "}}"
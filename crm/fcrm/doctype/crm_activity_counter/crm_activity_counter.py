@@ -0,0 +1,153 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import create_batch, now
+
+COUNTED_DOCTYPES = ("CRM Lead", "CRM Deal")
+
+# counter -> (source doctype, field linking to the record, extra filters)
+ACTIVITY_SOURCES = {
+	"email_count": (
+		"Communication",
+		"reference_name",
+		{"communication_type": ["in", ["Communication", "Automated Message"]]},
+	),
+	"comment_count": ("Comment", "reference_name", {"comment_type": "Comment"}),
+	"task_count": ("CRM Task", "reference_docname", {}),
+	"note_count": ("FCRM Note", "reference_docname", {}),
+}
+
+ACTIVITY_COUNTERS_BUILT_KEY = "crm_activity_counters_built_on"
+
+
+class CRMActivityCounter(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Activity Counter", ["reference_doctype", "reference_name"])
+
+
+def is_enabled():
+	return frappe.db.get_single_value("FCRM Settings", "store_activity_counters", cache=True)
+
+
+def is_built():
+	"""The counters can serve kanban cards once enabled and rebuilt, see `rebuild_activity_counters`."""
+	return is_enabled() and bool(frappe.db.get_default(ACTIVITY_COUNTERS_BUILT_KEY))
+
+
+def count_activities(doctype, names):
+	"""
+	Count the activities of the records `names` of `doctype`, with one grouped query per source.
+	Returns {name: {counter: count}} with every counter set.
+	"""
+	counts = {name: dict.fromkeys(ACTIVITY_SOURCES, 0) for name in names}
+	if not names:
+		return counts
+
+	for counter, (source, link_field, filters) in ACTIVITY_SOURCES.items():
+		rows = frappe.get_all(
+			source,
+			filters={**filters, "reference_doctype": doctype, link_field: ["in", list(names)]},
+			fields=[f"{link_field} as name", "count(*) as count"],
+			group_by=link_field,
+		)
+		for row in rows:
+			if row.name in counts:
+				counts[row.name][counter] = row.count
+
+	return counts
+
+
+def get_stored_counts(doctype, names):
+	"""Read the stored counters of `names`, records without a counter row have no activities."""
+	counts = {name: dict.fromkeys(ACTIVITY_SOURCES, 0) for name in names}
+	if not names:
+		return counts
+
+	rows = frappe.get_all(
+		"CRM Activity Counter",
+		filters={"reference_doctype": doctype, "reference_name": ["in", list(names)]},
+		fields=["reference_name", *ACTIVITY_SOURCES],
+	)
+	for row in rows:
+		counts[row.reference_name] = {counter: row[counter] for counter in ACTIVITY_SOURCES}
+
+	return counts
+
+
+def update_activity_counter(doc, method=None):
+	"""
+	Recount the activities of the Lead/Deal `doc` is linked to, and of the one it was linked to
+	before if that changed. Hooked on on_update (which also runs on insert) and after_delete of
+	Communication, Comment, CRM Task and FCRM Note.
+	"""
+	if not is_enabled():
+		return
+
+	references = {get_reference(doc)}
+	if method == "on_update":
+		references.add(get_reference(doc.get_doc_before_save()))
+
+	for doctype, name in references:
+		if doctype in COUNTED_DOCTYPES and name:
+			store_counts(doctype, count_activities(doctype, [name]))
+
+
+def get_reference(doc):
+	if not doc:
+		return (None, None)
+	return (doc.get("reference_doctype"), doc.get("reference_name") or doc.get("reference_docname"))
+
+
+def delete_activity_counter(doc, method=None):
+	frappe.db.delete("CRM Activity Counter", {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def store_counts(doctype, counts):
+	"""Upsert the counters of `counts` ({name: {counter: count}}) for `doctype`."""
+	timestamp, user = now(), frappe.session.user
+	columns = ["name", "creation", "modified", "owner", "modified_by", "reference_doctype", "reference_name"]
+	columns += list(ACTIVITY_SOURCES)
+	placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+	updates = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in [*ACTIVITY_SOURCES, "modified"])
+
+	for batch in create_batch(list(counts.items()), 500):
+		values = []
+		for name, row in batch:
+			counter_name = hashlib.sha1(f"{doctype}|{name}".encode()).hexdigest()
+			values.extend([counter_name, timestamp, timestamp, user, user, doctype, name])
+			values.extend(row[counter] for counter in ACTIVITY_SOURCES)
+
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabCRM Activity Counter` ({", ".join(f"`{c}`" for c in columns)})
+			VALUES {", ".join([placeholders] * len(batch))}
+			ON DUPLICATE KEY UPDATE {updates}
+			""",
+			values,
+		)
+
+
+def rebuild_activity_counters():
+	"""
+	Recount the activities of every Lead/Deal, e.g. when the counters are enabled:
+
+	bench --site <site> execute crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.rebuild_activity_counters
+	"""
+	# count from the sources until the counters are complete again
+	frappe.db.set_default(ACTIVITY_COUNTERS_BUILT_KEY, "")
+	frappe.db.delete("CRM Activity Counter")
+
+	for doctype in COUNTED_DOCTYPES:
+		names = frappe.get_all(doctype, pluck="name")
+		for batch in create_batch(names, 1000):
+			store_counts(doctype, count_activities(doctype, batch))
+			frappe.db.commit()
+
+	frappe.db.set_default(ACTIVITY_COUNTERS_BUILT_KEY, now())
@@ -0,0 +1,71 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_days, nowdate
+
+from crm.fcrm.doctype.crm_activity_counter.crm_activity_counter import get_stored_counts
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestCRMActivityCounter(UnitTestCase):
+	"""
+	Unit tests for CRMActivityCounter.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestCRMActivityCounter(IntegrationTestCase):
+	"""
+	Integration tests for CRMActivityCounter.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_counters_follow_activity_moved_to_another_record(self):
+		first, second = make_deal(), make_deal()
+
+		with patch(
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.is_enabled", return_value=True
+		):
+			note = frappe.get_doc(
+				{
+					"doctype": "FCRM Note",
+					"title": "_Test Note",
+					"reference_doctype": "CRM Deal",
+					"reference_docname": first.name,
+				}
+			).insert(ignore_permissions=True)
+			self.assertEqual(self.get_note_counts(first, second), [1, 0])
+
+			note.reference_docname = second.name
+			note.save(ignore_permissions=True)
+			self.assertEqual(self.get_note_counts(first, second), [0, 1])
+
+			note.delete(ignore_permissions=True)
+			self.assertEqual(self.get_note_counts(first, second), [0, 0])
+
+	def get_note_counts(self, *deals):
+		counts = get_stored_counts("CRM Deal", [deal.name for deal in deals])
+		return [counts[deal.name]["note_count"] for deal in deals]
+
+
+def make_deal():
+	return frappe.get_doc(
+		{
+			"doctype": "CRM Deal",
+			"status": "New",
+			"expected_deal_value": 100,
+			"expected_closure_date": add_days(nowdate(), 30),
+		}
+	).insert(ignore_permissions=True)
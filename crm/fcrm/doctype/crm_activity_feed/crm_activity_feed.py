@@ -0,0 +1,269 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import create_batch, now
+
+from crm.api.activities import (
+	COMMUNICATION_FIELDS,
+	COMMUNICATION_STATUS_FIELDS,
+	TIMELINE_AVOID_FIELDS,
+	get_attachment_log_activity,
+	get_comment_activity,
+	get_communication_activity,
+	get_timeline_fields,
+	get_version_activity,
+)
+
+FEED_DOCTYPES = ("CRM Lead", "CRM Deal")
+COMMENT_TYPES = ("Comment", "Attachment", "Attachment Removed")
+ACTIVITY_FEED_BUILT_KEY = "crm_activity_feed_built_on"
+
+
+class CRMActivityFeed(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Activity Feed", ["reference_doctype", "reference_name", "creation"])
+	frappe.db.add_index("CRM Activity Feed", ["source_doctype", "source_name"])
+
+
+def is_activity_feed_built():
+	"""The feed can serve timelines once it has been backfilled, see `rebuild_activity_feed`."""
+	return bool(frappe.db.get_default(ACTIVITY_FEED_BUILT_KEY))
+
+
+def add_record_activity(doc, method=None):
+	store_entries(get_record_entries(doc))
+
+
+def delete_record_activities(doc, method=None):
+	frappe.db.delete("CRM Activity Feed", {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def add_version_activity(doc, method=None):
+	store_entries(get_version_entries(doc))
+
+
+def update_comment_activity(doc, method=None):
+	replace_source_entries(doc, get_comment_entries(doc))
+
+
+def update_communication_activity(doc, method=None):
+	links = [(link.link_doctype, link.link_name) for link in doc.get("timeline_links") or []]
+	replace_source_entries(doc, get_communication_entries(doc, links))
+
+
+def delete_source_activities(doc, method=None):
+	frappe.db.delete("CRM Activity Feed", {"source_doctype": doc.doctype, "source_name": doc.name})
+
+
+def replace_source_entries(doc, entries):
+	"""Replace the entries of a source whose references or content may have changed."""
+	delete_source_activities(doc)
+	store_entries(entries)
+
+
+def get_record_entries(doc):
+	if doc.doctype not in FEED_DOCTYPES:
+		return []
+
+	if doc.doctype == "CRM Lead":
+		text = "created this lead"
+	else:
+		text = "converted the lead to this deal" if doc.get("lead") else "created this deal"
+
+	activity = {"activity_type": "creation", "creation": doc.creation, "owner": doc.owner, "data": text}
+	return [make_entry(doc.doctype, doc.name, doc.doctype, doc.name, activity)]
+
+
+def get_version_entries(version):
+	if version.ref_doctype not in FEED_DOCTYPES:
+		return []
+
+	activity = get_version_activity(
+		version,
+		get_timeline_fields(version.ref_doctype),
+		TIMELINE_AVOID_FIELDS[version.ref_doctype],
+	)
+	if not activity:
+		return []
+
+	return [make_entry(version.ref_doctype, version.docname, "Version", version.name, activity)]
+
+
+def get_comment_entries(comment):
+	if comment.reference_doctype not in FEED_DOCTYPES or comment.comment_type not in COMMENT_TYPES:
+		return []
+
+	if comment.comment_type == "Comment":
+		activity = get_comment_activity(comment, attachments=[])
+	else:
+		activity = get_attachment_log_activity(comment)
+
+	return [make_entry(comment.reference_doctype, comment.reference_name, "Comment", comment.name, activity)]
+
+
+def get_communication_entries(communication, links=None):
+	"""Get one entry per lead or deal the communication references or is linked to."""
+	references = [(communication.reference_doctype, communication.reference_name), *(links or [])]
+	references = [r for r in dict.fromkeys(references) if r[0] in FEED_DOCTYPES and r[1]]
+	if not references:
+		return []
+
+	activity = get_communication_activity(communication, attachments=[])
+	activity["owner"] = communication.owner
+	return [
+		make_entry(reference_doctype, reference_name, "Communication", communication.name, activity)
+		for reference_doctype, reference_name in references
+	]
+
+
+def make_entry(reference_doctype, reference_name, source_doctype, source_name, activity):
+	# attachments may be added and emails delivered after the activity, they are read with the feed
+	payload = {k: v for k, v in activity.items() if k not in ("creation", "owner", "is_lead", "attachments")}
+	if isinstance(payload.get("data"), dict):
+		skipped = ("attachments", *COMMUNICATION_STATUS_FIELDS)
+		payload["data"] = {k: v for k, v in payload["data"].items() if k not in skipped}
+
+	return frappe._dict(
+		reference_doctype=reference_doctype,
+		reference_name=reference_name,
+		activity_type=activity["activity_type"],
+		source_doctype=source_doctype,
+		source_name=source_name,
+		owner=activity.get("owner"),
+		creation=activity["creation"],
+		data=payload,
+	)
+
+
+def get_entry_name(entry):
+	key = "|".join([entry.source_doctype, entry.source_name, entry.reference_doctype, entry.reference_name])
+	return hashlib.sha1(key.encode()).hexdigest()
+
+
+def store_entries(entries):
+	"""Upsert `entries`, one row per source and referenced record."""
+	if not entries:
+		return
+
+	timestamp = now()
+	for batch in create_batch(entries, 500):
+		values = []
+		for entry in batch:
+			values.extend(
+				[
+					get_entry_name(entry),
+					entry.creation,
+					timestamp,
+					entry.owner or frappe.session.user,
+					frappe.session.user,
+					entry.reference_doctype,
+					entry.reference_name,
+					entry.activity_type,
+					entry.source_doctype,
+					entry.source_name,
+					json.dumps(entry.data, default=str),
+				]
+			)
+
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabCRM Activity Feed` (
+				name, creation, modified, owner, modified_by,
+				reference_doctype, reference_name, activity_type, source_doctype, source_name, data
+			)
+			VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch))}
+			ON DUPLICATE KEY UPDATE
+				activity_type = VALUES(activity_type), data = VALUES(data), modified = VALUES(modified)
+			""",
+			values,
+		)
+
+
+def rebuild_activity_feed(batch_size=1000):
+	"""
+	Recompute the feed from the records and their versions, comments and communications, e.g. to
+	backfill it:
+
+	bench --site <site> execute crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.rebuild_activity_feed
+	"""
+	# serve timelines from the sources until the feed is complete again
+	frappe.db.set_default(ACTIVITY_FEED_BUILT_KEY, "")
+	frappe.db.delete("CRM Activity Feed")
+
+	for doctype in FEED_DOCTYPES:
+		fields = ["name", "creation", "owner", *(["lead"] if doctype == "CRM Deal" else [])]
+		for rows in iterate_batches(doctype, {}, fields, batch_size):
+			for row in rows:
+				row.doctype = doctype
+			store_entries([e for row in rows for e in get_record_entries(row)])
+
+	for rows in iterate_batches(
+		"Version",
+		{"ref_doctype": ["in", FEED_DOCTYPES]},
+		["name", "creation", "owner", "ref_doctype", "docname", "data"],
+		batch_size,
+	):
+		store_entries([e for row in rows for e in get_version_entries(row)])
+
+	for rows in iterate_batches(
+		"Comment",
+		{"reference_doctype": ["in", FEED_DOCTYPES], "comment_type": ["in", COMMENT_TYPES]},
+		["name", "creation", "owner", "content", "comment_type", "reference_doctype", "reference_name"],
+		batch_size,
+	):
+		store_entries([e for row in rows for e in get_comment_entries(row)])
+
+	communication_fields = [*COMMUNICATION_FIELDS, "owner", "reference_doctype", "reference_name"]
+	for rows in iterate_batches(
+		"Communication", {"reference_doctype": ["in", FEED_DOCTYPES]}, communication_fields, batch_size
+	):
+		store_entries([e for row in rows for e in get_communication_entries(row)])
+
+	# communications only linked to the timeline of a lead or deal
+	for links in iterate_batches(
+		"Communication Link",
+		{"link_doctype": ["in", FEED_DOCTYPES], "parenttype": "Communication"},
+		["name", "parent", "link_doctype", "link_name"],
+		batch_size,
+	):
+		communications = frappe.get_all(
+			"Communication",
+			filters={"name": ["in", list({link.parent for link in links})]},
+			fields=communication_fields,
+		)
+		communications = {c.name: c for c in communications}
+		entries = []
+		for link in links:
+			if communication := communications.get(link.parent):
+				links = [(link.link_doctype, link.link_name)]
+				entries.extend(get_communication_entries(communication, links))
+		store_entries(entries)
+
+	frappe.db.set_default(ACTIVITY_FEED_BUILT_KEY, now())
+
+
+def iterate_batches(doctype, filters, fields, batch_size):
+	"""Yield the rows of `doctype` matching `filters` in batches ordered by name, committing after each."""
+	last_name = ""
+	while True:
+		rows = frappe.get_all(
+			doctype,
+			filters={**filters, "name": [">", last_name]},
+			fields=fields,
+			order_by="name asc",
+			limit=batch_size,
+		)
+		if not rows:
+			return
+
+		yield rows
+		frappe.db.commit()
+		last_name = rows[-1].name
@@ -0,0 +1,80 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_days, nowdate
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestCRMActivityFeed(UnitTestCase):
+	"""
+	Unit tests for CRMActivityFeed.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestCRMActivityFeed(IntegrationTestCase):
+	"""
+	Integration tests for CRMActivityFeed.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_feed_follows_comment_communication_and_version_writes(self):
+		deal = frappe.get_doc(
+			{
+				"doctype": "CRM Deal",
+				"status": "New",
+				"expected_deal_value": 100,
+				"expected_closure_date": add_days(nowdate(), 30),
+			}
+		).insert(ignore_permissions=True)
+		self.assertEqual(self.get_sources(deal), {"CRM Deal"})
+
+		comment = frappe.get_doc(
+			{
+				"doctype": "Comment",
+				"comment_type": "Comment",
+				"reference_doctype": "CRM Deal",
+				"reference_name": deal.name,
+				"content": "Sent the proposal",
+			}
+		).insert(ignore_permissions=True)
+		frappe.get_doc(
+			{
+				"doctype": "Communication",
+				"communication_type": "Communication",
+				"communication_medium": "Email",
+				"sent_or_received": "Sent",
+				"subject": "Proposal",
+				"content": "Please find the proposal attached",
+				"reference_doctype": "CRM Deal",
+				"reference_name": deal.name,
+			}
+		).insert(ignore_permissions=True)
+		deal.next_step = "Follow up on the proposal"
+		deal.save(ignore_permissions=True)
+		self.assertEqual(self.get_sources(deal), {"CRM Deal", "Comment", "Communication", "Version"})
+
+		comment.delete(ignore_permissions=True)
+		self.assertEqual(self.get_sources(deal), {"CRM Deal", "Communication", "Version"})
+
+		frappe.delete_doc("CRM Deal", deal.name, force=True, ignore_permissions=True)
+		self.assertEqual(self.get_sources(deal), set())
+
+	def get_sources(self, deal):
+		return set(
+			frappe.get_all(
+				"CRM Activity Feed",
+				filters={"reference_doctype": "CRM Deal", "reference_name": deal.name},
+				pluck="source_doctype",
+			)
+		)
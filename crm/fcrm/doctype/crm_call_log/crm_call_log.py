@@ -81,7 +81,7 @@ class CRMCallLog(Document):
 		return {"columns": columns, "rows": rows}
 
 	def parse_list_data(calls):
-		return [parse_call_log(call) for call in calls] if calls else []
+		return parse_call_logs(calls) if calls else []
 
 	def has_link(self, doctype, name):
 		for link in self.links:
@@ -95,17 +95,43 @@ class CRMCallLog(Document):
 		self.append("links", {"link_doctype": reference_doctype, "link_name": reference_name})
 
 
-def parse_call_log(call):
+def parse_call_logs(calls):
+	"""Parse `calls`, reading the users and contacts they share once."""
+	users = get_users_info([call.get(field) for call in calls for field in ("caller", "receiver")])
+	contacts = {}
+	return [parse_call_log(call, users, contacts) for call in calls]
+
+
+def get_users_info(users):
+	"""Get {user: (full_name, user_image)} of `users` with one query."""
+	users = list({user for user in users if user})
+	if not users:
+		return {}
+
+	return {
+		user.name: (user.full_name, user.user_image)
+		for user in frappe.get_all(
+			"User", filters={"name": ["in", users]}, fields=["name", "full_name", "user_image"]
+		)
+	}
+
+
+def parse_call_log(call, users=None, contacts=None):
+	"""
+	Add the display info of the call. `users`, as returned by `get_users_info`, and `contacts`,
+	a cache of the contacts by phone number, are shared by `parse_call_logs`.
+	"""
+	if users is None:
+		users = get_users_info([call.get("caller"), call.get("receiver")])
+	if contacts is None:
+		contacts = {}
+
 	call["show_recording"] = False
 	call["_duration"] = seconds_to_duration(call.get("duration"))
 	if call.get("type") == "Incoming":
 		call["activity_type"] = "incoming_call"
-		contact = get_contact_by_phone_number(call.get("from"))
-		receiver = (
-			frappe.db.get_values("User", call.get("receiver"), ["full_name", "user_image"])[0]
-			if call.get("receiver")
-			else [None, None]
-		)
+		contact = get_call_contact(call.get("from"), contacts)
+		receiver = users.get(call.get("receiver")) or [None, None]
 		call["_caller"] = {
 			"label": contact.get("full_name", "Unknown"),
 			"image": contact.get("image"),
@@ -116,12 +142,8 @@ def parse_call_log(call):
 		}
 	elif call.get("type") == "Outgoing":
 		call["activity_type"] = "outgoing_call"
-		contact = get_contact_by_phone_number(call.get("to"))
-		caller = (
-			frappe.db.get_values("User", call.get("caller"), ["full_name", "user_image"])[0]
-			if call.get("caller")
-			else [None, None]
-		)
+		contact = get_call_contact(call.get("to"), contacts)
+		caller = users.get(call.get("caller")) or [None, None]
 		call["_caller"] = {
 			"label": caller[0],
 			"image": caller[1],
@@ -134,6 +156,12 @@ def parse_call_log(call):
 	return call
 
 
+def get_call_contact(phone_number, contacts):
+	if phone_number not in contacts:
+		contacts[phone_number] = get_contact_by_phone_number(phone_number)
+	return contacts[phone_number]
+
+
 @frappe.whitelist()
 def get_call_log(name):
 	call = frappe.get_cached_doc(
@@ -1,9 +1,13 @@
 # Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+from unittest.mock import patch
+
+import frappe
 from frappe.tests import IntegrationTestCase, UnitTestCase
 
+from crm.api import dashboard
+
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -27,4 +31,46 @@ class IntegrationTestCRMDashboard(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def test_dashboard_queries_use_indexes(self):
+		# the test database is too small for the optimizer to prefer an index over a scan, so only
+		# check that every table read has an index the query can use
+		for user in ("", "Administrator"):
+			for query, values in self.get_dashboard_queries(user):
+				for row in frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True):
+					# derived tables and unions are built from the rows of the queries they wrap
+					if not row.table or row.table.startswith("<"):
+						continue
+					self.assertTrue(
+						row.possible_keys,
+						f"{row.table} has no usable index in:\n{query}",
+					)
+
+	def get_dashboard_queries(self, user=""):
+		"""Run the dashboard queries against the source tables and return what was sent to the database."""
+		queries = []
+		sql = frappe.db.sql
+
+		def capture(query, values=(), *args, **kwargs):
+			if query.lstrip().upper().startswith("SELECT"):
+				queries.append((query, values))
+			return sql(query, values, *args, **kwargs)
+
+		# start from a new cache generation so the cells are read from the database
+		dashboard.invalidate_dashboard_cache()
+		frappe.local.crm_dashboard_cells = {}
+		with (
+			patch("crm.api.dashboard.is_rollup_fresh", return_value=False),
+			patch.object(frappe.db, "sql", side_effect=capture),
+		):
+			for date_field in ("creation", "closed_date"):
+				dashboard.get_dashboard_cells("CRM Deal", date_field, "2025-01-01", "2025-01-31", user)
+			dashboard.get_dashboard_cells("CRM Lead", "creation", "2025-01-01", "2025-01-31", user)
+			dashboard.get_sales_trend("2025-01-01", "2025-01-31", user)
+			dashboard.get_funnel_conversion("2025-01-01", "2025-01-31", user)
+			dashboard.get_lost_deal_reasons("2025-01-01", "2025-01-31", user)
+			dashboard.get_deals_by_salesperson("2025-01-01", "2025-01-31", user)
+			dashboard.get_time_in_stage("2025-01-01", "2025-01-31", user)
+			dashboard.get_forecasted_revenue("2025-01-01", "2025-01-31", user)
+
+		frappe.local.crm_dashboard_cells = {}
+		return queries
@@ -0,0 +1,285 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import create_batch, flt, get_datetime, getdate, now
+from frappe.utils.caching import request_cache
+
+# doctype -> field holding the record owner
+ROLLUP_DOCTYPES = {
+	"CRM Lead": "lead_owner",
+	"CRM Deal": "deal_owner",
+}
+
+DIMENSIONS = [
+	"reference_doctype",
+	"date_field",
+	"date",
+	"record_owner",
+	"source",
+	"territory",
+	"status",
+	"status_type",
+]
+MEASURES = ["count", "value", "net_total", "net_total_count"]
+
+ROLLUP_BUILT_KEY = "crm_dashboard_rollup_built_on"
+
+
+class CRMDashboardRollup(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Dashboard Rollup", ["reference_doctype", "date_field", "date"])
+
+
+def update_rollup(doc, method=None):
+	"""
+	Apply the difference between the buckets a Lead/Deal contributed to before and after the
+	change, so the rollup stays in sync without rescanning the source table.
+	"""
+	if method == "on_update" and doc.flags.in_insert:
+		# already counted in after_insert
+		return
+
+	if method == "after_insert":
+		apply_change(doc, [], get_buckets(doc))
+	elif method == "on_trash":
+		apply_change(doc, get_buckets(doc), [], doc.modified)
+	else:
+		before = doc.get_doc_before_save()
+		apply_change(doc, get_buckets(before), get_buckets(doc), before.modified if before else None)
+
+
+def update_rollup_after_db_set(doc, before):
+	"""Apply the change of `doc` from `before` written without its hooks, e.g. with `db_set`."""
+	apply_change(doc, get_buckets(before), get_buckets(doc), before.modified)
+
+
+def apply_change(doc, old, new, previous_modified=None):
+	"""
+	Apply the difference between the `old` and `new` buckets of `doc`. The watermark only moves
+	if the rollup was in sync with the other records and the previous version of `doc`, so a
+	write that skipped the hooks keeps the rollup stale until it is rebuilt.
+	"""
+	in_sync = is_in_sync_before(doc, previous_modified)
+
+	deltas = {}
+	for sign, buckets in ((-1, old), (1, new)):
+		for bucket in buckets:
+			row = deltas.setdefault(bucket.name, frappe._dict(bucket, **{m: 0 for m in MEASURES}))
+			for measure in MEASURES:
+				row[measure] += sign * bucket[measure]
+
+	apply_deltas([row for row in deltas.values() if any(row[m] for m in MEASURES)])
+	if in_sync:
+		set_watermark(doc.doctype)
+
+
+def is_in_sync_before(doc, previous_modified=None):
+	"""
+	Whether no record but `doc`, nor the previous version of `doc` last modified on
+	`previous_modified`, was modified after the watermark.
+	"""
+	watermark = frappe.cache.get_value(get_watermark_key(doc.doctype))
+	if not watermark:
+		return False
+
+	last_modified = frappe.db.sql(
+		f"SELECT MAX(modified) FROM `tab{doc.doctype}` WHERE name != %s", doc.name
+	)[0][0]
+	modified = [get_datetime(m) for m in (last_modified, previous_modified) if m]
+	return not modified or max(modified) <= get_datetime(watermark)
+
+
+def get_buckets(doc):
+	"""Return the rollup buckets `doc` contributes to, one per date it is charted on."""
+	if not doc or doc.doctype not in ROLLUP_DOCTYPES or not doc.get("creation"):
+		return []
+
+	is_deal = doc.doctype == "CRM Deal"
+	status_type = ""
+	if is_deal and doc.status:
+		status_type = frappe.get_cached_value("CRM Deal Status", doc.status, "type") or ""
+
+	net_total = flt(doc.get("net_total"))
+	row = {
+		"reference_doctype": doc.doctype,
+		"record_owner": doc.get(ROLLUP_DOCTYPES[doc.doctype]),
+		"source": doc.get("source"),
+		"territory": doc.get("territory"),
+		"status": doc.get("status"),
+		"status_type": status_type,
+		"count": 1,
+		"value": flt(doc.get("base_deal_value")) if is_deal else 0,
+		"net_total": net_total if net_total > 0 else 0,
+		"net_total_count": 1 if net_total > 0 else 0,
+	}
+
+	dates = [("creation", getdate(doc.creation))]
+	if is_deal and doc.get("closed_date"):
+		dates.append(("closed_date", getdate(doc.closed_date)))
+
+	buckets = []
+	for date_field, date in dates:
+		bucket = frappe._dict(row, date_field=date_field, date=date)
+		bucket.name = get_bucket_name(bucket)
+		buckets.append(bucket)
+	return buckets
+
+
+def get_bucket_name(bucket):
+	key = "|".join(str(bucket.get(d) or "") for d in DIMENSIONS)
+	return hashlib.sha1(key.encode()).hexdigest()
+
+
+def apply_deltas(rows):
+	"""Upsert `rows` into the rollup, adding their measures to any existing bucket."""
+	if not rows:
+		return
+
+	timestamp, user = now(), frappe.session.user
+	columns = ", ".join(f"`{f}`" for f in ["name", "creation", "modified", "owner", "modified_by", *DIMENSIONS, *MEASURES])
+	placeholders = "(" + ", ".join(["%s"] * (5 + len(DIMENSIONS) + len(MEASURES))) + ")"
+	updates = ", ".join(f"`{m}` = `{m}` + VALUES(`{m}`)" for m in MEASURES)
+
+	for batch in create_batch(rows, 500):
+		values = []
+		for row in batch:
+			values.extend([row.name, timestamp, timestamp, user, user])
+			values.extend(row.get(d) for d in DIMENSIONS)
+			values.extend(row.get(m) or 0 for m in MEASURES)
+
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabCRM Dashboard Rollup` ({columns})
+			VALUES {", ".join([placeholders] * len(batch))}
+			ON DUPLICATE KEY UPDATE {updates}, `modified` = VALUES(`modified`)
+			""",
+			values,
+		)
+
+
+def get_watermark_key(doctype):
+	return f"crm_dashboard_rollup_watermark:{doctype}"
+
+
+def set_watermark(doctype):
+	frappe.cache.set_value(get_watermark_key(doctype), now())
+
+
+@request_cache
+def is_rollup_fresh(doctype):
+	"""
+	The rollup can serve `doctype` once it has been built and no record was modified after the
+	last write the hooks saw, e.g. through `frappe.db.set_value` or raw SQL.
+	"""
+	if not frappe.db.get_default(ROLLUP_BUILT_KEY):
+		return False
+
+	watermark = frappe.cache.get_value(get_watermark_key(doctype))
+	if not watermark:
+		return False
+
+	last_modified = frappe.db.sql(f"SELECT MAX(modified) FROM `tab{doctype}`")[0][0]
+	return not last_modified or get_datetime(last_modified) <= get_datetime(watermark)
+
+
+def rebuild_on_status_change(doc, method=None):
+	"""
+	Rebuild the rollup of the leads or deals when a status they are bucketed by is renamed, or
+	when the type of a deal status changes, as the records are updated without their hooks.
+	"""
+	if method == "on_update":
+		before = doc.get_doc_before_save()
+		if not before or before.get("type") == doc.get("type"):
+			return
+
+	doctype = "CRM Deal" if doc.doctype == "CRM Deal Status" else "CRM Lead"
+	frappe.cache.delete_value(get_watermark_key(doctype))
+	enqueue_rebuild(doctype)
+
+
+def reconcile_rollup():
+	"""Rebuild the rollup of the doctypes modified without the hooks since the last write."""
+	if not frappe.db.get_default(ROLLUP_BUILT_KEY):
+		return
+
+	for doctype in ROLLUP_DOCTYPES:
+		if not is_rollup_fresh(doctype):
+			enqueue_rebuild(doctype)
+
+
+def enqueue_rebuild(doctype=None):
+	frappe.enqueue(
+		rebuild_rollup,
+		queue="long",
+		job_id=f"crm_dashboard_rollup_rebuild:{doctype or 'all'}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		doctype=doctype,
+	)
+
+
+@frappe.whitelist()
+def rebuild_dashboard_rollup(doctype=None):
+	frappe.only_for("System Manager")
+	enqueue_rebuild(doctype)
+
+
+def rebuild_rollup(doctype=None):
+	"""
+	Recompute the rollup from the source tables, e.g. to backfill it:
+
+	bench --site <site> execute crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.rebuild_rollup
+	"""
+	for dt in [doctype] if doctype else ROLLUP_DOCTYPES:
+		# serve charts from the source tables until the rollup is complete again
+		frappe.cache.delete_value(get_watermark_key(dt))
+		frappe.db.delete("CRM Dashboard Rollup", {"reference_doctype": dt})
+
+		date_fields = ["creation", "closed_date"] if dt == "CRM Deal" else ["creation"]
+		for date_field in date_fields:
+			rows = frappe.db.sql(get_rebuild_query(dt, date_field), as_dict=True)
+			for row in rows:
+				row.reference_doctype = dt
+				row.date_field = date_field
+				row.name = get_bucket_name(row)
+			apply_deltas(rows)
+
+		frappe.db.commit()
+		set_watermark(dt)
+
+	frappe.db.set_default(ROLLUP_BUILT_KEY, now())
+
+
+def get_rebuild_query(doctype, date_field):
+	owner_field = ROLLUP_DOCTYPES[doctype]
+	if doctype == "CRM Deal":
+		status_type = "IFNULL(s.type, '')"
+		value = "SUM(t.base_deal_value)"
+		join = "LEFT JOIN `tabCRM Deal Status` s ON t.status = s.name"
+	else:
+		status_type, value, join = "''", "0", ""
+
+	return f"""
+		SELECT
+			DATE(t.`{date_field}`) AS date,
+			t.`{owner_field}` AS record_owner,
+			t.source,
+			t.territory,
+			t.status,
+			{status_type} AS status_type,
+			COUNT(*) AS count,
+			{value} AS value,
+			SUM(CASE WHEN t.net_total > 0 THEN t.net_total ELSE 0 END) AS net_total,
+			SUM(CASE WHEN t.net_total > 0 THEN 1 ELSE 0 END) AS net_total_count
+		FROM `tab{doctype}` t
+		{join}
+		WHERE t.`{date_field}` IS NOT NULL
+		GROUP BY 1, 2, 3, 4, 5, 6
+	"""
@@ -0,0 +1,78 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_days, nowdate
+
+from crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup import get_watermark_key, set_watermark
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestCRMDashboardRollup(UnitTestCase):
+	"""
+	Unit tests for CRMDashboardRollup.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestCRMDashboardRollup(IntegrationTestCase):
+	"""
+	Integration tests for CRMDashboardRollup.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_rollup_follows_status_changes_and_deletes(self):
+		new, negotiation = self.get_deal_count("New"), self.get_deal_count("Negotiation")
+
+		deal = make_deal("New")
+		self.assertEqual(self.get_deal_count("New"), new + 1)
+
+		deal.status = "Negotiation"
+		deal.save()
+		self.assertEqual(self.get_deal_count("New"), new)
+		self.assertEqual(self.get_deal_count("Negotiation"), negotiation + 1)
+
+		deal.delete()
+		self.assertEqual(self.get_deal_count("Negotiation"), negotiation)
+
+	def test_write_without_hooks_keeps_rollup_stale(self):
+		deal = make_deal("New")
+		set_watermark("CRM Deal")
+		watermark = frappe.cache.get_value(get_watermark_key("CRM Deal"))
+
+		deal.db_set("status", "Negotiation")
+		make_deal("New")
+		self.assertEqual(frappe.cache.get_value(get_watermark_key("CRM Deal")), watermark)
+
+	def get_deal_count(self, status):
+		counts = frappe.get_all(
+			"CRM Dashboard Rollup",
+			filters={
+				"reference_doctype": "CRM Deal",
+				"date_field": "creation",
+				"date": nowdate(),
+				"status": status,
+			},
+			pluck="count",
+		)
+		return sum(counts)
+
+
+def make_deal(status):
+	return frappe.get_doc(
+		{
+			"doctype": "CRM Deal",
+			"status": status,
+			"expected_deal_value": 100,
+			"expected_closure_date": add_days(nowdate(), 30),
+		}
+	).insert(ignore_permissions=True)
@@ -5,6 +5,7 @@ import frappe
 from frappe import _
 from frappe.desk.form.assign_to import add as assign
 from frappe.model.document import Document
+from frappe.utils import flt
 
 from crm.fcrm.doctype.crm_service_level_agreement.utils import get_sla
 from crm.fcrm.doctype.crm_status_change_log.crm_status_change_log import add_status_change_log
@@ -25,6 +26,9 @@ class CRMDeal(Document):
 		from frappe.types import DF
 
 		annual_revenue: DF.Currency
+		base_deal_value: DF.Currency
+		base_expected_deal_value: DF.Currency
+		base_weighted_expected_value: DF.Currency
 		closed_date: DF.Date | None
 		communication_status: DF.Link | None
 		contact: DF.Link | None
@@ -223,6 +227,7 @@ class CRMDeal(Document):
 		):
 			# Auto-set expected_deal_value from net_total/total
 			self.expected_deal_value = self.net_total or self.total
+			self.update_base_values()
 
 	def validate_forecasting_fields(self):
 		self.update_closed_date()
@@ -253,6 +258,17 @@ class CRMDeal(Document):
 
 			self.db_set("exchange_rate", exchange_rate)
 
+		self.update_base_values()
+
+	def update_base_values(self):
+		"""
+		Store the deal values converted to the base currency, so reports can sum them as is.
+		"""
+		exchange_rate = 1 if self.exchange_rate is None else flt(self.exchange_rate)
+		self.base_deal_value = flt(self.deal_value) * exchange_rate
+		self.base_expected_deal_value = flt(self.expected_deal_value) * exchange_rate
+		self.base_weighted_expected_value = self.base_expected_deal_value * flt(self.probability) / 100
+
 	@staticmethod
 	def default_list_data():
 		columns = [
@@ -351,6 +367,12 @@ class CRMDeal(Document):
 		}
 
 
+def on_doctype_update():
+	frappe.db.add_index("CRM Deal", ["creation", "deal_owner", "status"])
+	frappe.db.add_index("CRM Deal", ["closed_date", "deal_owner", "status"])
+	frappe.db.add_index("CRM Deal", ["expected_closure_date", "deal_owner"])
+
+
 @frappe.whitelist()
 def add_contact(deal, contact):
 	if not frappe.has_permission("CRM Deal", "write", deal):
@@ -7,6 +7,7 @@ from frappe.desk.form.assign_to import add as assign
 from frappe.model.document import Document
 from frappe.utils import has_gravatar, validate_email_address
 
+from crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup import update_rollup_after_db_set
 from crm.fcrm.doctype.crm_service_level_agreement.utils import get_sla
 from crm.fcrm.doctype.crm_status_change_log.crm_status_change_log import (
 	add_status_change_log,
@@ -594,6 +595,10 @@ class CRMLead(Document):
 		}
 
 
+def on_doctype_update():
+	frappe.db.add_index("CRM Lead", ["creation", "lead_owner"])
+
+
 def _send_convert_to_deal_whatsapp_notification(lead, deal_name):
 	"""
 	Send WhatsApp notification when Lead is converted to Deal.
@@ -689,7 +694,9 @@ def convert_to_deal(lead, doc=None, deal=None, existing_contact=None, existing_o
 
 	lead = frappe.get_cached_doc("CRM Lead", lead)
 	if frappe.db.exists("CRM Lead Status", "Confirmed"):
+		before = lead.as_dict()
 		lead.db_set("status", "Confirmed")
+		update_rollup_after_db_set(lead, before)
 	lead.db_set("converted", 1)
 	if lead.sla and frappe.db.exists("CRM Communication Status", "Replied"):
 		lead.db_set("communication_status", "Replied")
@@ -0,0 +1,111 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+# doctype -> field holding the order owner
+ORDER_DOCTYPES = {
+	"CRM Lead": "lead_owner",
+	"CRM Deal": "deal_owner",
+}
+
+
+class CRMOrderProduct(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Order Product", ["order_doctype", "order_name"])
+	frappe.db.add_index("CRM Order Product", ["order_creation", "order_owner"])
+	frappe.db.add_index("CRM Order Product", ["product"])
+
+
+def update_order_products(doc, method=None):
+	"""
+	Re-sync the rows of a Lead/Deal when its products, owner or creation changed. Runs on
+	on_update, which also fires on insert.
+	"""
+	if get_signature(doc) == get_signature(doc.get_doc_before_save()):
+		return
+
+	sync_order_products({"parenttype": doc.doctype, "parent": doc.name})
+
+
+def update_product(doc, method=None):
+	"""Re-sync the rows of every order containing the product, its name or tags may have changed."""
+	sync_order_products({"product_code": doc.name})
+
+
+def delete_order_products(doc, method=None):
+	frappe.db.delete("CRM Order Product", {"order_doctype": doc.doctype, "order_name": doc.name})
+
+
+def get_signature(doc):
+	if not doc:
+		return None
+
+	return (
+		doc.get(ORDER_DOCTYPES[doc.doctype]),
+		str(doc.creation),
+		[(row.product_code, row.qty, row.net_amount) for row in doc.get("products") or []],
+	)
+
+
+def rebuild_order_products():
+	"""
+	Recompute the table from the product lines of all Leads/Deals, e.g. to backfill it:
+
+	bench --site <site> execute crm.fcrm.doctype.crm_order_product.crm_order_product.rebuild_order_products
+	"""
+	sync_order_products()
+
+
+def sync_order_products(filters=None):
+	"""
+	Replace the rows derived from the `tabCRM Products` lines matching `filters` (any of
+	parenttype, parent and product_code) with one row per product tag, or a single untagged row
+	for products without tags.
+	"""
+	filters = filters or {}
+	delete_filters = {}
+	conds = ""
+	if "parenttype" in filters:
+		delete_filters["order_doctype"] = filters["parenttype"]
+		conds += " AND cp.parenttype = %(parenttype)s"
+	if "parent" in filters:
+		delete_filters["order_name"] = filters["parent"]
+		conds += " AND cp.parent = %(parent)s"
+	if "product_code" in filters:
+		delete_filters["product"] = filters["product_code"]
+		conds += " AND cp.product_code = %(product_code)s"
+
+	frappe.db.delete("CRM Order Product", delete_filters)
+
+	timestamp, user = frappe.utils.now(), frappe.session.user
+	for doctype, owner_field in ORDER_DOCTYPES.items():
+		if filters.get("parenttype", doctype) != doctype:
+			continue
+
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabCRM Order Product` (
+				name, creation, modified, owner, modified_by,
+				order_doctype, order_name, order_creation, order_owner,
+				product, product_type, tag, qty, net_amount
+			)
+			SELECT
+				SHA1(CONCAT(cp.name, '-', IFNULL(pt.name, ''))),
+				%(timestamp)s, %(timestamp)s, %(user)s, %(user)s,
+				%(doctype)s, o.name, o.creation, o.`{owner_field}`,
+				cp.product_code, p.product_name, ptm.name, cp.qty, cp.net_amount
+			FROM `tabCRM Products` cp
+			JOIN `tab{doctype}` o ON cp.parent = o.name
+			LEFT JOIN `tabCRM Product` p ON cp.product_code = p.name
+			LEFT JOIN `tabCRM Product Tag` pt ON pt.parent = p.name AND pt.parenttype = 'CRM Product'
+			LEFT JOIN `tabCRM Product Tag Master` ptm ON pt.tag_name = ptm.name
+			WHERE cp.parenttype = %(doctype)s
+				{conds}
+			""",
+			{**filters, "doctype": doctype, "timestamp": timestamp, "user": user},
+		)
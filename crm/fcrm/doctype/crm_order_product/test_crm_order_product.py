@@ -0,0 +1,75 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_days, nowdate
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestCRMOrderProduct(UnitTestCase):
+	"""
+	Unit tests for CRMOrderProduct.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestCRMOrderProduct(IntegrationTestCase):
+	"""
+	Integration tests for CRMOrderProduct.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_order_products_follow_product_lines(self):
+		if not frappe.db.exists("CRM Product", "_Test CRM Product"):
+			frappe.get_doc(
+				{
+					"doctype": "CRM Product",
+					"product_code": "_Test CRM Product",
+					"product_name": "_Test CRM Product",
+				}
+			).insert(ignore_permissions=True)
+
+		deal = frappe.get_doc(
+			{
+				"doctype": "CRM Deal",
+				"status": "New",
+				"expected_deal_value": 100,
+				"expected_closure_date": add_days(nowdate(), 30),
+				"products": [
+					{
+						"product_code": "_Test CRM Product",
+						"product_name": "_Test CRM Product",
+						"rate": 10,
+						"qty": 2,
+					}
+				],
+			}
+		).insert(ignore_permissions=True)
+		self.assertEqual(self.get_order_products(deal), [("_Test CRM Product", 2)])
+
+		deal.products[0].qty = 5
+		deal.save()
+		self.assertEqual(self.get_order_products(deal), [("_Test CRM Product", 5)])
+
+		deal.products = []
+		deal.save()
+		self.assertEqual(self.get_order_products(deal), [])
+
+	def get_order_products(self, deal):
+		return [
+			(row.product, row.qty)
+			for row in frappe.get_all(
+				"CRM Order Product",
+				filters={"order_doctype": "CRM Deal", "order_name": deal.name},
+				fields=["product", "qty"],
+			)
+		]
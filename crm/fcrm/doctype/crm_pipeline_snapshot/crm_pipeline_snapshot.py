@@ -0,0 +1,62 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import getdate, now
+
+# deals in these status types are no longer part of the pipeline
+CLOSED_STATUS_TYPES = ("Won", "Lost")
+
+
+class CRMPipelineSnapshot(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Pipeline Snapshot", ["snapshot_date", "deal_owner"])
+
+
+def take_pipeline_snapshot(date=None):
+	"""
+	Store the open pipeline of `date` (today by default), replacing an earlier snapshot of that day.
+	Runs daily, so historical forecasts can be read back without replaying deal versions.
+	"""
+	date = getdate(date)
+	timestamp, user = now(), frappe.session.user
+
+	frappe.db.delete("CRM Pipeline Snapshot", {"snapshot_date": date})
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabCRM Pipeline Snapshot` (
+			name, creation, modified, owner, modified_by,
+			snapshot_date, status, status_type, deal_owner, expected_closure_month,
+			deal_count, value, weighted_value
+		)
+		SELECT
+			SHA1(CONCAT_WS('|', %(date)s, d.status, IFNULL(d.deal_owner, ''), IFNULL(d.month, ''))),
+			%(timestamp)s, %(timestamp)s, %(user)s, %(user)s,
+			%(date)s, d.status, IFNULL(s.type, ''), d.deal_owner, d.month,
+			COUNT(*),
+			SUM(IFNULL(d.base_expected_deal_value, 0)),
+			SUM(IFNULL(d.base_weighted_expected_value, 0))
+		FROM (
+			SELECT
+				status,
+				deal_owner,
+				DATE_FORMAT(expected_closure_date, '%%Y-%%m-01') AS month,
+				base_expected_deal_value,
+				base_weighted_expected_value
+			FROM `tabCRM Deal`
+		) d
+		LEFT JOIN `tabCRM Deal Status` s ON d.status = s.name
+		WHERE IFNULL(s.type, '') NOT IN %(closed_status_types)s
+		GROUP BY d.status, s.type, d.deal_owner, d.month
+		""",
+		{
+			"date": date,
+			"timestamp": timestamp,
+			"user": user,
+			"closed_status_types": CLOSED_STATUS_TYPES,
+		},
+	)
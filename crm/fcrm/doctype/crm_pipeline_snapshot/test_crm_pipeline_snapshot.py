@@ -0,0 +1,55 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_days, nowdate
+
+from crm.fcrm.doctype.crm_pipeline_snapshot.crm_pipeline_snapshot import take_pipeline_snapshot
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestCRMPipelineSnapshot(UnitTestCase):
+	"""
+	Unit tests for CRMPipelineSnapshot.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestCRMPipelineSnapshot(IntegrationTestCase):
+	"""
+	Integration tests for CRMPipelineSnapshot.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_snapshot_counts_open_deals_once_per_day(self):
+		frappe.get_doc(
+			{
+				"doctype": "CRM Deal",
+				"status": "New",
+				"expected_deal_value": 100,
+				"expected_closure_date": add_days(nowdate(), 30),
+			}
+		).insert(ignore_permissions=True)
+
+		take_pipeline_snapshot()
+		take_pipeline_snapshot()
+
+		for status, status_type in frappe.get_all("CRM Deal Status", fields=["name", "type"], as_list=True):
+			counts = frappe.get_all(
+				"CRM Pipeline Snapshot",
+				filters={"snapshot_date": nowdate(), "status": status},
+				pluck="deal_count",
+			)
+			expected = frappe.db.count("CRM Deal", {"status": status})
+			if status_type in ("Won", "Lost"):
+				expected = 0
+			self.assertEqual(sum(counts), expected, status)
@@ -0,0 +1,208 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+import re
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import create_batch, now
+
+from crm.utils import parse_phone_number
+
+# doctype -> title field, searchable fields and child table fields (table field, child doctype, field)
+SEARCH_DOCTYPES = {
+	"CRM Lead": {
+		"title": "lead_name",
+		"fields": ["lead_name", "first_name", "last_name", "organization", "email", "mobile_no", "phone", "website"],
+		"children": [("products", "CRM Products", "product_name")],
+	},
+	"CRM Deal": {
+		"title": "organization",
+		"fields": ["organization", "lead_name", "first_name", "last_name", "email", "mobile_no", "phone", "website"],
+		"children": [("products", "CRM Products", "product_name")],
+	},
+	"Contact": {
+		"title": "full_name",
+		"fields": ["full_name", "company_name", "email_id", "mobile_no", "phone"],
+		"children": [("email_ids", "Contact Email", "email_id"), ("phone_nos", "Contact Phone", "phone")],
+	},
+	"CRM Organization": {
+		"title": "organization_name",
+		"fields": ["organization_name", "website"],
+		"children": [],
+	},
+}
+
+# values also indexed as bare digits and as the national number without the country code, so
+# "+91 98765-43210" is found by "919876543210" and by "9876543210"
+PHONE_FIELDS = {"mobile_no", "phone"}
+
+
+class CRMSearchIndex(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Search Index", ["reference_doctype", "reference_name"])
+
+	if not frappe.db.sql("SHOW INDEX FROM `tabCRM Search Index` WHERE Key_name = 'content_fulltext'"):
+		frappe.db.sql_ddl("ALTER TABLE `tabCRM Search Index` ADD FULLTEXT INDEX content_fulltext (content)")
+
+
+def update_search_index(doc, method=None):
+	"""Re-index a record when one of its searchable values changed. Runs on on_update."""
+	if get_search_content(doc) == get_search_content(doc.get_doc_before_save()):
+		return
+
+	store_entries([get_entry(doc)])
+
+
+def delete_search_index(doc, method=None):
+	frappe.db.delete("CRM Search Index", {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def get_entry(doc):
+	config = SEARCH_DOCTYPES[doc.doctype]
+	return frappe._dict(
+		reference_doctype=doc.doctype,
+		reference_name=doc.name,
+		title=doc.get(config["title"]) or doc.name,
+		content=get_search_content(doc),
+	)
+
+
+def get_search_content(doc, children=None):
+	"""
+	Join the searchable values of `doc` (a document or a row of its fields) into one text. Child
+	values are read from the document, or from `children` as {table field: [values]}.
+	"""
+	if not doc:
+		return None
+
+	config = SEARCH_DOCTYPES[doc.get("doctype")]
+	values = [doc.get("name")]
+	for field in config["fields"]:
+		value = doc.get(field)
+		values.append(value)
+		if field in PHONE_FIELDS and value:
+			values.extend(get_phone_tokens(value))
+
+	for table_field, child_doctype, field in config["children"]:
+		if children is None:
+			child_values = [row.get(field) for row in doc.get(table_field) or []]
+		else:
+			child_values = children.get(table_field) or []
+
+		for value in child_values:
+			values.append(value)
+			if field in PHONE_FIELDS and value:
+				values.extend(get_phone_tokens(value))
+
+	return " ".join(str(value) for value in values if value)
+
+
+def get_phone_tokens(phone):
+	"""Get the digits of `phone`, and its national number if it has a country code."""
+	digits = re.sub(r"\D", "", phone)
+	tokens = [digits]
+	parsed = parse_phone_number(phone)
+	if parsed["success"] and parsed["national_number"] != digits:
+		tokens.append(parsed["national_number"])
+	return tokens
+
+
+def get_entry_name(reference_doctype, reference_name):
+	return hashlib.sha1(f"{reference_doctype}|{reference_name}".encode()).hexdigest()
+
+
+def store_entries(entries):
+	"""Upsert `entries`, one row per record named after its doctype and name."""
+	if not entries:
+		return
+
+	timestamp, user = now(), frappe.session.user
+	for batch in create_batch(entries, 500):
+		values = []
+		for entry in batch:
+			values.extend(
+				[
+					get_entry_name(entry.reference_doctype, entry.reference_name),
+					timestamp,
+					timestamp,
+					user,
+					user,
+					entry.reference_doctype,
+					entry.reference_name,
+					(entry.title or "")[:140],
+					entry.content,
+				]
+			)
+
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabCRM Search Index` (
+				name, creation, modified, owner, modified_by,
+				reference_doctype, reference_name, title, content
+			)
+			VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch))}
+			ON DUPLICATE KEY UPDATE
+				title = VALUES(title), content = VALUES(content), modified = VALUES(modified)
+			""",
+			values,
+		)
+
+
+def rebuild_search_index(doctype=None, batch_size=1000):
+	"""
+	Re-index all records, e.g. to backfill the index:
+
+	bench --site <site> execute crm.fcrm.doctype.crm_search_index.crm_search_index.rebuild_search_index
+	"""
+	for dt in [doctype] if doctype else SEARCH_DOCTYPES:
+		frappe.db.delete("CRM Search Index", {"reference_doctype": dt})
+
+		config = SEARCH_DOCTYPES[dt]
+		fields = list(dict.fromkeys(["name", config["title"], *config["fields"]]))
+		last_name = ""
+		while True:
+			rows = frappe.get_all(
+				dt,
+				fields=fields,
+				filters={"name": [">", last_name]},
+				order_by="name asc",
+				limit=batch_size,
+			)
+			if not rows:
+				break
+
+			children = get_child_values(dt, [row.name for row in rows])
+			entries = []
+			for row in rows:
+				row.doctype = dt
+				entries.append(
+					frappe._dict(
+						reference_doctype=dt,
+						reference_name=row.name,
+						title=row.get(config["title"]) or row.name,
+						content=get_search_content(row, children.get(row.name, {})),
+					)
+				)
+
+			store_entries(entries)
+			frappe.db.commit()
+			last_name = rows[-1].name
+
+
+def get_child_values(doctype, names):
+	"""Get {parent: {table field: [values]}} of the searchable child rows of `names`."""
+	children = {}
+	for table_field, child_doctype, field in SEARCH_DOCTYPES[doctype]["children"]:
+		for row in frappe.get_all(
+			child_doctype,
+			fields=["parent", field],
+			filters={"parenttype": doctype, "parentfield": table_field, "parent": ["in", names]},
+			order_by="idx asc",
+		):
+			children.setdefault(row.parent, {}).setdefault(table_field, []).append(row.get(field))
+	return children
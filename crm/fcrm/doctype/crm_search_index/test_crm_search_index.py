@@ -0,0 +1,53 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+
+from crm.api.search import global_search
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestCRMSearchIndex(UnitTestCase):
+	"""
+	Unit tests for CRMSearchIndex.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestCRMSearchIndex(IntegrationTestCase):
+	"""
+	Integration tests for CRMSearchIndex.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_search_finds_contact_by_name_email_and_phone(self):
+		contact = frappe.get_doc(
+			{
+				"doctype": "Contact",
+				"first_name": "Zebulon",
+				"last_name": "Quixote",
+				"email_ids": [{"email_id": "zebulon.quixote@example.com", "is_primary": 1}],
+				"phone_nos": [{"phone": "+91 91234 56789", "is_primary_mobile_no": 1}],
+			}
+		).insert(ignore_permissions=True)
+		# full text indexes only see committed rows
+		frappe.db.commit()
+		self.addCleanup(delete_contact, contact.name)
+
+		for query in ("Zebulon Quixote", "zebulon.quixote@example.com", "919123456789", "9123456789"):
+			results = global_search(query, doctypes=["Contact"])
+			self.assertIn(contact.name, [r["name"] for r in results], query)
+
+
+def delete_contact(name):
+	frappe.delete_doc("Contact", name, force=True, ignore_permissions=True)
+	frappe.db.commit()
@@ -0,0 +1,99 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+# doctype -> field holding the record owner
+OWNER_FIELDS = {
+	"CRM Lead": "lead_owner",
+	"CRM Deal": "deal_owner",
+}
+
+
+class CRMStageTransition(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("CRM Stage Transition", ["reference_doctype", "reference_name"])
+	frappe.db.add_index("CRM Stage Transition", ["reference_doctype", "record_creation", "to_status"])
+	frappe.db.add_index("CRM Stage Transition", ["reference_doctype", "transition_date"])
+
+
+def record_stage_transition(doc, log):
+	"""
+	Store the transition `log` of `doc` just closed as a fact row, so reports can group transitions
+	without reading the status change log of every record.
+	"""
+	if not log.get("to"):
+		return
+
+	frappe.get_doc(
+		{
+			"doctype": "CRM Stage Transition",
+			"reference_doctype": doc.doctype,
+			"reference_name": doc.name,
+			"record_owner": doc.get(OWNER_FIELDS.get(doc.doctype)),
+			"record_creation": doc.creation,
+			"from_status": log.get("from"),
+			"from_status_type": log.from_type,
+			"to_status": log.to,
+			"to_status_type": log.to_type,
+			"transition_date": log.to_date,
+			"duration": log.duration,
+			"current_status_type": log.to_type,
+		}
+	).insert(ignore_permissions=True)
+
+	frappe.db.set_value(
+		"CRM Stage Transition",
+		{"reference_doctype": doc.doctype, "reference_name": doc.name},
+		"current_status_type",
+		log.to_type,
+		update_modified=False,
+	)
+
+
+def delete_stage_transitions(doc, method=None):
+	frappe.db.delete("CRM Stage Transition", {"reference_doctype": doc.doctype, "reference_name": doc.name})
+
+
+def rebuild_stage_transitions():
+	"""
+	Recompute the transitions from the status change logs, e.g. to backfill them:
+
+	bench --site <site> execute crm.fcrm.doctype.crm_stage_transition.crm_stage_transition.rebuild_stage_transitions
+	"""
+	frappe.db.delete("CRM Stage Transition")
+
+	for doctype, owner_field in OWNER_FIELDS.items():
+		if doctype == "CRM Deal":
+			current_status_type = "IFNULL(s.type, '')"
+			join = "LEFT JOIN `tabCRM Deal Status` s ON t.status = s.name"
+		else:
+			current_status_type, join = "''", ""
+
+		# the status change log rows are already uniquely named, reuse their names
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabCRM Stage Transition` (
+				name, creation, modified, owner, modified_by,
+				reference_doctype, reference_name, record_owner, record_creation,
+				from_status, from_status_type, to_status, to_status_type,
+				transition_date, duration, current_status_type
+			)
+			SELECT
+				scl.name, scl.creation, scl.modified, scl.owner, scl.modified_by,
+				%(doctype)s, t.name, t.`{owner_field}`, t.creation,
+				scl.`from`, scl.from_type, scl.`to`, scl.to_type,
+				scl.to_date, scl.duration, {current_status_type}
+			FROM `tabCRM Status Change Log` scl
+			JOIN `tab{doctype}` t ON scl.parent = t.name
+			{join}
+			WHERE scl.parenttype = %(doctype)s
+				AND scl.`to` IS NOT NULL
+				AND scl.`to` != ''
+			""",
+			{"doctype": doctype},
+		)
@@ -0,0 +1,58 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase, UnitTestCase
+from frappe.utils import add_days, get_datetime, nowdate
+
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+
+class UnitTestCRMStageTransition(UnitTestCase):
+	"""
+	Unit tests for CRMStageTransition.
+	Use this class for testing individual functions and methods.
+	"""
+
+	pass
+
+
+class IntegrationTestCRMStageTransition(IntegrationTestCase):
+	"""
+	Integration tests for CRMStageTransition.
+	Use this class for testing interactions between multiple components.
+	"""
+
+	def test_status_change_records_transition(self):
+		deal = frappe.get_doc(
+			{
+				"doctype": "CRM Deal",
+				"status": "New",
+				"expected_deal_value": 100,
+				"expected_closure_date": add_days(nowdate(), 30),
+			}
+		).insert(ignore_permissions=True)
+		self.assertFalse(frappe.db.exists("CRM Stage Transition", {"reference_name": deal.name}))
+
+		deal.status = "Negotiation"
+		deal.save()
+
+		transitions = frappe.get_all(
+			"CRM Stage Transition",
+			filters={"reference_doctype": "CRM Deal", "reference_name": deal.name},
+			fields=["from_status", "to_status", "to_status_type", "current_status_type", "record_creation"],
+		)
+		self.assertEqual(len(transitions), 1)
+		self.assertEqual(transitions[0].from_status, "New")
+		self.assertEqual(transitions[0].to_status, "Negotiation")
+		self.assertEqual(transitions[0].to_status_type, "Ongoing")
+		self.assertEqual(transitions[0].current_status_type, "Ongoing")
+		self.assertEqual(transitions[0].record_creation, get_datetime(deal.creation))
+
+		deal.delete()
+		self.assertFalse(frappe.db.exists("CRM Stage Transition", {"reference_name": deal.name}))
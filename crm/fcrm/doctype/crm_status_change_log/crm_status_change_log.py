@@ -7,11 +7,18 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import add_to_date, get_datetime
 
+from crm.fcrm.doctype.crm_stage_transition.crm_stage_transition import record_stage_transition
+
 
 class CRMStatusChangeLog(Document):
 	pass
 
 
+def on_doctype_update():
+	# `to` is a reserved word, so it is quoted and the index named explicitly
+	frappe.db.add_index("CRM Status Change Log", ["parent", "`to`"], "parent_to_index")
+
+
 def get_duration(from_date, to_date):
 	if not isinstance(from_date, datetime):
 		from_date = get_datetime(from_date)
@@ -49,6 +56,7 @@ def add_status_change_log(doc):
 		last_status_change.to_date = datetime.now()
 		last_status_change.log_owner = frappe.session.user
 		last_status_change.duration = get_duration(last_status_change.from_date, last_status_change.to_date)
+		record_stage_transition(doc, last_status_change)
 
 	doc.append(
 		"status_change_log",
@@ -8,6 +8,7 @@ from frappe import _
 from frappe.custom.doctype.property_setter.property_setter import delete_property_setter, make_property_setter
 from frappe.model.document import Document
 
+from crm.fcrm.doctype.crm_activity_counter.crm_activity_counter import ACTIVITY_COUNTERS_BUILT_KEY
 from crm.install import after_install, add_default_lead_statuses
 from crm.fcrm.doctype.crm_lead.remove_italian_statuses import execute as _remove_italian_statuses
 
@@ -21,6 +22,7 @@ class FCRMSettings(Document):
 		self.do_not_allow_to_delete_if_standard()
 		self.setup_forecasting()
 		self.make_currency_read_only()
+		self.setup_activity_counters()
 
 	def do_not_allow_to_delete_if_standard(self):
 		if not self.has_value_changed("dropdown_items"):
@@ -64,6 +66,21 @@ class FCRMSettings(Document):
 					"Check",
 				)
 
+	def setup_activity_counters(self):
+		if not self.has_value_changed("store_activity_counters"):
+			return
+
+		# counters left while disabled are stale, they are read again once rebuilt
+		frappe.db.set_default(ACTIVITY_COUNTERS_BUILT_KEY, "")
+		if self.store_activity_counters:
+			frappe.enqueue(
+				"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.rebuild_activity_counters",
+				queue="long",
+				job_id="crm_activity_counters_rebuild",
+				deduplicate=True,
+				enqueue_after_commit=True,
+			)
+
 	def make_currency_read_only(self):
 		if self.currency and self.has_value_changed("currency"):
 			make_property_setter(
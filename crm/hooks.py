@@ -99,7 +99,7 @@ before_uninstall = "crm.uninstall.before_uninstall"
 # Name of the app being installed is passed as an argument
 
 # before_app_install = "crm.utils.before_app_install"
-# after_app_install = "crm.utils.after_app_install"
+after_app_install = "crm.install.after_app_install"
 
 # Integration Cleanup
 # -------------------
@@ -143,21 +143,192 @@ override_doctype_class = {
 doc_events = {
 	"Contact": {
 		"validate": ["crm.api.contact.validate"],
+		"on_update": [
+			"crm.fcrm.doctype.crm_search_index.crm_search_index.update_search_index",
+			"crm.api.doc.invalidate_count_cache",
+			"crm.api.doc.publish_list_dirty",
+		],
+		"on_trash": ["crm.fcrm.doctype.crm_search_index.crm_search_index.delete_search_index"],
+		"after_delete": ["crm.api.doc.invalidate_count_cache", "crm.api.doc.publish_list_dirty"],
+	},
+	"CRM Organization": {
+		"on_update": [
+			"crm.fcrm.doctype.crm_search_index.crm_search_index.update_search_index",
+			"crm.api.doc.invalidate_count_cache",
+			"crm.api.doc.publish_list_dirty",
+		],
+		"on_trash": ["crm.fcrm.doctype.crm_search_index.crm_search_index.delete_search_index"],
+		"after_delete": ["crm.api.doc.invalidate_count_cache", "crm.api.doc.publish_list_dirty"],
 	},
 	"ToDo": {
 		"after_insert": ["crm.api.todo.after_insert"],
 		"on_update": ["crm.api.todo.on_update"],
 	},
+	"Version": {
+		"after_insert": ["crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.add_version_activity"],
+	},
 	"Comment": {
-		"on_update": ["crm.api.comment.on_update"],
+		"on_update": [
+			"crm.api.comment.on_update",
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter",
+			"crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.update_comment_activity",
+		],
+		"on_trash": ["crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.delete_source_activities"],
+		"after_delete": [
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter"
+		],
+	},
+	"Communication": {
+		"on_update": [
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter",
+			"crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.update_communication_activity",
+		],
+		"on_trash": ["crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.delete_source_activities"],
+		"after_delete": [
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter"
+		],
+	},
+	"CRM Task": {
+		"on_update": [
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter",
+			"crm.api.doc.invalidate_count_cache",
+			"crm.api.doc.publish_list_dirty",
+		],
+		"after_delete": [
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter",
+			"crm.api.doc.invalidate_count_cache",
+			"crm.api.doc.publish_list_dirty",
+		],
+	},
+	"CRM Call Log": {
+		"on_update": ["crm.api.doc.invalidate_count_cache", "crm.api.doc.publish_list_dirty"],
+		"after_delete": ["crm.api.doc.invalidate_count_cache", "crm.api.doc.publish_list_dirty"],
+	},
+	"FCRM Note": {
+		"on_update": ["crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter"],
+		"after_delete": [
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.update_activity_counter"
+		],
 	},
 	"WhatsApp Message": {
 		"validate": ["crm.api.whatsapp.validate"],
 		"on_update": ["crm.api.whatsapp.on_update"],
 	},
+	"CRM Lead": {
+		"after_insert": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_rollup",
+			"crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.add_record_activity",
+		],
+		"on_update": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_rollup",
+			"crm.fcrm.doctype.crm_order_product.crm_order_product.update_order_products",
+			"crm.fcrm.doctype.crm_search_index.crm_search_index.update_search_index",
+			"crm.api.dashboard.invalidate_dashboard_cache",
+			"crm.api.doc.invalidate_count_cache",
+			"crm.api.doc.publish_list_dirty",
+		],
+		"on_trash": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_rollup",
+			"crm.fcrm.doctype.crm_stage_transition.crm_stage_transition.delete_stage_transitions",
+			"crm.fcrm.doctype.crm_order_product.crm_order_product.delete_order_products",
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.delete_activity_counter",
+			"crm.fcrm.doctype.crm_search_index.crm_search_index.delete_search_index",
+			"crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.delete_record_activities",
+			"crm.api.dashboard.invalidate_dashboard_cache",
+		],
+		"after_delete": ["crm.api.doc.invalidate_count_cache", "crm.api.doc.publish_list_dirty"],
+	},
 	"CRM Deal": {
+		"after_insert": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_rollup",
+			"crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.add_record_activity",
+		],
 		"on_update": [
-			"crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings.create_customer_in_erpnext"
+			"crm.fcrm.doctype.erpnext_crm_settings.erpnext_crm_settings.create_customer_in_erpnext",
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_rollup",
+			"crm.fcrm.doctype.crm_order_product.crm_order_product.update_order_products",
+			"crm.fcrm.doctype.crm_search_index.crm_search_index.update_search_index",
+			"crm.api.dashboard.invalidate_dashboard_cache",
+			"crm.api.doc.invalidate_count_cache",
+			"crm.api.doc.publish_list_dirty",
+		],
+		"on_trash": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.update_rollup",
+			"crm.fcrm.doctype.crm_stage_transition.crm_stage_transition.delete_stage_transitions",
+			"crm.fcrm.doctype.crm_order_product.crm_order_product.delete_order_products",
+			"crm.fcrm.doctype.crm_activity_counter.crm_activity_counter.delete_activity_counter",
+			"crm.fcrm.doctype.crm_search_index.crm_search_index.delete_search_index",
+			"crm.fcrm.doctype.crm_activity_feed.crm_activity_feed.delete_record_activities",
+			"crm.api.dashboard.invalidate_dashboard_cache",
+		],
+		"after_delete": ["crm.api.doc.invalidate_count_cache", "crm.api.doc.publish_list_dirty"],
+	},
+	"CRM Deal Status": {
+		"on_update": ["crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.rebuild_on_status_change"],
+		"after_rename": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.rebuild_on_status_change"
+		],
+	},
+	"CRM Lead Status": {
+		"after_rename": [
+			"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.rebuild_on_status_change"
+		],
+	},
+	"CRM Product": {
+		"on_update": [
+			"crm.fcrm.doctype.crm_order_product.crm_order_product.update_product",
+			"crm.api.dashboard.invalidate_dashboard_cache",
+		],
+	},
+	"FCRM Settings": {
+		"on_update": ["crm.api.dashboard.invalidate_dashboard_cache"],
+	},
+	"CRM Global Settings": {
+		"on_update": ["crm.api.doc.invalidate_field_meta_cache"],
+		"on_trash": ["crm.api.doc.invalidate_field_meta_cache"],
+	},
+	"CRM View Settings": {
+		"on_update": ["crm.api.doc.invalidate_list_config_cache"],
+		"on_trash": ["crm.api.doc.invalidate_list_config_cache"],
+	},
+	"CRM Form Script": {
+		"on_update": ["crm.api.doc.invalidate_list_config_cache"],
+		"on_trash": ["crm.api.doc.invalidate_list_config_cache"],
+	},
+	"Custom Field": {
+		"on_update": [
+			"crm.api.doc.invalidate_list_config_cache",
+			"crm.api.doc.invalidate_field_meta_cache",
+			"crm.utils.invalidate_link_graph_cache",
+		],
+		"on_trash": [
+			"crm.api.doc.invalidate_list_config_cache",
+			"crm.api.doc.invalidate_field_meta_cache",
+			"crm.utils.invalidate_link_graph_cache",
+		],
+	},
+	"Property Setter": {
+		"on_update": [
+			"crm.api.doc.invalidate_list_config_cache",
+			"crm.api.doc.invalidate_field_meta_cache",
+			"crm.utils.invalidate_link_graph_cache",
+		],
+		"on_trash": [
+			"crm.api.doc.invalidate_list_config_cache",
+			"crm.api.doc.invalidate_field_meta_cache",
+			"crm.utils.invalidate_link_graph_cache",
+		],
+	},
+	"DocType": {
+		"on_update": [
+			"crm.api.doc.invalidate_list_config_cache",
+			"crm.api.doc.invalidate_field_meta_cache",
+			"crm.utils.invalidate_link_graph_cache",
+		],
+		"on_trash": [
+			"crm.api.doc.invalidate_list_config_cache",
+			"crm.api.doc.invalidate_field_meta_cache",
+			"crm.utils.invalidate_link_graph_cache",
 		],
 	},
 	"User": {
@@ -174,10 +345,12 @@ scheduler_events = {
 	# 	"crm.fcrm.doctype.fcrm_temp_ordine.fcrm_temp_ordine.cleanup_expired_temp_orders"
 	# ],
 	"hourly": [
-		"crm.fcrm.doctype.fcrm_temp_ordine.fcrm_temp_ordine.cleanup_expired_temp_orders"
+		"crm.fcrm.doctype.fcrm_temp_ordine.fcrm_temp_ordine.cleanup_expired_temp_orders",
+		"crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup.reconcile_rollup",
 	],
 	"daily": [
-		"crm.fcrm.doctype.crm_lead.status_change_notification.check_pending_payments"
+		"crm.fcrm.doctype.crm_lead.status_change_notification.check_pending_payments",
+		"crm.fcrm.doctype.crm_pipeline_snapshot.crm_pipeline_snapshot.take_pipeline_snapshot",
 	],
 # "daily": [
 # "crm.tasks.daily"
@@ -19,6 +19,7 @@ def after_install(force=False):
 	add_default_fields_layout(force)
 	add_property_setter()
 	add_email_template_custom_fields()
+	add_whatsapp_message_custom_fields()
 	add_default_industries()
 	add_default_lead_sources()
 	add_default_lost_reasons()
@@ -31,6 +32,14 @@ def after_install(force=False):
 	frappe.db.commit()
 
 
+def after_app_install(app_name):
+	if app_name == "frappe_whatsapp":
+		from crm.api.whatsapp import enqueue_setup_phone_digits
+
+		add_whatsapp_message_custom_fields()
+		enqueue_setup_phone_digits()
+
+
 def add_default_lead_statuses():
 	statuses = {
 		"New": {
@@ -280,6 +289,47 @@ def add_email_template_custom_fields():
 		frappe.clear_cache(doctype="Email Template")
 
 
+def add_whatsapp_message_custom_fields():
+	if not frappe.db.exists("DocType", "WhatsApp Message"):
+		return
+
+	if not frappe.get_meta("WhatsApp Message").has_field("from_digits"):
+		click.secho("* Installing Custom Fields in WhatsApp Message")
+
+		create_custom_fields(
+			{
+				"WhatsApp Message": [
+					{
+						"description": "Autogenerated field by CRM App",
+						"fieldname": "from_digits",
+						"fieldtype": "Data",
+						"label": "From (digits)",
+						"insert_after": "from",
+						"hidden": 1,
+						"read_only": 1,
+						"search_index": 1,
+					},
+					{
+						"description": "Autogenerated field by CRM App",
+						"fieldname": "to_digits",
+						"fieldtype": "Data",
+						"label": "To (digits)",
+						"insert_after": "to",
+						"hidden": 1,
+						"read_only": 1,
+						"search_index": 1,
+					},
+				]
+			}
+		)
+
+		frappe.clear_cache(doctype="WhatsApp Message")
+
+	# reactions and replies are looked up by the id of the message they refer to
+	frappe.db.add_index("WhatsApp Message", ["message_id"])
+	frappe.db.add_index("WhatsApp Message", ["reply_to_message_id"])
+
+
 def add_default_industries():
 	industries = [
 		"Accounting",
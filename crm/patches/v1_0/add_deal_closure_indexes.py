@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_deal.crm_deal import on_doctype_update as add_deal_indexes
+
+
+def execute():
+	add_deal_indexes()
@@ -0,0 +1,5 @@
+from crm.install import add_whatsapp_message_custom_fields
+
+
+def execute():
+	add_whatsapp_message_custom_fields()
@@ -0,0 +1,7 @@
+from crm.api.whatsapp import backfill_phone_digits
+from crm.install import add_whatsapp_message_custom_fields
+
+
+def execute():
+	add_whatsapp_message_custom_fields()
+	backfill_phone_digits()
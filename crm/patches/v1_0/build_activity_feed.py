@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_activity_feed.crm_activity_feed import rebuild_activity_feed
+
+
+def execute():
+	rebuild_activity_feed()
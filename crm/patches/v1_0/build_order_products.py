@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_order_product.crm_order_product import rebuild_order_products
+
+
+def execute():
+	rebuild_order_products()
@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_search_index.crm_search_index import rebuild_search_index
+
+
+def execute():
+	rebuild_search_index()
@@ -0,0 +1,5 @@
+from crm.fcrm.doctype.crm_stage_transition.crm_stage_transition import rebuild_stage_transitions
+
+
+def execute():
+	rebuild_stage_transitions()
@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+	# call logs are listed from their own table, not the activity feed
+	frappe.db.delete("CRM Activity Feed", {"activity_type": "call"})
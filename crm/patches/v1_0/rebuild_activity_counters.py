@@ -0,0 +1,6 @@
+from crm.fcrm.doctype.crm_activity_counter.crm_activity_counter import is_enabled, rebuild_activity_counters
+
+
+def execute():
+	if is_enabled():
+		rebuild_activity_counters()
@@ -0,0 +1,19 @@
+import frappe
+
+from crm.fcrm.doctype.crm_dashboard_rollup.crm_dashboard_rollup import rebuild_rollup
+
+
+def execute():
+	frappe.db.sql(
+		"""
+		UPDATE `tabCRM Deal`
+		SET
+			base_deal_value = IFNULL(deal_value, 0) * IFNULL(exchange_rate, 1),
+			base_expected_deal_value = IFNULL(expected_deal_value, 0) * IFNULL(exchange_rate, 1),
+			base_weighted_expected_value = IFNULL(expected_deal_value, 0) * IFNULL(exchange_rate, 1)
+				* IFNULL(probability, 0) / 100
+		"""
+	)
+
+	# the rollup sums base deal values, recompute it from the backfilled columns
+	rebuild_rollup("CRM Deal")
@@ -10,6 +10,9 @@ from frappe.utils import floor
 from phonenumbers import NumberParseException
 from phonenumbers import PhoneNumberFormat as PNF
 
+LINK_GRAPH_GENERATION_KEY = "crm_link_graph_generation"
+LINK_GRAPH_CACHE_TTL = 24 * 60 * 60
+
 
 def parse_phone_number(phone_number, default_country="IN"):
 	try:
@@ -102,132 +105,119 @@ def seconds_to_duration(seconds):
 		return "0s"
 
 
-# Extracted from frappe core frappe/model/delete_doc.py/check_if_doc_is_linked
-def get_linked_docs(doc, method="Delete"):
-	from frappe.model.rename_doc import get_link_fields
+def get_link_graph(doctype):
+	"""
+	Describe the tables referencing `doctype`: for each, its link fields to `doctype` and its
+	dynamic links as (doctype field, name field) pairs. Doctypes in `ignore_links_on_delete` are
+	left out. Cached until a DocType, Custom Field or Property Setter changes.
+	"""
+	generation = frappe.utils.cint(frappe.cache.get(frappe.cache.make_key(LINK_GRAPH_GENERATION_KEY)))
+	key = f"crm_link_graph:{generation}:{doctype}"
+	graph = frappe.cache.get_value(key)
+	if graph is None:
+		graph = build_link_graph(doctype)
+		frappe.cache.set_value(key, graph, expires_in_sec=LINK_GRAPH_CACHE_TTL)
+	return graph
 
-	link_fields = get_link_fields(doc.doctype)
-	ignored_doctypes = set()
 
-	if method == "Cancel" and (doc_ignore_flags := doc.get("ignore_linked_doctypes")):
-		ignored_doctypes.update(doc_ignore_flags)
-	if method == "Delete":
-		ignored_doctypes.update(frappe.get_hooks("ignore_links_on_delete"))
+def build_link_graph(doctype):
+	from frappe.model.rename_doc import get_link_fields
 
-	docs = []
+	ignored_doctypes = set(frappe.get_hooks("ignore_links_on_delete"))
+	tables = {}
 
-	for lf in link_fields:
-		link_dt, link_field, issingle = lf["parent"], lf["fieldname"], lf["issingle"]
-		if link_dt in ignored_doctypes or (link_field == "amended_from" and method == "Cancel"):
+	def get_table(link_dt):
+		if link_dt not in tables:
+			meta = frappe.get_meta(link_dt)
+			tables[link_dt] = {
+				"doctype": link_dt,
+				"istable": meta.istable,
+				"issingle": meta.issingle,
+				"link_fields": [],
+				"dynamic_links": [],
+			}
+		return tables[link_dt]
+
+	for lf in get_link_fields(doctype):
+		if lf["parent"] in ignored_doctypes:
 			continue
 
 		try:
-			meta = frappe.get_meta(link_dt)
+			get_table(lf["parent"])["link_fields"].append(lf["fieldname"])
 		except frappe.DoesNotExistError:
+			# customizations left behind by an uninstalled app
 			frappe.clear_last_message()
-			# This mostly happens when app do not remove their customizations, we shouldn't
-			# prevent link checks from failing in those cases
-			continue
 
-		if issingle:
-			if frappe.db.get_single_value(link_dt, link_field) == doc.name:
-				docs.append({"doc": doc.name, "link_dt": link_dt, "link_field": link_field})
-			continue
+	for df in get_dynamic_link_map().get(doctype, []):
+		if df.parent not in ignored_doctypes:
+			get_table(df.parent)["dynamic_links"].append((df.options, df.fieldname))
 
-		fields = ["name", "docstatus"]
+	return list(tables.values())
 
-		if meta.istable:
-			fields.extend(["parent", "parenttype"])
 
-		for item in frappe.db.get_values(link_dt, {link_field: doc.name}, fields, as_dict=True):
-			# available only in child table cases
-			item_parent = getattr(item, "parent", None)
-			linked_parent_doctype = item.parenttype if item_parent else link_dt
+def invalidate_link_graph_cache(doc=None, method=None):
+	frappe.cache.incr(frappe.cache.make_key(LINK_GRAPH_GENERATION_KEY))
 
-			if linked_parent_doctype in ignored_doctypes:
-				continue
 
-			if method != "Delete" and (method != "Cancel" or not DocStatus(item.docstatus).is_submitted()):
-				# don't raise exception if not
-				# linked to a non-cancelled doc when deleting or to a submitted doc when cancelling
-				continue
-			elif link_dt == doc.doctype and (item_parent or item.name) == doc.name:
-				# don't raise exception if not
-				# linked to same item or doc having same name as the item
-				continue
-			else:
-				reference_docname = item_parent or item.name
-				docs.append(
-					{
-						"doc": doc.name,
-						"reference_doctype": linked_parent_doctype,
-						"reference_docname": reference_docname,
-					}
-				)
-	return docs
-
-
-# Extracted from frappe core frappe/model/delete_doc.py/check_if_doc_is_dynamically_linked
-def get_dynamic_linked_docs(doc, method="Delete"):
-	docs = []
-	for df in get_dynamic_link_map().get(doc.doctype, []):
-		ignore_linked_doctypes = doc.get("ignore_linked_doctypes") or []
-
-		if df.parent in frappe.get_hooks("ignore_links_on_delete") or (
-			df.parent in ignore_linked_doctypes and method == "Cancel"
-		):
-			# don't check for communication and todo!
+def get_linked_docs_of_names(doctype, names):
+	"""
+	Get the documents referencing any of `names` through a link or dynamic link field that would
+	block deleting them. Uses the cached `get_link_graph` and one UNION query per referencing
+	table for the whole set, instead of a query per field and document.
+
+	Returns {name: [{"doc", "reference_doctype", "reference_docname"}]}.
+	"""
+	names = list(names)
+	if not names:
+		return {}
+
+	ignored_doctypes = set(frappe.get_hooks("ignore_links_on_delete"))
+	linked = {name: {} for name in names}
+
+	def add(name, reference_doctype, reference_docname):
+		if name not in linked or reference_doctype in ignored_doctypes:
+			return
+		if reference_doctype == doctype and reference_docname == name:
+			# linked to itself
+			return
+		linked[name].setdefault(
+			(reference_doctype, reference_docname),
+			{"doc": name, "reference_doctype": reference_doctype, "reference_docname": reference_docname},
+		)
+
+	for table in get_link_graph(doctype):
+		link_dt = table["doctype"]
+		if table["issingle"]:
+			values = frappe.db.get_singles_dict(link_dt)
+			for fieldname in table["link_fields"]:
+				add(values.get(fieldname), link_dt, link_dt)
+			for options, fieldname in table["dynamic_links"]:
+				if values.get(options) == doctype and not DocStatus(values.docstatus or 0).is_cancelled():
+					add(values.get(fieldname), link_dt, link_dt)
 			continue
 
-		meta = frappe.get_meta(df.parent)
-		if meta.issingle:
-			# dynamic link in single doc
-			refdoc = frappe.db.get_singles_dict(df.parent)
-			if (
-				refdoc.get(df.options) == doc.doctype
-				and refdoc.get(df.fieldname) == doc.name
-				and (
-					# linked to an non-cancelled doc when deleting
-					(method == "Delete" and not DocStatus(refdoc.docstatus).is_cancelled())
-					# linked to a submitted doc when cancelling
-					or (method == "Cancel" and DocStatus(refdoc.docstatus).is_submitted())
-				)
-			):
-				docs.append({"doc": doc.name, "reference_doctype": df.parent, "reference_docname": df.parent})
-		else:
-			# dynamic link in table
-			df["table"] = ", `parent`, `parenttype`, `idx`" if meta.istable else ""
-			for refdoc in frappe.db.sql(
-				"""select `name`, `docstatus` {table} from `tab{parent}` where
-				`{options}`=%s and `{fieldname}`=%s""".format(**df),
-				(doc.doctype, doc.name),
-				as_dict=True,
-			):
-				# linked to an non-cancelled doc when deleting
-				# or linked to a submitted doc when cancelling
-				if (method == "Delete" and not DocStatus(refdoc.docstatus).is_cancelled()) or (
-					method == "Cancel" and DocStatus(refdoc.docstatus).is_submitted()
-				):
-					reference_doctype = refdoc.parenttype if meta.istable else df.parent
-					reference_docname = refdoc.parent if meta.istable else refdoc.name
-
-					if reference_doctype in frappe.get_hooks("ignore_links_on_delete") or (
-						reference_doctype in ignore_linked_doctypes and method == "Cancel"
-					):
-						# don't check for communication and todo!
-						continue
-
-					at_position = f"at Row: {refdoc.idx}" if meta.istable else ""
-
-					docs.append(
-						{
-							"doc": doc.name,
-							"reference_doctype": reference_doctype,
-							"reference_docname": reference_docname,
-							"at_position": at_position,
-						}
-					)
-	return docs
+		columns = "`name`, `parent`, `parenttype`" if table["istable"] else "`name`"
+		queries = [
+			f"SELECT {columns}, `{fieldname}` AS target FROM `tab{link_dt}` WHERE `{fieldname}` IN %(names)s"
+			for fieldname in table["link_fields"]
+		]
+		queries += [
+			f"""SELECT {columns}, `{fieldname}` AS target FROM `tab{link_dt}`
+			WHERE `{options}` = %(doctype)s AND `{fieldname}` IN %(names)s AND `docstatus` != 2"""
+			for options, fieldname in table["dynamic_links"]
+		]
+		if not queries:
+			continue
+
+		for row in frappe.db.sql(
+			" UNION ".join(queries), {"names": names, "doctype": doctype}, as_dict=True
+		):
+			if table["istable"]:
+				add(row.target, row.parenttype, row.parent)
+			else:
+				add(row.target, link_dt, row.name)
+
+	return {name: list(docs.values()) for name, docs in linked.items()}
 
 
 def is_admin(user: str | None = None) -> bool: